@@ -0,0 +1,53 @@
+import argparse
+import random
+import resource
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+
+from ..config import settings
+from ..services.gazetteer import Gazetteer, normalize_name
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mede carga, memória e buscas por prefixo no índice de municípios.")
+    parser.add_argument("--path", type=Path, default=Path(settings.gazetteer_path))
+    parser.add_argument("--lookups", type=int, default=10000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    started = time.perf_counter()
+    gazetteer = Gazetteer(args.path)
+    load_ms = (time.perf_counter() - started) * 1000
+    heap_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # prefixos de 1 a 6 letras tirados dos próprios nomes, com e sem acento
+    rng = random.Random(args.seed)
+    names = [gazetteer._municipality(index).name for index in range(len(gazetteer))]
+    queries = []
+    for _ in range(args.lookups):
+        name = rng.choice(names)
+        prefix = name[: rng.randint(1, 6)]
+        queries.append(prefix if rng.random() < 0.5 else normalize_name(prefix))
+
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        gazetteer.suggest(query, limit=args.limit)
+        timings.append((time.perf_counter() - started) * 1_000_000)
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    cuts = statistics.quantiles(timings, n=100)
+    print(f"Municípios: {len(gazetteer)} | arquivo: {args.path.stat().st_size / 1024:.1f} KiB")
+    print(f"Carga: {load_ms:.2f} ms | heap Python após carga: {heap_bytes / 1024:.1f} KiB")
+    print(f"RSS máximo: {rss_before / 1024:.1f} -> {rss_after / 1024:.1f} MB")
+    print(f"Busca (limite {args.limit}): p50 {cuts[49]:.1f} µs | p95 {cuts[94]:.1f} µs | p99 {cuts[98]:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
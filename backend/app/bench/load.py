@@ -0,0 +1,441 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+
+BACKEND_ROOT = Path(__file__).resolve().parents[2]
+
+BENCH_PASSWORD = "benchmark-senha"
+DEFAULT_MIX = "login=1,cities=6,routes=6,chat=1,csv=3,delete=1"
+OPERATIONS = ("login", "cities", "routes", "chat", "csv", "delete")
+TRANSPORT_TYPES = ("Carro", "Ônibus", "Avião", "Trem")
+TRIP_TYPES = ("Lazer", "Negócios", "Aventura")
+
+
+@dataclass
+class VirtualUser:
+    email: str
+    route_ids: list[int]
+    token: str | None = None
+
+
+@dataclass
+class Samples:
+    latencies: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    errors: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    statuses: dict[str, dict[int, int]] = field(default_factory=lambda: defaultdict(lambda: defaultdict(int)))
+
+
+def parse_mix(raw: str) -> dict[str, int]:
+    mix: dict[str, int] = {}
+    for item in raw.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"operação desconhecida: {name}")
+        mix[name] = int(weight or 1)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def _configure_environment(args: argparse.Namespace) -> None:
+    # as configurações são lidas na importação do app, então o ambiente precisa vir antes
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ["GEMINI_FAKE"] = "true"
+    os.environ["GEMINI_FAKE_LATENCY_MS"] = str(args.gemini_latency_ms)
+    os.environ["GEMINI_FAKE_FAILURE_RATE"] = "0"
+    os.environ["GEMINI_RETRY_ATTEMPTS"] = "1"
+    os.environ["LLM_CACHE_BACKEND"] = "none"
+    os.environ["GENERATION_WORKERS"] = "0"
+    if args.gemini_payload:
+        os.environ["GEMINI_FAKE_RESPONSE_FILE"] = str(Path(args.gemini_payload).resolve())
+    for assignment in args.env or []:
+        name, _, value = assignment.partition("=")
+        os.environ[name] = value
+
+
+def seed(users: int, cities: int, routes: int, seed_value: int) -> list[VirtualUser]:
+    from sqlalchemy import delete
+
+    from .. import models
+    from ..database import SessionLocal
+    from ..security import get_password_hash
+    from ..services.route_stats import rebuild_route_stats
+
+    rng = random.Random(seed_value)
+    hashed_password = get_password_hash(BENCH_PASSWORD)
+    emails = [f"bench-{index}@example.com" for index in range(users)]
+
+    with SessionLocal() as db:
+        db.execute(delete(models.User).where(models.User.email.in_(emails)))
+        db.commit()
+
+        db.bulk_insert_mappings(
+            models.User,
+            [{"email": email, "hashed_password": hashed_password, "full_name": "Benchmark"} for email in emails],
+        )
+        db.commit()
+        user_ids = dict(db.query(models.User.email, models.User.id).filter(models.User.email.in_(emails)))
+
+        city_rows = []
+        for email in emails:
+            for index in range(cities):
+                role = "origin" if index == 0 else "destination" if index == cities - 1 else "intermediate"
+                city_rows.append(
+                    {"user_id": user_ids[email], "name": f"Cidade {index}", "state": "SP", "role": role}
+                )
+        db.bulk_insert_mappings(models.City, city_rows)
+
+        today = date.today()
+        route_rows = []
+        for email in emails:
+            for index in range(routes):
+                distance = rng.randint(50, 2000)
+                cost = rng.randint(50, 3000)
+                row = {
+                    "user_id": user_ids[email],
+                    "itinerary": f"Cidade 0 → Cidade {index % max(1, cities)}",
+                    "travel_date": today + timedelta(days=rng.randint(0, 90)),
+                    "distance_km": f"{distance} km",
+                    "travel_time": f"{distance // 80}h",
+                    "cost_brl": f"R$ {cost},00",
+                    "trip_type": rng.choice(TRIP_TYPES),
+                    "transport_type": rng.choice(TRANSPORT_TYPES),
+                    "estimated_spend_brl": f"R$ {cost * 3},00",
+                    "distance_km_value": float(distance),
+                    "travel_time_minutes": distance * 60 // 80,
+                    "cost_brl_cents": cost * 100,
+                    "estimated_spend_brl_cents": cost * 300,
+                    "summary": "Rota gerada para benchmark.",
+                }
+                row["csv_row"] = ";".join(
+                    [
+                        row["itinerary"],
+                        row["distance_km"],
+                        row["travel_time"],
+                        row["cost_brl"],
+                        row["trip_type"],
+                        row["transport_type"],
+                        "Hotel",
+                        "Regional",
+                        "Passeio",
+                        row["estimated_spend_brl"],
+                    ]
+                )
+                route_rows.append(row)
+        for start in range(0, len(route_rows), 5000):
+            db.bulk_insert_mappings(models.RoutePlan, route_rows[start : start + 5000])
+        db.commit()
+
+        for email in emails:
+            rebuild_route_stats(db, user_ids[email])
+
+        route_ids: dict[int, list[int]] = defaultdict(list)
+        for user_id, route_id in db.query(models.RoutePlan.user_id, models.RoutePlan.id).filter(
+            models.RoutePlan.user_id.in_(user_ids.values())
+        ):
+            route_ids[user_id].append(route_id)
+
+    return [VirtualUser(email=email, route_ids=route_ids[user_ids[email]]) for email in emails]
+
+
+class Workload:
+    def __init__(self, client: Any, samples: Samples, rng: random.Random) -> None:
+        self._client = client
+        self._samples = samples
+        self._rng = rng
+        self._chat_counter = 0
+
+    async def _timed(self, operation: str, call: Callable[[], Awaitable[Any]], expected: tuple[int, ...]) -> Any:
+        started = time.perf_counter()
+        try:
+            response = await call()
+        except Exception:
+            self._samples.errors[operation] += 1
+            return None
+        elapsed = time.perf_counter() - started
+
+        self._samples.statuses[operation][response.status_code] += 1
+        if response.status_code not in expected:
+            self._samples.errors[operation] += 1
+            return None
+        self._samples.latencies[operation].append(elapsed)
+        return response
+
+    @staticmethod
+    def _auth(user: VirtualUser) -> dict[str, str]:
+        return {"Authorization": f"Bearer {user.token}"}
+
+    async def login(self, user: VirtualUser) -> None:
+        response = await self._timed(
+            "login",
+            lambda: self._client.post(
+                "/api/auth/login", data={"username": user.email, "password": BENCH_PASSWORD}
+            ),
+            (200,),
+        )
+        if response is not None:
+            user.token = response.json()["access_token"]
+
+    async def cities(self, user: VirtualUser) -> None:
+        await self._timed("cities", lambda: self._client.get("/api/cities/", headers=self._auth(user)), (200,))
+
+    async def routes(self, user: VirtualUser) -> None:
+        await self._timed(
+            "routes", lambda: self._client.get("/api/routes/", params={"limit": 50}, headers=self._auth(user)), (200,)
+        )
+
+    async def chat(self, user: VirtualUser) -> None:
+        self._chat_counter += 1
+        # mensagens distintas evitam a coalescência de pedidos idênticos
+        message = f"Planeje uma viagem de benchmark #{self._chat_counter}-{self._rng.random():.6f}"
+        response = await self._timed(
+            "chat",
+            lambda: self._client.post("/api/ai/chat", json={"message": message}, headers=self._auth(user)),
+            (200,),
+        )
+        if response is not None:
+            user.route_ids.extend(route["id"] for route in response.json()["routes"])
+
+    async def csv(self, user: VirtualUser) -> None:
+        if not user.route_ids:
+            return
+        route_id = self._rng.choice(user.route_ids)
+        await self._timed(
+            "csv", lambda: self._client.get(f"/api/routes/{route_id}/csv", headers=self._auth(user)), (200,)
+        )
+
+    async def delete(self, user: VirtualUser) -> None:
+        if len(user.route_ids) < 10:
+            return
+        route_ids = [user.route_ids.pop() for _ in range(2)]
+        await self._timed(
+            "delete",
+            lambda: self._client.request(
+                "DELETE", "/api/routes/", json={"route_ids": route_ids}, headers=self._auth(user)
+            ),
+            (204,),
+        )
+
+
+async def _run_virtual_user(
+    workload: Workload, user: VirtualUser, mix: dict[str, int], rng: random.Random, deadline: float
+) -> None:
+    operations = list(mix)
+    weights = [mix[name] for name in operations]
+
+    await workload.login(user)
+    while time.perf_counter() < deadline:
+        if user.token is None:
+            await workload.login(user)
+            continue
+        operation = rng.choices(operations, weights)[0]
+        await getattr(workload, operation)(user)
+
+
+def _summarize(samples: Samples, elapsed: float) -> dict[str, Any]:
+    operations: dict[str, Any] = {}
+    all_latencies: list[float] = []
+    for operation in OPERATIONS:
+        latencies = samples.latencies.get(operation, [])
+        errors = samples.errors.get(operation, 0)
+        if not latencies and not errors:
+            continue
+        all_latencies.extend(latencies)
+        operations[operation] = {
+            "count": len(latencies),
+            "errors": errors,
+            "statuses": {str(code): count for code, count in sorted(samples.statuses[operation].items())},
+            "throughput_rps": round(len(latencies) / elapsed, 2),
+            **_latency_summary(latencies),
+        }
+
+    return {
+        "elapsed_seconds": round(elapsed, 3),
+        "total": {
+            "count": len(all_latencies),
+            "errors": sum(samples.errors.values()),
+            "throughput_rps": round(len(all_latencies) / elapsed, 2),
+            **_latency_summary(all_latencies),
+        },
+        "operations": operations,
+    }
+
+
+def _latency_summary(latencies: list[float]) -> dict[str, float | None]:
+    if len(latencies) < 2:
+        value = round(latencies[0] * 1000, 3) if latencies else None
+        return {"p50_ms": value, "p95_ms": value, "p99_ms": value, "mean_ms": value, "max_ms": value}
+
+    cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    return {
+        "p50_ms": round(cuts[49] * 1000, 3),
+        "p95_ms": round(cuts[94] * 1000, 3),
+        "p99_ms": round(cuts[98] * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3),
+    }
+
+
+def _cap_sqlite_pool() -> None:
+    # o aiosqlite usa NullPool e abre uma conexão por sessão; com o pool limitado como no Postgres,
+    # DATABASE_POOL_SIZE e DATABASE_MAX_OVERFLOW valem também no SQLite e o esgotamento do pool aparece na carga
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+    from ..config import settings
+    from ..database import async_engine
+
+    if async_engine.dialect.name != "sqlite":
+        return
+    pool = async_engine.sync_engine.pool
+    async_engine.sync_engine.pool = AsyncAdaptedQueuePool(
+        pool._creator,
+        pool_size=settings.database_pool_size,
+        max_overflow=settings.database_max_overflow,
+        timeout=settings.database_pool_timeout_seconds,
+        pre_ping=True,
+        dialect=pool._dialect,
+    )
+
+
+async def _drive(args: argparse.Namespace, users: list[VirtualUser], mix: dict[str, int]) -> dict[str, Any]:
+    import httpx
+
+    from ..main import create_app
+
+    _cap_sqlite_pool()
+    app = create_app()
+    samples = Samples()
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60.0) as client:
+            if args.warmup:
+                warmup_deadline = time.perf_counter() + args.warmup
+                warmup = Workload(client, Samples(), random.Random(args.seed))
+                await asyncio.gather(
+                    *(
+                        _run_virtual_user(warmup, users[index % len(users)], mix, random.Random(index), warmup_deadline)
+                        for index in range(args.concurrency)
+                    )
+                )
+
+            started = time.perf_counter()
+            deadline = started + args.duration
+            tasks = []
+            for index in range(args.concurrency):
+                rng = random.Random(args.seed + index)
+                workload = Workload(client, samples, rng)
+                tasks.append(_run_virtual_user(workload, users[index % len(users)], mix, rng, deadline))
+            for index in range(args.chat_concurrency):
+                # usuários que só conversam com o Gemini, para medir o efeito nas demais rotas
+                rng = random.Random(args.seed + args.concurrency + index)
+                workload = Workload(client, samples, rng)
+                tasks.append(_run_virtual_user(workload, users[index % len(users)], {"chat": 1}, rng, deadline))
+            await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - started
+
+    return _summarize(samples, elapsed)
+
+
+def _git_revision() -> str | None:
+    try:
+        completed = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_ROOT, capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return completed.stdout.strip()
+
+
+def _print_report(result: dict[str, Any], baseline: dict[str, Any] | None) -> None:
+    print(f"  {'operação':<10} {'n':>7} {'erros':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    baseline_rows = {**baseline["operations"], "total": baseline["total"]} if baseline else {}
+    rows = [*result["operations"].items(), ("total", result["total"])]
+    for name, stats in rows:
+        line = (
+            f"  {name:<10} {stats['count']:>7} {stats['errors']:>6} {stats['throughput_rps']:>9.1f} "
+            f"{stats['p50_ms'] or 0:>9.1f} {stats['p95_ms'] or 0:>9.1f} {stats['p99_ms'] or 0:>9.1f}"
+        )
+        previous = baseline_rows.get(name)
+        if previous and previous.get("p95_ms") and stats["p95_ms"]:
+            line += f"  (p95 x{stats['p95_ms'] / previous['p95_ms']:.2f} vs. base)"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Carga de ponta a ponta contra create_app() com Gemini fake e banco local."
+    )
+    parser.add_argument("--database-url", default=None, help="Padrão: SQLite em um diretório temporário.")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--cities", type=int, default=5, help="Cidades por usuário.")
+    parser.add_argument("--routes", type=int, default=200, help="Rotas planejadas por usuário.")
+    parser.add_argument("--concurrency", type=int, default=20, help="Usuários virtuais simultâneos.")
+    parser.add_argument("--duration", type=float, default=30.0, help="Duração da medição, em segundos.")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Aquecimento antes de medir, em segundos.")
+    parser.add_argument(
+        "--chat-concurrency", type=int, default=0, help="Usuários virtuais extras que só fazem chat."
+    )
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX), help=f"Pesos (padrão: {DEFAULT_MIX}).")
+    parser.add_argument("--gemini-latency-ms", type=int, default=800)
+    parser.add_argument("--gemini-payload", default=None, help="Arquivo com o JSON devolvido pelo Gemini fake.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--env", action="append", help="Variável extra no formato NOME=valor (repetível).")
+    parser.add_argument("--output", default=None, help="Arquivo JSON com o resultado.")
+    parser.add_argument("--compare", default=None, help="Resultado JSON anterior para comparação.")
+    args = parser.parse_args()
+
+    if args.database_url is None:
+        args.database_url = f"sqlite:///{Path(tempfile.mkdtemp(prefix='bench-')) / 'bench.db'}"
+    _configure_environment(args)
+
+    from ..migrate import upgrade
+
+    upgrade()
+    seed_started = time.perf_counter()
+    users = seed(args.users, args.cities, args.routes, args.seed)
+    print(
+        f"Base: {args.users} usuários x {args.cities} cidades x {args.routes} rotas "
+        f"em {time.perf_counter() - seed_started:.1f} s ({args.database_url})"
+    )
+
+    result = asyncio.run(_drive(args, users, args.mix))
+    result["config"] = {
+        "database_backend": args.database_url.split(":", 1)[0],
+        "users": args.users,
+        "cities": args.cities,
+        "routes": args.routes,
+        "concurrency": args.concurrency,
+        "chat_concurrency": args.chat_concurrency,
+        "duration": args.duration,
+        "mix": args.mix,
+        "gemini_latency_ms": args.gemini_latency_ms,
+        "seed": args.seed,
+        "env": args.env or [],
+    }
+    result["revision"] = _git_revision()
+    result["created_at"] = datetime.now(timezone.utc).isoformat()
+    result["python"] = platform.python_version()
+
+    baseline = json.loads(Path(args.compare).read_text(encoding="utf-8")) if args.compare else None
+    _print_report(result, baseline)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"\nResultado salvo em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
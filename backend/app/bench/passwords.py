@@ -0,0 +1,65 @@
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from ..config import settings
+from ..security import _build_password_context
+
+_context = None
+
+
+def _init_worker(scheme: str, rounds: int | None) -> None:
+    global _context
+    _context = _build_password_context(scheme, rounds)
+
+
+def _verify(password: str, hashed_password: str) -> bool:
+    return _context.verify(password, hashed_password)
+
+
+def measure(workers: int, logins: int, scheme: str, rounds: int | None) -> float:
+    hashed_password = _build_password_context(scheme, rounds).hash("benchmark-senha")
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(scheme, rounds),
+    ) as executor:
+        # aquece os processos antes de medir
+        list(executor.map(_verify, ["benchmark-senha"] * workers, [hashed_password] * workers))
+
+        started = time.perf_counter()
+        results = list(
+            executor.map(_verify, ["benchmark-senha"] * logins, [hashed_password] * logins)
+        )
+        elapsed = time.perf_counter() - started
+
+    if not all(results):
+        raise RuntimeError("Falha ao verificar a senha de benchmark.")
+
+    return logins / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Mede verificações de senha (logins/s) por quantidade de processos."
+    )
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--scheme", default=settings.password_hash_scheme)
+    parser.add_argument("--rounds", type=int, default=settings.password_hash_rounds)
+    args = parser.parse_args()
+
+    print(f"Esquema: {args.scheme} | rounds: {args.rounds or 'padrão'} | núcleos: {os.cpu_count()}")
+    baseline = None
+    for workers in range(1, args.max_workers + 1):
+        rate = measure(workers, args.logins, args.scheme, args.rounds)
+        baseline = baseline or rate
+        print(f"{workers:>3} processo(s): {rate:8.1f} logins/s (x{rate / baseline:.2f})")
+
+
+if __name__ == "__main__":
+    main()
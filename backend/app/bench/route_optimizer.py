@@ -0,0 +1,61 @@
+import argparse
+import random
+import statistics
+import time
+
+import numpy as np
+
+from ..services.route_optimizer import haversine_matrix, path_length, solve_open_path
+
+
+# caixa aproximada do território brasileiro
+LATITUDES = (-33.7, 5.3)
+LONGITUDES = (-73.9, -34.8)
+# até aqui ainda dá para medir a distância das heurísticas até o ótimo exato
+GAP_REFERENCE_LIMIT = 14
+
+
+def _random_distances(rng: random.Random, waypoints: int) -> np.ndarray:
+    count = waypoints + 2
+    return haversine_matrix(
+        [rng.uniform(*LATITUDES) for _ in range(count)],
+        [rng.uniform(*LONGITUDES) for _ in range(count)],
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mede o tempo e a qualidade da ordenação local de paradas.")
+    parser.add_argument("--sizes", default="3,6,9,12,20,50,100,200,400", help="Quantidades de paradas intermediárias.")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'paradas':>8} {'método':>10} {'p50 ms':>9} {'máx ms':>9} {'vs cadastro':>12} {'heurística vs exato':>9}")
+    for size in (int(value) for value in args.sizes.split(",")):
+        timings: list[float] = []
+        savings: list[float] = []
+        gaps: list[float] = []
+        method = ""
+        for _ in range(args.repeats):
+            distances = _random_distances(rng, size)
+            started = time.perf_counter()
+            path, method = solve_open_path(distances)
+            timings.append((time.perf_counter() - started) * 1000)
+
+            length = path_length(distances, path)
+            savings.append(1 - length / path_length(distances, range(len(distances))))
+            if 1 < size <= GAP_REFERENCE_LIMIT:
+                heuristic, _ = solve_open_path(distances, exact_limit=0)
+                exact, _ = solve_open_path(distances, exact_limit=size)
+                gaps.append(path_length(distances, heuristic) / path_length(distances, exact) - 1)
+
+        gap = f"{statistics.mean(gaps) * 100:+.2f}%" if gaps else "-"
+        print(
+            f"{size:>8} {method:>10} {statistics.median(timings):>9.2f} {max(timings):>9.2f} "
+            f"{-statistics.mean(savings) * 100:>+11.1f}% {gap:>20}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import argparse
+import json
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+
+BACKEND_ROOT = Path(__file__).resolve().parents[2]
+
+DEFAULT_FORBIDDEN_MODULES = ["google.generativeai", "google.api_core", "grpc"]
+
+_IMPORTTIME_PATTERN = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+_PROBE = """
+import asyncio
+import json
+import resource
+import sys
+import time
+
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+loaded = [name for name in sys.argv[1:] if name in sys.modules]
+
+
+async def _boot():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+
+ready = asyncio.run(_boot())
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "lifespan_ms": (ready - imported) * 1000,
+    "rss_mb": rss_kb / 1024,
+    "loaded": loaded,
+}))
+"""
+
+
+def _run_probe(watch: list[str], importtime: bool = False) -> subprocess.CompletedProcess:
+    command = [sys.executable]
+    if importtime:
+        command += ["-X", "importtime"]
+    return subprocess.run(
+        command + ["-c", _PROBE, *watch],
+        cwd=BACKEND_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def measure_once(watch: list[str]) -> dict:
+    return json.loads(_run_probe(watch).stdout.strip().splitlines()[-1])
+
+
+def import_costs(top: int) -> list[tuple[str, float, float]]:
+    completed = _run_probe([], importtime=True)
+    self_us: dict[str, int] = defaultdict(int)
+    cumulative_us: dict[str, int] = defaultdict(int)
+    depth: dict[str, int] = {}
+
+    for line in completed.stderr.splitlines():
+        match = _IMPORTTIME_PATTERN.match(line)
+        if not match:
+            continue
+        own, cumulative, indent, module = match.groups()
+        package = module.split(".")[0]
+        self_us[package] += int(own)
+        # o acumulado considera só o nível mais externo em que o pacote aparece, para não contar em dobro
+        level = len(indent)
+        if level < depth.get(package, level + 1):
+            depth[package] = level
+            cumulative_us[package] = 0
+        if level == depth[package]:
+            cumulative_us[package] += int(cumulative)
+
+    ranking = sorted(self_us.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [(package, own / 1000, cumulative_us.get(package, 0) / 1000) for package, own in ranking]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mede o tempo de inicialização e a memória da API em processos novos.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="Quantidade de pacotes no relatório de importação.")
+    parser.add_argument("--check", action="store_true", help="Falha se algum limite abaixo for excedido.")
+    parser.add_argument("--max-import-ms", type=float, default=None)
+    parser.add_argument("--max-rss-mb", type=float, default=None)
+    parser.add_argument(
+        "--forbid-module",
+        action="append",
+        default=None,
+        help="Módulo que não pode estar carregado após create_app() (padrão: SDK do Gemini e gRPC).",
+    )
+    args = parser.parse_args()
+    forbidden = args.forbid_module or DEFAULT_FORBIDDEN_MODULES
+
+    print(f"Custo de importação por pacote (top {args.top}):")
+    print(f"  {'pacote':<28} {'próprio (ms)':>12} {'acumulado (ms)':>15}")
+    for package, own_ms, cumulative_ms in import_costs(args.top):
+        print(f"  {package:<28} {own_ms:12.1f} {cumulative_ms:15.1f}")
+
+    samples = [measure_once(forbidden) for _ in range(args.runs)]
+    print()
+    for phase in ("import_ms", "lifespan_ms", "rss_mb"):
+        values = [sample[phase] for sample in samples]
+        print(f"{phase:<12} mediana {statistics.median(values):8.1f} | min {min(values):8.1f} | máx {max(values):8.1f}")
+    total = [sample["import_ms"] + sample["lifespan_ms"] for sample in samples]
+    print(f"{'total_ms':<12} mediana {statistics.median(total):8.1f}")
+
+    if not args.check:
+        return
+
+    failures = []
+    import_ms = statistics.median(sample["import_ms"] for sample in samples)
+    rss_mb = statistics.median(sample["rss_mb"] for sample in samples)
+    loaded = sorted({name for sample in samples for name in sample["loaded"]})
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        failures.append(f"importação levou {import_ms:.1f} ms (limite {args.max_import_ms:.1f} ms)")
+    if args.max_rss_mb is not None and rss_mb > args.max_rss_mb:
+        failures.append(f"memória residente de {rss_mb:.1f} MB (limite {args.max_rss_mb:.1f} MB)")
+    if loaded:
+        failures.append(f"módulos carregados na inicialização: {', '.join(loaded)}")
+
+    if failures:
+        print("\nRegressão de inicialização:")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+
+    print("\nInicialização dentro dos limites.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,85 @@
+from pathlib import Path
+
 from pydantic import BaseSettings, Field, validator
 
 
+COMMA_SEPARATED_FIELDS = {
+    "cors_allowed_origins",
+    "database_read_urls",
+    "gemini_retry_status_codes",
+    "sql_profiling_admin_emails",
+}
+
+
 class Settings(BaseSettings):
     app_name: str = Field(default="Orquestrador Rotas LLM")
     debug: bool = Field(default=True)
     secret_key: str = Field(default="change-this-secret", env="SECRET_KEY")
     token_expire_minutes: int = Field(default=60, env="TOKEN_EXPIRE_MINUTES")
+    auth_cache_ttl_seconds: int = Field(default=30, env="AUTH_CACHE_TTL_SECONDS")
+    auth_cache_max_entries: int = Field(default=10000, env="AUTH_CACHE_MAX_ENTRIES")
+    password_hash_scheme: str = Field(default="pbkdf2_sha256", env="PASSWORD_HASH_SCHEME")
+    password_hash_rounds: int | None = Field(default=None, env="PASSWORD_HASH_ROUNDS")
+    password_hash_workers: int = Field(default=2, env="PASSWORD_HASH_WORKERS")
+    password_hash_queue_limit: int = Field(default=32, env="PASSWORD_HASH_QUEUE_LIMIT")
     database_url: str = Field(
         default="postgresql+psycopg://postgres:postgres@db:5432/orquestrador",
         env="DATABASE_URL",
     )
+    database_pool_size: int = Field(default=10, env="DATABASE_POOL_SIZE")
+    database_max_overflow: int = Field(default=20, env="DATABASE_MAX_OVERFLOW")
+    database_pool_recycle_seconds: int = Field(default=1800, env="DATABASE_POOL_RECYCLE_SECONDS")
+    database_pool_timeout_seconds: float = Field(default=10.0, env="DATABASE_POOL_TIMEOUT_SECONDS")
+    database_statement_timeout_ms: int = Field(default=15000, env="DATABASE_STATEMENT_TIMEOUT_MS")
+    database_read_urls: list[str] = Field(default=[], env="DATABASE_READ_URLS")
+    database_read_your_writes_seconds: float = Field(default=5.0, env="DATABASE_READ_YOUR_WRITES_SECONDS")
+    database_replica_retry_seconds: float = Field(default=30.0, env="DATABASE_REPLICA_RETRY_SECONDS")
+    database_replica_connect_timeout_seconds: float = Field(
+        default=1.0, env="DATABASE_REPLICA_CONNECT_TIMEOUT_SECONDS"
+    )
     cors_allowed_origins: list[str] = Field(
         default=["http://localhost:5173", "http://127.0.0.1:5173"],
         env="CORS_ALLOWED_ORIGINS",
     )
     gemini_api_key: str | None = Field(default=None, env="GEMINI_API_KEY")
     gemini_model: str = Field(default="gemini-2.0-flash", env="GEMINI_MODEL")
+    gemini_warmup: bool = Field(default=False, env="GEMINI_WARMUP")
+    gemini_fake: bool = Field(default=False, env="GEMINI_FAKE")
+    gemini_fake_latency_ms: int = Field(default=0, env="GEMINI_FAKE_LATENCY_MS")
+    gemini_fake_failure_rate: float = Field(default=0.0, env="GEMINI_FAKE_FAILURE_RATE")
+    gemini_fake_response_file: str | None = Field(default=None, env="GEMINI_FAKE_RESPONSE_FILE")
+    gemini_max_concurrency: int = Field(default=16, env="GEMINI_MAX_CONCURRENCY")
+    gemini_queue_timeout_seconds: float = Field(default=5.0, env="GEMINI_QUEUE_TIMEOUT_SECONDS")
+    gemini_call_timeout_seconds: float = Field(default=30.0, env="GEMINI_CALL_TIMEOUT_SECONDS")
+    gemini_stream_timeout_seconds: float = Field(default=120.0, env="GEMINI_STREAM_TIMEOUT_SECONDS")
+    gemini_retry_attempts: int = Field(default=3, env="GEMINI_RETRY_ATTEMPTS")
+    gemini_retry_base_delay_seconds: float = Field(default=0.5, env="GEMINI_RETRY_BASE_DELAY_SECONDS")
+    gemini_retry_max_delay_seconds: float = Field(default=8.0, env="GEMINI_RETRY_MAX_DELAY_SECONDS")
+    gemini_retry_status_codes: list[int] = Field(default=[429, 500, 502, 503, 504], env="GEMINI_RETRY_STATUS_CODES")
+    gemini_circuit_failure_threshold: int = Field(default=5, env="GEMINI_CIRCUIT_FAILURE_THRESHOLD")
+    gemini_circuit_reset_seconds: float = Field(default=30.0, env="GEMINI_CIRCUIT_RESET_SECONDS")
+    llm_cache_backend: str = Field(default="memory", env="LLM_CACHE_BACKEND")
+    llm_cache_ttl_seconds: int = Field(default=3600, env="LLM_CACHE_TTL_SECONDS")
+    llm_cache_max_bytes: int = Field(default=16 * 1024 * 1024, env="LLM_CACHE_MAX_BYTES")
+    llm_cache_evict_interval_seconds: float = Field(default=30.0, env="LLM_CACHE_EVICT_INTERVAL_SECONDS")
+    idempotency_ttl_seconds: int = Field(default=600, env="IDEMPOTENCY_TTL_SECONDS")
+    idempotency_max_entries: int = Field(default=10000, env="IDEMPOTENCY_MAX_ENTRIES")
+    health_check_timeout_seconds: float = Field(default=1.0, env="HEALTH_CHECK_TIMEOUT_SECONDS")
+    health_cache_seconds: float = Field(default=2.0, env="HEALTH_CACHE_SECONDS")
+    health_pool_saturation_threshold: float = Field(default=0.9, env="HEALTH_POOL_SATURATION_THRESHOLD")
+    sql_profiling: bool = Field(default=False, env="SQL_PROFILING")
+    sql_profiling_admin_emails: list[str] = Field(default=[], env="SQL_PROFILING_ADMIN_EMAILS")
+    sql_profiling_repeat_threshold: int = Field(default=3, env="SQL_PROFILING_REPEAT_THRESHOLD")
+    sql_profiling_max_traces: int = Field(default=100, env="SQL_PROFILING_MAX_TRACES")
+    gazetteer_path: str = Field(
+        default=str(Path(__file__).resolve().parent / "data" / "municipios.bin"), env="GAZETTEER_PATH"
+    )
+    # o arquivo incluído só tem as 27 capitais; "canonicalize" e "strict" pedem o arquivo completo do IBGE
+    gazetteer_validation: str = Field(default="off", env="GAZETTEER_VALIDATION")
+    generation_workers: int = Field(default=0, env="GENERATION_WORKERS")
+    generation_worker_poll_seconds: float = Field(default=1.0, env="GENERATION_WORKER_POLL_SECONDS")
+    generation_job_timeout_seconds: int = Field(default=300, env="GENERATION_JOB_TIMEOUT_SECONDS")
+    generation_job_max_attempts: int = Field(default=3, env="GENERATION_JOB_MAX_ATTEMPTS")
 
     @validator("cors_allowed_origins", pre=True)
     def split_cors_origins(cls, value):
@@ -23,10 +87,34 @@ class Settings(BaseSettings):
             return [origin.strip() for origin in value.split(",") if origin.strip()]
         return value
 
+    @validator("database_read_urls", pre=True)
+    def split_database_read_urls(cls, value):
+        if isinstance(value, str):
+            return [url.strip() for url in value.split(",") if url.strip()]
+        return value
+
+    @validator("sql_profiling_admin_emails", pre=True)
+    def split_profiling_admin_emails(cls, value):
+        if isinstance(value, str):
+            value = value.split(",")
+        return [email.strip().lower() for email in value if email.strip()]
+
+    @validator("gemini_retry_status_codes", pre=True)
+    def split_retry_status_codes(cls, value):
+        if isinstance(value, str):
+            return [int(code.strip()) for code in value.split(",") if code.strip()]
+        return value
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
 
+        @classmethod
+        def parse_env_var(cls, field_name: str, raw_val: str):
+            if field_name in COMMA_SEPARATED_FIELDS:
+                return raw_val
+            return cls.json_loads(raw_val)
+
 
 settings = Settings()
 
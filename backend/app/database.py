@@ -1,19 +1,247 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import asyncio
+import itertools
+import logging
+import math
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, AsyncIterator
+
+from sqlalchemy import ColumnElement, Integer, any_, bindparam, create_engine, event
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 
 from .config import settings
+from .services.metrics import instrument_engine
+from .services.sql_profile import current_sql_profile
+
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+psycopg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def _async_database_url(database_url: str) -> URL:
+    url = make_url(database_url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        return url
+    return url.set(drivername=driver)
+
+
+def _engine_options(database_url: str) -> dict[str, Any]:
+    options: dict[str, Any] = {"pool_pre_ping": True}
+    if make_url(database_url).get_backend_name() == "sqlite":
+        return options
+
+    options.update(
+        pool_size=settings.database_pool_size,
+        max_overflow=settings.database_max_overflow,
+        pool_recycle=settings.database_pool_recycle_seconds,
+        pool_timeout=settings.database_pool_timeout_seconds,
+    )
+    if settings.database_statement_timeout_ms:
+        options["connect_args"] = {"options": f"-c statement_timeout={settings.database_statement_timeout_ms}"}
+    return options
 
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
+engine = create_engine(settings.database_url, **_engine_options(settings.database_url))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_engine(
+    _async_database_url(settings.database_url), **_engine_options(settings.database_url)
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+def _profile_before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if current_sql_profile.get() is not None:
+        conn.info["profile_query_started"] = time.perf_counter()
+
+
+def _profile_after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info.pop("profile_query_started", None)
+    profile = current_sql_profile.get()
+    if started is not None and profile is not None:
+        profile.record(statement, time.perf_counter() - started)
+
+
+def attach_sql_profiler(sync_engine: Any) -> None:
+    event.listen(sync_engine, "before_cursor_execute", _profile_before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _profile_after_cursor_execute)
+
+
+instrument_engine(engine, "primary_sync")
+instrument_engine(async_engine.sync_engine, "primary")
+attach_sql_profiler(engine)
+attach_sql_profiler(async_engine.sync_engine)
+
 Base = declarative_base()
 
+logger = logging.getLogger(__name__)
+
+
+class ReadReplicaRouter:
+    def __init__(self, urls: list[str], retry_seconds: float) -> None:
+        self._retry_seconds = retry_seconds
+        self._engines = [create_async_engine(_async_database_url(url), **_engine_options(url)) for url in urls]
+        for index, replica in enumerate(self._engines):
+            instrument_engine(replica.sync_engine, f"replica{index}")
+            attach_sql_profiler(replica.sync_engine)
+        self._factories = [
+            async_sessionmaker(replica, autoflush=False, expire_on_commit=False) for replica in self._engines
+        ]
+        self._down_until = [0.0] * len(self._factories)
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def __bool__(self) -> bool:
+        return bool(self._factories)
+
+    def _candidates(self) -> list[int]:
+        now = time.monotonic()
+        start = next(self._counter)
+        total = len(self._factories)
+        indexes = [(start + offset) % total for offset in range(total)]
+        return [index for index in indexes if self._down_until[index] <= now]
+
+    def _mark_down(self, index: int, error: Exception) -> None:
+        with self._lock:
+            self._down_until[index] = time.monotonic() + self._retry_seconds
+        logger.warning("Réplica de leitura %s indisponível: %s", index, error)
+
+    async def open_session(self) -> AsyncSession | None:
+        for index in self._candidates():
+            db = self._factories[index]()
+            try:
+                # sem limite, uma réplica que não responde prenderia a leitura até o timeout do driver
+                await asyncio.wait_for(db.connection(), timeout=settings.database_replica_connect_timeout_seconds)
+            except (DBAPIError, OSError, asyncio.TimeoutError) as error:
+                await db.close()
+                self._mark_down(index, error)
+                continue
+            return db
+        return None
+
+    async def dispose(self) -> None:
+        for replica in self._engines:
+            await replica.dispose()
+
+
+read_replicas = ReadReplicaRouter(settings.database_read_urls, settings.database_replica_retry_seconds)
+
+READ_YOUR_WRITES_COOKIE = "primary_reads"
+
+
+@dataclass
+class ReadYourWrites:
+    # pinned: a requisição trouxe o cookie de uma escrita recente; wrote: esta requisição gravou algo
+    pinned: bool = False
+    wrote: bool = False
+
+    def cookie(self) -> str:
+        max_age = math.ceil(settings.database_read_your_writes_seconds)
+        return f"{READ_YOUR_WRITES_COOKIE}=1; Max-Age={max_age}; Path=/; HttpOnly; SameSite=Lax"
 
-def get_db():
-    db = SessionLocal()
-    try:
+
+current_read_your_writes: ContextVar[ReadYourWrites | None] = ContextVar("current_read_your_writes", default=None)
+
+# cópia local da janela, para clientes que não devolvem cookies; só vale dentro deste processo
+_last_writes: dict[int, float] = {}
+_last_writes_lock = threading.Lock()
+LAST_WRITES_PRUNE_SIZE = 10000
+
+
+def _collect_written_users(session: Session, flush_context: Any) -> None:
+    user_ids = session.info.setdefault("written_user_ids", set())
+    for instance in itertools.chain(session.new, session.dirty, session.deleted):
+        user_id = getattr(instance, "user_id", None)
+        if user_id is not None:
+            user_ids.add(user_id)
+
+
+def _record_user_writes(session: Session) -> None:
+    user_ids = session.info.pop("written_user_ids", None)
+    if not user_ids:
+        return
+
+    state = current_read_your_writes.get()
+    if state is not None:
+        state.wrote = True
+
+    now = time.monotonic()
+    with _last_writes_lock:
+        for user_id in user_ids:
+            _last_writes[user_id] = now
+        if len(_last_writes) > LAST_WRITES_PRUNE_SIZE:
+            expired_before = now - settings.database_read_your_writes_seconds
+            for user_id in [key for key, value in _last_writes.items() if value < expired_before]:
+                del _last_writes[user_id]
+
+
+def _discard_user_writes(session: Session) -> None:
+    session.info.pop("written_user_ids", None)
+
+
+def mark_user_write(db: AsyncSession | Session, user_id: int) -> None:
+    # escritas em lote (Core) não passam pelo after_flush, então são anotadas à mão
+    session = db.sync_session if isinstance(db, AsyncSession) else db
+    session.info.setdefault("written_user_ids", set()).add(user_id)
+
+
+def id_in(db: AsyncSession | Session, column: Any, ids: list[int]) -> ColumnElement[bool]:
+    # no PostgreSQL, "= ANY(:ids)" envia a lista como um único array e mantém o mesmo texto de SQL
+    # para qualquer tamanho de lote; nos demais bancos, IN comum
+    if db.get_bind().dialect.name == "postgresql":
+        return column == any_(bindparam(None, value=list(ids), type_=ARRAY(Integer)))
+    return column.in_(ids)
+
+
+def wrote_recently(user_id: int) -> bool:
+    last_write = _last_writes.get(user_id)
+    return last_write is not None and time.monotonic() - last_write < settings.database_read_your_writes_seconds
+
+
+WRITE_TRACKING_EVENTS = (
+    ("after_flush", _collect_written_users),
+    ("after_commit", _record_user_writes),
+    ("after_rollback", _discard_user_writes),
+)
+
+
+def track_user_writes() -> None:
+    for name, listener in WRITE_TRACKING_EVENTS:
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
+
+
+if read_replicas:
+    track_user_writes()
+
+
+async def get_db() -> AsyncIterator[AsyncSession]:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
+
+def _pinned_to_primary() -> bool:
+    state = current_read_your_writes.get()
+    return state is not None and state.pinned
+
+
+async def open_read_session(user_id: int | None = None) -> AsyncSession:
+    if read_replicas and not _pinned_to_primary() and (user_id is None or not wrote_recently(user_id)):
+        db = await read_replicas.open_session()
+        if db is not None:
+            return db
+    return AsyncSessionLocal()
+
+
+async def dispose_engines() -> None:
+    await async_engine.dispose()
+    await read_replicas.dispose()
@@ -1,18 +1,26 @@
+from typing import AsyncIterator
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from . import models, schemas
-from .database import get_db
+from .database import AsyncSessionLocal, get_db, open_read_session
 from .security import decode_access_token
+from .services.principal_cache import UserPrincipal, principal_cache
+from .services.sql_profile import is_profiling_admin, mark_profile_principal
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-) -> models.User:
+async def get_current_principal(token: str = Depends(oauth2_scheme)) -> UserPrincipal:
+    cached = principal_cache.get(token)
+    if cached is not None:
+        mark_profile_principal(cached.id, cached.email)
+        return cached
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -27,9 +35,50 @@ def get_current_user(
     if email is None:
         raise credentials_exception
 
-    user = db.query(models.User).filter(models.User.email == email).first()
+    user_id = payload.get("uid")
+    if user_id is not None:
+        # id e e-mail vêm assinados no token, então não há o que consultar; rotas que precisam da
+        # linha do usuário usam get_current_user, que responde 401 se ela não existir mais
+        principal = UserPrincipal(id=user_id, email=email)
+    else:
+        # tokens emitidos antes do "uid": o id sai do banco e a consulta fica no cache por
+        # AUTH_CACHE_TTL_SECONDS, o limite de tempo em que uma mudança feita em outro processo não é vista
+        statement = select(models.User.id, models.User.email).where(models.User.email == email).limit(1)
+        # sessão própria e curta: a conexão não fica presa até o fim da requisição
+        async with AsyncSessionLocal() as db:
+            user = (await db.execute(statement)).first()
+        if user is None:
+            raise credentials_exception
+        principal = UserPrincipal(id=user.id, email=user.email)
+
+    principal_cache.set(token, principal, payload["exp"])
+    mark_profile_principal(principal.id, principal.email)
+    return principal
+
+
+async def get_admin_principal(principal: UserPrincipal = Depends(get_current_principal)) -> UserPrincipal:
+    # administradores são os e-mails de SQL_PROFILING_ADMIN_EMAILS, conferidos a cada requisição
+    if not is_profiling_admin(principal.email):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acesso restrito a administradores.")
+    return principal
+
+
+async def get_current_user(
+    principal: UserPrincipal = Depends(get_current_principal), db: AsyncSession = Depends(get_db)
+) -> models.User:
+    user = await db.get(models.User, principal.id)
     if user is None:
-        raise credentials_exception
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
 
     return user
 
+
+async def get_read_db(
+    principal: UserPrincipal = Depends(get_current_principal),
+) -> AsyncIterator[AsyncSession]:
+    async with await open_read_session(principal.id) as db:
+        yield db
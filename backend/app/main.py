@@ -1,6 +1,14 @@
+from contextlib import asynccontextmanager
+import asyncio
+import time
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy import text
+from fastapi.responses import PlainTextResponse
+from starlette.datastructures import MutableHeaders
+from starlette.requests import cookie_parser
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import sys
 from pathlib import Path
 
@@ -16,64 +24,169 @@ def _extend_sys_path() -> None:
 
 _extend_sys_path()
 
-from . import models
 from .config import settings
-from .database import Base, engine
-from .routers import ai, auth, cities, route_plans
-
-
-
-def _ensure_city_role_column() -> None:
-    with engine.connect() as connection:
-        connection.execute(text("ALTER TABLE IF EXISTS cities ADD COLUMN IF NOT EXISTS role VARCHAR(20)"))
-        connection.execute(text("ALTER TABLE IF EXISTS cities ALTER COLUMN role SET DEFAULT 'intermediate'"))
-        connection.execute(text("UPDATE cities SET role = 'intermediate' WHERE role IS NULL"))
-        connection.execute(text("ALTER TABLE IF EXISTS cities ALTER COLUMN role SET NOT NULL"))
-        constraint_exists = connection.execute(
-            text(
-                """
-                SELECT 1
-                FROM information_schema.check_constraints
-                WHERE constraint_name = 'ck_city_role'
-                LIMIT 1
-                """
-            )
-        ).scalar()
-        if not constraint_exists:
-            connection.execute(
-                text(
-                    """
-                    ALTER TABLE cities
-                    ADD CONSTRAINT ck_city_role
-                    CHECK (role IN ('origin','destination','intermediate'))
-                    """
-                )
-            )
-        connection.commit()
+from .database import READ_YOUR_WRITES_COOKIE, ReadYourWrites, current_read_your_writes, dispose_engines
+from .migrate import verify_schema_version
+from .security import shutdown_password_executor
+from .services import metrics
+from .services.sql_profile import (
+    PROFILE_HEADER,
+    SQLProfile,
+    current_sql_profile,
+    log_repeated_queries,
+    profile_store,
+)
+from .services.gemini import warm_up_gemini
+from .routers import ai, auth, cities, debug, health, route_plans
+from .worker import start_workers
+
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        in_flight = metrics.http_requests_in_flight.labels(method)
+        db_stats = metrics.RequestDBStats()
+        token = metrics.request_db_stats.set(db_stats)
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_flight.dec()
+            metrics.request_db_stats.reset(token)
+
+            # o template da rota (ex.: /api/routes/{route_id}) mantém a cardinalidade baixa
+            route = scope.get("route")
+            template = getattr(route, "path", UNMATCHED_ROUTE)
+            metrics.http_request_duration_seconds.labels(method, template, str(status_code)).observe(elapsed)
+            metrics.http_request_db_queries.labels(template).observe(db_stats.queries)
+            metrics.http_request_db_seconds.labels(template).observe(db_stats.seconds)
+
+
+class SQLProfilingMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        requested = next((value for name, value in scope["headers"] if name == PROFILE_HEADER), None)
+        if requested is None and not settings.sql_profiling:
+            await self.app(scope, receive, send)
+            return
+
+        profile = SQLProfile(scope["method"], scope["path"], trace=requested == b"trace")
+        token = current_sql_profile.set(profile)
+        started = time.perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            # o cabeçalho só é devolvido com o modo global ligado ou para administradores
+            if message["type"] == "http.response.start" and (settings.sql_profiling or profile.admin):
+                profile.status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", profile.server_timing(time.perf_counter() - started))
+                if profile.trace and profile.admin:
+                    headers["X-SQL-Profile-Id"] = profile_store.add(profile)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            profile.total_seconds = time.perf_counter() - started
+            current_sql_profile.reset(token)
+            log_repeated_queries(profile)
+
+
+class ReadYourWritesMiddleware:
+    """Leva a janela de leitura no primário num cookie, para que valha em qualquer processo da API."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        cookie_header = next((value for name, value in scope["headers"] if name == b"cookie"), b"")
+        state = ReadYourWrites(pinned=READ_YOUR_WRITES_COOKIE in cookie_parser(cookie_header.decode("latin-1")))
+        token = current_read_your_writes.set(state)
+
+        async def send_with_cookie(message: Message) -> None:
+            # escritas feitas depois do início da resposta (ex.: fim de um stream) ficam só na janela local
+            if message["type"] == "http.response.start" and state.wrote:
+                MutableHeaders(scope=message).append("Set-Cookie", state.cookie())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            current_read_your_writes.reset(token)
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    await verify_schema_version()
+    if settings.gemini_warmup:
+        await run_in_threadpool(warm_up_gemini)
+
+    stop_event = asyncio.Event()
+    workers = start_workers(settings.generation_workers, stop_event)
+
+    yield
+
+    stop_event.set()
+    await asyncio.gather(*workers, return_exceptions=True)
+    shutdown_password_executor()
+    await dispose_engines()
 
 
 def create_app() -> FastAPI:
-    app = FastAPI(title="Orquestrador Rotas LLM")
-
-    _ensure_city_role_column()
-    Base.metadata.create_all(bind=engine)
+    app = FastAPI(title="Orquestrador Rotas LLM", lifespan=_lifespan)
 
+    app.add_middleware(ReadYourWritesMiddleware)
+    app.add_middleware(SQLProfilingMiddleware)
+    app.add_middleware(MetricsMiddleware)
     app.add_middleware(
         CORSMiddleware,
         allow_origins=settings.cors_allowed_origins,
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "ETag", "Server-Timing", "X-SQL-Profile-Id"],
     )
 
     app.include_router(auth.router)
     app.include_router(cities.router)
     app.include_router(ai.router)
     app.include_router(route_plans.router)
+    app.include_router(health.router)
+    app.include_router(debug.router)
 
-    @app.get("/api/health", tags=["health"])
-    async def health_check():
-        return {"status": "ok"}
+    @app.get("/metrics", tags=["health"], response_class=PlainTextResponse, include_in_schema=False)
+    async def read_metrics():
+        return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
     return app
 
@@ -0,0 +1,101 @@
+import argparse
+
+from sqlalchemy import or_
+
+from . import models
+from .database import SessionLocal
+from .services.data_versions import bump_versions
+from .services.route_stats import rebuild_route_stats
+from .services.route_values import parse_route_values
+
+
+def backfill_route_values(batch_size: int, reparse: bool = False) -> int:
+    updated = 0
+    last_id = 0
+
+    while True:
+        with SessionLocal() as db:
+            query = db.query(models.RoutePlan).filter(models.RoutePlan.id > last_id)
+            if not reparse:
+                query = query.filter(
+                    models.RoutePlan.distance_km_value.is_(None),
+                    models.RoutePlan.travel_time_minutes.is_(None),
+                    models.RoutePlan.cost_brl_cents.is_(None),
+                    models.RoutePlan.estimated_spend_brl_cents.is_(None),
+                )
+            batch = (
+                query.filter(
+                    or_(
+                        models.RoutePlan.distance_km.isnot(None),
+                        models.RoutePlan.travel_time.isnot(None),
+                        models.RoutePlan.cost_brl.isnot(None),
+                        models.RoutePlan.estimated_spend_brl.isnot(None),
+                    )
+                )
+                .order_by(models.RoutePlan.id.asc())
+                .limit(batch_size)
+                .all()
+            )
+            if not batch:
+                break
+
+            for route in batch:
+                values = parse_route_values(
+                    {
+                        "distance_km": route.distance_km,
+                        "travel_time": route.travel_time,
+                        "cost_brl": route.cost_brl,
+                        "estimated_spend_brl": route.estimated_spend_brl,
+                    }
+                )
+                for field, value in values.items():
+                    setattr(route, field, value)
+
+            bump_versions(db, {route.user_id for route in batch}, "routes")
+            db.commit()
+            updated += len(batch)
+            last_id = batch[-1].id
+            print(f"{updated} rotas processadas (último id {last_id}).")
+
+    if updated:
+        # distância e gasto entram nos agregados, que foram montados com as colunas numéricas ainda vazias
+        with SessionLocal() as db:
+            buckets = rebuild_route_stats(db)
+        print(f"Estatísticas recalculadas: {buckets} agregados gravados.")
+    return updated
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Comandos de manutenção do backend.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    backfill = subparsers.add_parser(
+        "backfill-route-values",
+        help="Preenche as colunas numéricas das rotas a partir dos textos retornados pela IA.",
+    )
+    backfill.add_argument("--batch-size", type=int, default=500)
+    backfill.add_argument(
+        "--reparse",
+        action="store_true",
+        help="Converte de novo também as rotas que já têm valores numéricos (após mudanças no parser).",
+    )
+
+    rebuild = subparsers.add_parser(
+        "rebuild-route-stats",
+        help="Recalcula a tabela route_plan_stats a partir de route_plans.",
+    )
+    rebuild.add_argument("--user-id", type=int, default=None)
+
+    args = parser.parse_args()
+
+    if args.command == "backfill-route-values":
+        total = backfill_route_values(args.batch_size, args.reparse)
+        print(f"Backfill concluído: {total} rotas atualizadas.")
+    elif args.command == "rebuild-route-stats":
+        with SessionLocal() as db:
+            buckets = rebuild_route_stats(db, args.user_id)
+        print(f"Estatísticas recalculadas: {buckets} agregados gravados.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import argparse
+import logging
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.engine import Connection
+
+from .database import async_engine, engine
+from .migrations import LATEST_VERSION, MIGRATIONS
+from .migrations.operations import is_postgresql
+
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_LOCK_ID = 7_351_042_015
+MIGRATION_LOCK_TIMEOUT = "10s"
+
+schema_metadata = MetaData()
+
+schema_version = Table(
+    "schema_version",
+    schema_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(255), nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+)
+
+
+class SchemaVersionError(RuntimeError):
+    pass
+
+
+def current_version(connection: Connection) -> int:
+    if not inspect(connection).has_table(schema_version.name):
+        return 0
+    return connection.execute(select(func.max(schema_version.c.version))).scalar() or 0
+
+
+def upgrade(target: int | None = None) -> list[int]:
+    applied: list[int] = []
+
+    with engine.connect() as connection:
+        postgresql = is_postgresql(connection)
+        if postgresql:
+            # evita que dois processos apliquem as mesmas migrações ao mesmo tempo
+            connection.execute(text("SELECT pg_advisory_lock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
+            connection.execute(text(f"SET lock_timeout = '{MIGRATION_LOCK_TIMEOUT}'"))
+            connection.commit()
+
+        try:
+            schema_metadata.create_all(connection)
+            version = current_version(connection)
+            connection.commit()
+
+            for migration in MIGRATIONS:
+                if migration.VERSION <= version or (target is not None and migration.VERSION > target):
+                    continue
+
+                logger.info("Aplicando migração %04d: %s", migration.VERSION, migration.DESCRIPTION)
+                try:
+                    migration.upgrade(connection)
+                    connection.execute(
+                        schema_version.insert().values(
+                            version=migration.VERSION, description=migration.DESCRIPTION
+                        )
+                    )
+                    connection.commit()
+                except Exception:
+                    connection.rollback()
+                    raise
+                applied.append(migration.VERSION)
+        finally:
+            if postgresql:
+                connection.execute(text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
+                connection.commit()
+
+    return applied
+
+
+async def verify_schema_version() -> int:
+    async with async_engine.connect() as connection:
+        version = await connection.run_sync(current_version)
+
+    if version < LATEST_VERSION:
+        raise SchemaVersionError(
+            f"Banco de dados na versão {version} do esquema, mas a aplicação requer a versão {LATEST_VERSION}. "
+            "Execute `python -m app.migrate` antes de iniciar a API."
+        )
+    if version > LATEST_VERSION:
+        logger.warning(
+            "Banco de dados na versão %s do esquema, mais nova que a esperada (%s).", version, LATEST_VERSION
+        )
+    return version
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Aplica as migrações pendentes do banco de dados.")
+    parser.add_argument("--target", type=int, default=None, help="Versão máxima a aplicar.")
+    parser.add_argument("--status", action="store_true", help="Apenas mostra a versão atual do esquema.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.status:
+        with engine.connect() as connection:
+            print(f"Versão do esquema: {current_version(connection)} (mais recente: {LATEST_VERSION})")
+        return
+
+    applied = upgrade(args.target)
+    if applied:
+        print(f"Migrações aplicadas: {', '.join(str(version) for version in applied)}.")
+    else:
+        print("Nenhuma migração pendente.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+from . import (
+    m0001_initial_schema,
+    m0002_city_role,
+    m0003_route_plan_values,
+    m0004_background_tables,
+    m0005_user_data_versions,
+    m0006_validate_city_role,
+)
+
+
+MIGRATIONS = [
+    m0001_initial_schema,
+    m0002_city_role,
+    m0003_route_plan_values,
+    m0004_background_tables,
+    m0005_user_data_versions,
+    m0006_validate_city_role,
+]
+
+LATEST_VERSION = MIGRATIONS[-1].VERSION
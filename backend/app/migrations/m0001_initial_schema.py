@@ -0,0 +1,71 @@
+from sqlalchemy import (
+    CheckConstraint,
+    Column,
+    Date,
+    DateTime,
+    ForeignKey,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    UniqueConstraint,
+    func,
+)
+from sqlalchemy.engine import Connection
+
+from .operations import create_tables
+
+
+VERSION = 1
+DESCRIPTION = "Tabelas iniciais de usuários, cidades e rotas"
+
+# definições congeladas: a migração cria o schema desta versão, não o dos modelos atuais
+metadata = MetaData()
+
+users = Table(
+    "users",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("email", String(255), unique=True, index=True, nullable=False),
+    Column("hashed_password", String(255), nullable=False),
+    Column("full_name", String(255), nullable=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+)
+
+cities = Table(
+    "cities",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String(120), nullable=False),
+    Column("state", String(2), nullable=False),
+    Column("role", String(20), nullable=False, server_default="intermediate"),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+    UniqueConstraint("user_id", "name", "state", name="uq_city_user_name_state"),
+    CheckConstraint("role IN ('origin','destination','intermediate')", name="ck_city_role"),
+)
+
+route_plans = Table(
+    "route_plans",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True),
+    Column("itinerary", String(255), nullable=False),
+    Column("travel_date", Date, nullable=True),
+    Column("distance_km", String(64), nullable=True),
+    Column("travel_time", String(64), nullable=True),
+    Column("cost_brl", String(64), nullable=True),
+    Column("trip_type", String(64), nullable=True),
+    Column("transport_type", String(64), nullable=True),
+    Column("lodging", String(64), nullable=True),
+    Column("food", String(64), nullable=True),
+    Column("activity", String(64), nullable=True),
+    Column("estimated_spend_brl", String(64), nullable=True),
+    Column("summary", String(2048), nullable=True),
+    Column("csv_row", String(1024), nullable=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+)
+
+
+def upgrade(connection: Connection) -> None:
+    create_tables(connection, users, cities, route_plans)
@@ -0,0 +1,37 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+from .operations import add_column_if_missing, is_postgresql
+
+
+VERSION = 2
+DESCRIPTION = "Papel das cidades (origem, destino, intermediária)"
+
+
+def upgrade(connection: Connection) -> None:
+    # default constante no ADD COLUMN evita reescrever a tabela e dispensa o UPDATE
+    added = add_column_if_missing(
+        connection, "cities", "role", "VARCHAR(20) NOT NULL DEFAULT 'intermediate'"
+    )
+    if not is_postgresql(connection):
+        return
+
+    if not added:
+        nullable = next(
+            column["nullable"] for column in inspect(connection).get_columns("cities") if column["name"] == "role"
+        )
+        connection.execute(text("ALTER TABLE cities ALTER COLUMN role SET DEFAULT 'intermediate'"))
+        if nullable:
+            connection.execute(text("UPDATE cities SET role = 'intermediate' WHERE role IS NULL"))
+            connection.execute(text("ALTER TABLE cities ALTER COLUMN role SET NOT NULL"))
+
+    constraints = {item["name"] for item in inspect(connection).get_check_constraints("cities")}
+    if "ck_city_role" not in constraints:
+        # NOT VALID só segura o ACCESS EXCLUSIVE pelo tempo do ALTER; a validação fica para a migração 0006,
+        # em outra transação, com um lock que não bloqueia leituras e escritas
+        connection.execute(
+            text(
+                "ALTER TABLE cities ADD CONSTRAINT ck_city_role "
+                "CHECK (role IN ('origin','destination','intermediate')) NOT VALID"
+            )
+        )
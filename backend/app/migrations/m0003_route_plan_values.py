@@ -0,0 +1,65 @@
+from sqlalchemy import Column, DateTime, Float, Index, Integer, MetaData, Table
+from sqlalchemy.engine import Connection
+
+from .operations import add_column_if_missing, create_index_concurrently_if_missing
+
+
+VERSION = 3
+DESCRIPTION = "Colunas numéricas e índices de paginação das rotas"
+
+# só as colunas que os índices usam, congeladas como estavam nesta versão
+route_plans = Table(
+    "route_plans",
+    MetaData(),
+    Column("id", Integer, primary_key=True),
+    Column("user_id", Integer, nullable=False),
+    Column("created_at", DateTime(timezone=True), nullable=False),
+    Column("distance_km_value", Float),
+    Column("cost_brl_cents", Integer),
+    Column("estimated_spend_brl_cents", Integer),
+)
+
+# no PostgreSQL os índices são criados com CONCURRENTLY, para não bloquear escritas em tabelas grandes
+ROUTE_PLAN_INDEXES = (
+    Index(
+        "ix_route_plans_user_created_id",
+        route_plans.c.user_id,
+        route_plans.c.created_at.desc(),
+        route_plans.c.id.desc(),
+        postgresql_concurrently=True,
+    ),
+    Index(
+        "ix_route_plans_user_distance",
+        route_plans.c.user_id,
+        route_plans.c.distance_km_value,
+        route_plans.c.id,
+        postgresql_concurrently=True,
+    ),
+    Index(
+        "ix_route_plans_user_cost",
+        route_plans.c.user_id,
+        route_plans.c.cost_brl_cents,
+        route_plans.c.id,
+        postgresql_concurrently=True,
+    ),
+    Index(
+        "ix_route_plans_user_spend",
+        route_plans.c.user_id,
+        route_plans.c.estimated_spend_brl_cents,
+        route_plans.c.id,
+        postgresql_concurrently=True,
+    ),
+)
+
+
+def upgrade(connection: Connection) -> None:
+    for column, definition in (
+        ("distance_km_value", "DOUBLE PRECISION"),
+        ("travel_time_minutes", "INTEGER"),
+        ("cost_brl_cents", "INTEGER"),
+        ("estimated_spend_brl_cents", "INTEGER"),
+    ):
+        add_column_if_missing(connection, "route_plans", column, definition)
+
+    for index in ROUTE_PLAN_INDEXES:
+        create_index_concurrently_if_missing(connection, index)
@@ -0,0 +1,118 @@
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    CheckConstraint,
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    Text,
+    func,
+    text,
+)
+from sqlalchemy.engine import Connection
+
+from .operations import create_tables, is_postgresql
+
+
+VERSION = 4
+DESCRIPTION = "Estatísticas de rotas, cache de respostas da IA e fila de geração"
+
+metadata = MetaData()
+
+# referência mínima para as chaves estrangeiras; a tabela em si vem da migração 0001
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+route_plan_stats = Table(
+    "route_plan_stats",
+    metadata,
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+    Column("dimension", String(20), primary_key=True),
+    Column("bucket", String(64), primary_key=True),
+    Column("route_count", Integer, nullable=False, server_default="0"),
+    Column("distance_count", Integer, nullable=False, server_default="0"),
+    Column("distance_km_total", Float, nullable=False, server_default="0"),
+    Column("spend_count", Integer, nullable=False, server_default="0"),
+    Column("spend_cents_total", BigInteger, nullable=False, server_default="0"),
+)
+
+llm_response_cache = Table(
+    "llm_response_cache",
+    metadata,
+    Column("key", String(64), primary_key=True),
+    Column("model_name", String(120), nullable=False),
+    Column("value", Text, nullable=False),
+    Column("size_bytes", Integer, nullable=False),
+    Column("expires_at", DateTime(timezone=True), nullable=False, index=True),
+    Column("last_accessed_at", DateTime(timezone=True), nullable=False, index=True),
+)
+
+generation_jobs = Table(
+    "generation_jobs",
+    metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True),
+    Column("message", String(4000), nullable=False),
+    Column("status", String(20), nullable=False, server_default="pending", index=True),
+    Column("attempts", Integer, nullable=False, server_default="0"),
+    Column("response", Text, nullable=True),
+    Column("route_ids", JSON, nullable=True),
+    Column("error", String(1024), nullable=True),
+    Column("created_at", DateTime(timezone=True), server_default=func.now(), nullable=False),
+    Column("started_at", DateTime(timezone=True), nullable=True),
+    Column("finished_at", DateTime(timezone=True), nullable=True),
+    CheckConstraint("status IN ('pending','running','succeeded','failed')", name="ck_generation_job_status"),
+)
+
+UNDEFINED_BUCKET = "indefinido"
+POPULATE_ROUTE_STATS = """
+INSERT INTO route_plan_stats (
+    user_id, dimension, bucket, route_count, distance_count, distance_km_total, spend_count, spend_cents_total
+)
+SELECT user_id, :dimension, {bucket}, COUNT(*), COUNT(distance_km_value), COALESCE(SUM(distance_km_value), 0),
+       COUNT(estimated_spend_brl_cents), COALESCE(SUM(estimated_spend_brl_cents), 0)
+FROM route_plans
+GROUP BY user_id, {bucket}
+"""
+
+
+def _route_stats_label(value: str | None) -> str:
+    # mesma normalização de route_stats._label, congelada aqui para a migração não mudar com o serviço
+    normalized = " ".join((value or "").split()).lower()
+    return normalized[:64] or UNDEFINED_BUCKET
+
+
+def _bucket_expressions(connection: Connection) -> dict[str, str]:
+    if is_postgresql(connection):
+        label = "COALESCE(NULLIF(LEFT(LOWER(BTRIM(REGEXP_REPLACE({column}, '\\s+', ' ', 'g'))), 64), ''), 'indefinido')"
+        month = "COALESCE(TO_CHAR(travel_date, 'YYYY-MM'), 'indefinido')"
+    else:
+        # o lower() do SQLite só conhece ASCII ("Ônibus" ficaria com a maiúscula), então o rótulo vem do Python
+        connection.connection.driver_connection.create_function(
+            "route_stats_label", 1, _route_stats_label, deterministic=True
+        )
+        label = "route_stats_label({column})"
+        month = "COALESCE(strftime('%Y-%m', travel_date), 'indefinido')"
+
+    return {
+        "total": "''",
+        "transport_type": label.format(column="transport_type"),
+        "trip_type": label.format(column="trip_type"),
+        "month": month,
+    }
+
+
+def _populate_route_stats(connection: Connection) -> None:
+    # as rotas existentes entram nos agregados; sem isso /api/routes/stats começaria zerado
+    connection.execute(text("DELETE FROM route_plan_stats"))
+    for dimension, bucket in _bucket_expressions(connection).items():
+        connection.execute(text(POPULATE_ROUTE_STATS.format(bucket=bucket)), {"dimension": dimension})
+
+
+def upgrade(connection: Connection) -> None:
+    create_tables(connection, route_plan_stats, llm_response_cache, generation_jobs)
+    _populate_route_stats(connection)
@@ -0,0 +1,25 @@
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer, MetaData, Table
+from sqlalchemy.engine import Connection
+
+from .operations import create_tables
+
+
+VERSION = 5
+DESCRIPTION = "Versões por usuário das listas de cidades e rotas"
+
+metadata = MetaData()
+
+# referência mínima para a chave estrangeira; a tabela em si vem da migração 0001
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+user_data_versions = Table(
+    "user_data_versions",
+    metadata,
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True),
+    Column("cities_version", BigInteger, nullable=False, server_default="0"),
+    Column("routes_version", BigInteger, nullable=False, server_default="0"),
+)
+
+
+def upgrade(connection: Connection) -> None:
+    create_tables(connection, user_data_versions)
@@ -0,0 +1,23 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from .operations import is_postgresql
+
+
+VERSION = 6
+DESCRIPTION = "Validação da restrição de papel das cidades"
+
+
+def upgrade(connection: Connection) -> None:
+    if not is_postgresql(connection):
+        return
+
+    # roda depois do commit da 0002: VALIDATE só pede SHARE UPDATE EXCLUSIVE enquanto varre a tabela
+    pending = connection.execute(
+        text(
+            "SELECT 1 FROM pg_constraint "
+            "WHERE conrelid = 'cities'::regclass AND conname = 'ck_city_role' AND NOT convalidated"
+        )
+    ).first()
+    if pending:
+        connection.execute(text("ALTER TABLE cities VALIDATE CONSTRAINT ck_city_role"))
@@ -0,0 +1,67 @@
+from contextlib import contextmanager
+from typing import Iterator
+
+from sqlalchemy import Index, Table, inspect, text
+from sqlalchemy.engine import Connection
+
+
+def is_postgresql(connection: Connection) -> bool:
+    return connection.dialect.name == "postgresql"
+
+
+def create_tables(connection: Connection, *tables: Table) -> None:
+    for table in tables:
+        table.create(connection, checkfirst=True)
+
+
+def column_names(connection: Connection, table_name: str) -> set[str]:
+    return {column["name"] for column in inspect(connection).get_columns(table_name)}
+
+
+def add_column_if_missing(connection: Connection, table_name: str, column_name: str, definition: str) -> bool:
+    if column_name in column_names(connection, table_name):
+        return False
+
+    connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {definition}"))
+    return True
+
+
+def create_index_if_missing(connection: Connection, index: Index) -> None:
+    existing = {item["name"] for item in inspect(connection).get_indexes(index.table.name)}
+    if index.name not in existing:
+        index.create(connection)
+
+
+@contextmanager
+def autocommit_block(connection: Connection) -> Iterator[None]:
+    # confirma o que a migração já fez e roda o bloco fora de transação, como exige o CONCURRENTLY
+    connection.commit()
+    connection.execution_options(isolation_level="AUTOCOMMIT")
+    try:
+        yield
+    finally:
+        connection.execution_options(isolation_level=connection.default_isolation_level)
+
+
+def _is_invalid_postgresql_index(connection: Connection, index_name: str) -> bool:
+    statement = text(
+        "SELECT NOT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+        "WHERE c.relname = :name AND pg_table_is_visible(c.oid)"
+    )
+    return bool(connection.execute(statement, {"name": index_name}).scalar())
+
+
+def create_index_concurrently_if_missing(connection: Connection, index: Index) -> None:
+    """No PostgreSQL, cria o índice sem bloquear escritas na tabela; nos demais bancos, cria como de costume.
+
+    O índice deve ser declarado com ``postgresql_concurrently=True``.
+    """
+    if not is_postgresql(connection):
+        create_index_if_missing(connection, index)
+        return
+
+    with autocommit_block(connection):
+        # um CONCURRENTLY interrompido deixa o índice inválido: ele é refeito em vez de contar como existente
+        if _is_invalid_postgresql_index(connection, index.name):
+            connection.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index.name}"))
+        create_index_if_missing(connection, index)
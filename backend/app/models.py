@@ -1,12 +1,18 @@
 from datetime import datetime
 
-from sqlalchemy import Column, Date, DateTime, ForeignKey, Integer, String, UniqueConstraint, CheckConstraint
+from sqlalchemy import JSON, BigInteger, Column, Date, DateTime, Float, ForeignKey, Index, Integer, String, Text, UniqueConstraint, CheckConstraint
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
 from .database import Base
 
 
+# no SQLite, CURRENT_TIMESTAMP grava o texto sem microssegundos; os parâmetros precisam sair no mesmo
+# formato, senão a comparação de texto dos cursores de paginação coloca "10:00:00" antes de "10:00:00.000000"
+CreatedAt = DateTime(timezone=True).with_variant(sqlite.DATETIME(truncate_microseconds=True), "sqlite")
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -14,7 +20,7 @@ class User(Base):
     email = Column(String(255), unique=True, index=True, nullable=False)
     hashed_password = Column(String(255), nullable=False)
     full_name = Column(String(255), nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    created_at = Column(CreatedAt, server_default=func.now(), nullable=False)
 
     cities = relationship(
         "City",
@@ -45,7 +51,7 @@ class City(Base):
     state = Column(String(2), nullable=False)
     role = Column(String(20), nullable=False, server_default="intermediate")
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    created_at = Column(CreatedAt, server_default=func.now(), nullable=False)
 
     user = relationship("User", back_populates="cities")
 
@@ -66,9 +72,78 @@ class RoutePlan(Base):
     food = Column(String(64), nullable=True)
     activity = Column(String(64), nullable=True)
     estimated_spend_brl = Column(String(64), nullable=True)
+    distance_km_value = Column(Float, nullable=True)
+    travel_time_minutes = Column(Integer, nullable=True)
+    cost_brl_cents = Column(Integer, nullable=True)
+    estimated_spend_brl_cents = Column(Integer, nullable=True)
     summary = Column(String(2048), nullable=True)
     csv_row = Column(String(1024), nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    created_at = Column(CreatedAt, server_default=func.now(), nullable=False)
 
     user = relationship("User", back_populates="route_plans")
 
+
+Index(
+    "ix_route_plans_user_created_id",
+    RoutePlan.user_id,
+    RoutePlan.created_at.desc(),
+    RoutePlan.id.desc(),
+)
+Index("ix_route_plans_user_distance", RoutePlan.user_id, RoutePlan.distance_km_value, RoutePlan.id)
+Index("ix_route_plans_user_cost", RoutePlan.user_id, RoutePlan.cost_brl_cents, RoutePlan.id)
+Index("ix_route_plans_user_spend", RoutePlan.user_id, RoutePlan.estimated_spend_brl_cents, RoutePlan.id)
+
+
+
+class RoutePlanStat(Base):
+    __tablename__ = "route_plan_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    dimension = Column(String(20), primary_key=True)
+    bucket = Column(String(64), primary_key=True)
+    route_count = Column(Integer, nullable=False, server_default="0")
+    distance_count = Column(Integer, nullable=False, server_default="0")
+    distance_km_total = Column(Float, nullable=False, server_default="0")
+    spend_count = Column(Integer, nullable=False, server_default="0")
+    spend_cents_total = Column(BigInteger, nullable=False, server_default="0")
+
+
+class UserDataVersion(Base):
+    __tablename__ = "user_data_versions"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    cities_version = Column(BigInteger, nullable=False, server_default="0")
+    routes_version = Column(BigInteger, nullable=False, server_default="0")
+
+
+class LLMCacheEntry(Base):
+    __tablename__ = "llm_response_cache"
+
+    key = Column(String(64), primary_key=True)
+    model_name = Column(String(120), nullable=False)
+    value = Column(Text, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    last_accessed_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+
+class GenerationJob(Base):
+    __tablename__ = "generation_jobs"
+    __table_args__ = (
+        CheckConstraint(
+            "status IN ('pending','running','succeeded','failed')",
+            name="ck_generation_job_status",
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    message = Column(String(4000), nullable=False)
+    status = Column(String(20), nullable=False, server_default="pending", index=True)
+    attempts = Column(Integer, nullable=False, server_default="0")
+    response = Column(Text, nullable=True)
+    route_ids = Column(JSON, nullable=True)
+    error = Column(String(1024), nullable=True)
+    created_at = Column(CreatedAt, server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -1,18 +1,35 @@
-from datetime import date
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from functools import partial
+import hashlib
 import json
+import logging
 import re
-from typing import Any, Iterable
+from typing import Any, AsyncIterator
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import models, schemas
-from ..database import get_db
-from ..dependencies import get_current_user
-from ..services.gemini import get_gemini_service
+from ..config import settings
+from ..database import AsyncSessionLocal, get_db, open_read_session
+from ..dependencies import UserPrincipal, get_admin_principal, get_current_principal
+from ..services.data_versions import bump_data_version
+from ..services.gemini import GeminiService, GeminiUnavailableError, get_gemini_service
+from ..services.json_stream import ChatStreamParser
+from ..services.llm_cache import LLMResponseCache, build_cache_key, get_llm_cache
+from ..services.route_optimizer import OrderedRoute, group_cities, order_route
+from ..services.route_stats import apply_route_stats
+from ..services.route_values import parse_route_values
+from ..services.singleflight import IdempotencyStore, SingleFlight
 
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/ai", tags=["ai"])
 
 
@@ -25,6 +42,25 @@ class ChatResponse(BaseModel):
     routes: list[schemas.RoutePlanRead]
 
 
+@dataclass(frozen=True)
+class JobCompletion:
+    job_id: int
+    attempt: int
+
+
+class JobSupersededError(RuntimeError):
+    pass
+
+
+class CacheStatsResponse(BaseModel):
+    enabled: bool
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    size_bytes: int = 0
+
+
 ROUTE_FIELDS = [
     "distance_km",
     "travel_time",
@@ -68,23 +104,6 @@ def _build_csv_row(route: dict[str, Any]) -> str:
     return ";".join(values)
 
 
-def _group_cities(cities: Iterable[models.City]) -> tuple[models.City | None, models.City | None, list[models.City]]:
-    origin = None
-    destination = None
-    intermediates: list[models.City] = []
-
-    for city in cities:
-        role = getattr(city, "role", None) or "intermediate"
-        if role == "origin" and origin is None:
-            origin = city
-        elif role == "destination" and destination is None:
-            destination = city
-        else:
-            intermediates.append(city)
-
-    return origin, destination, intermediates
-
-
 def _format_city(city: models.City | None) -> str:
     if not city:
         return "Não definida"
@@ -97,6 +116,12 @@ def _format_intermediates(intermediates: list[models.City]) -> str:
     return ", ".join(f"{city.name}-{city.state}" for city in intermediates)
 
 
+def _format_ordered_route(ordered: OrderedRoute[models.City]) -> str:
+    stops = [_format_city(ordered.stops[0])]
+    stops += [f"{_format_city(city)} ({leg:.0f} km)" for city, leg in zip(ordered.stops[1:], ordered.legs_km)]
+    return " → ".join(stops)
+
+
 def _format_routes_block(route_plans: list[models.RoutePlan]) -> str:
     if not route_plans:
         return "Nenhuma rota planejada previamente."
@@ -128,17 +153,33 @@ def _build_prompt(
     destination: models.City,
     intermediates: list[models.City],
     existing_routes: list[models.RoutePlan],
+    ordered: OrderedRoute[models.City] | None = None,
 ) -> str:
     origin_block = _format_city(origin)
     destination_block = _format_city(destination)
-    intermediate_block = _format_intermediates(intermediates)
+    intermediate_block = _format_intermediates([*ordered.stops[1:-1], *ordered.skipped] if ordered else intermediates)
     planned_routes_block = _format_routes_block(existing_routes)
 
+    # sem coordenadas da origem ou do destino, a ordem fica a cargo do modelo como antes
+    order_block = ""
+    if ordered and len(ordered.stops) > 2:
+        order_block = (
+            "Ordem das paradas que minimiza a distância em linha reta, já calculada "
+            f"(total {ordered.total_km:.0f} km): {_format_ordered_route(ordered)}.\n"
+            "Siga essa ordem no itinerário e use essas distâncias como base, somando o acréscimo das estradas.\n"
+        )
+        if ordered.skipped:
+            order_block += (
+                f"Sem coordenadas, ficaram fora dessa ordem: {_format_intermediates(ordered.skipped)}. "
+                "Encaixe essas cidades onde fizer mais sentido no percurso.\n"
+            )
+
     return (
         "Você atua como um planejador de rotas turísticas.\n"
         f"Cidade de origem definida pelo usuário: {origin_block}.\n"
         f"Cidade de destino definida pelo usuário: {destination_block}.\n"
         f"Cidades intermediárias cadastradas: {intermediate_block}.\n"
+        f"{order_block}"
         "Histórico de rotas planejadas anteriormente (mais recentes primeiro):\n"
         f"{planned_routes_block}\n"
         "Analise esse histórico e utilize-o como referência para responder ao novo pedido.\n"
@@ -154,18 +195,16 @@ def _build_prompt(
     )
 
 
-@router.post("/chat", response_model=ChatResponse)
-def chat_with_gemini(
-    payload: ChatRequest,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
-):
+async def _load_chat_context(
+    db: AsyncSession, user_id: int
+) -> tuple[models.City, models.City, list[models.City], list[models.RoutePlan]]:
     cities = (
-        db.query(models.City)
-        .filter(models.City.user_id == current_user.id)
-        .order_by(models.City.created_at.asc())
-        .all()
-    )
+        await db.scalars(
+            select(models.City)
+            .where(models.City.user_id == user_id)
+            .order_by(models.City.created_at.asc())
+        )
+    ).all()
 
     if not cities:
         raise HTTPException(
@@ -173,7 +212,7 @@ def chat_with_gemini(
             detail="Cadastre pelo menos uma cidade antes de solicitar uma rota.",
         )
 
-    origin, destination, intermediates = _group_cities(cities)
+    origin, destination, intermediates = group_cities(cities)
 
     if not origin or not destination:
         raise HTTPException(
@@ -182,30 +221,47 @@ def chat_with_gemini(
         )
 
     existing_routes = (
-        db.query(models.RoutePlan)
-        .filter(models.RoutePlan.user_id == current_user.id)
-        .order_by(models.RoutePlan.created_at.desc())
-        .limit(10)
-        .all()
-    )
-
-    prompt = _build_prompt(payload.message, origin, destination, intermediates, existing_routes)
-
-    try:
-        gemini = get_gemini_service()
-        raw_text = gemini.generate_text(prompt)
-        parsed = _clean_json_payload(raw_text)
-    except RuntimeError as error:
-        raise HTTPException(
-            status_code=status.HTTP_502_BAD_GATEWAY,
-            detail=str(error),
+        await db.scalars(
+            select(models.RoutePlan)
+            .where(models.RoutePlan.user_id == user_id)
+            .order_by(models.RoutePlan.created_at.desc())
+            .limit(10)
         )
+    ).all()
+
+    return origin, destination, intermediates, existing_routes
+
+
+async def _complete_job(
+    db: AsyncSession, job: JobCompletion, response: str | None, route_ids: list[int]
+) -> bool:
+    # a tentativa funciona como fencing token: se a tarefa foi retomada por outro worker
+    # depois de ser considerada travada, esta gravação não pode concluí-la
+    result = await db.execute(
+        update(models.GenerationJob)
+        .where(
+            models.GenerationJob.id == job.job_id,
+            models.GenerationJob.status == "running",
+            models.GenerationJob.attempts == job.attempt,
+        )
+        .values(
+            status="succeeded",
+            response=response,
+            route_ids=route_ids,
+            error=None,
+            finished_at=datetime.now(timezone.utc),
+        )
+    )
+    return result.rowcount == 1
 
-    routes_payload = []
-    routes_data = parsed.get("routes") or []
-    if not routes_data:
-        return ChatResponse(response=parsed.get("message", raw_text), routes=[])
 
+async def _persist_routes(
+    db: AsyncSession,
+    user_id: int,
+    routes_data: list[dict[str, Any]],
+    job: JobCompletion | None = None,
+    response: str | None = None,
+) -> list[schemas.RoutePlanRead]:
     created_routes: list[models.RoutePlan] = []
 
     for route in routes_data:
@@ -218,7 +274,7 @@ def chat_with_gemini(
             parsed_travel_date = date.today()
 
         model = models.RoutePlan(
-            user_id=current_user.id,
+            user_id=user_id,
             itinerary=itinerary,
             travel_date=parsed_travel_date,
             distance_km=route.get("distance_km"),
@@ -232,18 +288,342 @@ def chat_with_gemini(
             estimated_spend_brl=route.get("estimated_spend_brl"),
             summary=route.get("summary"),
             csv_row=_build_csv_row(route),
+            **parse_route_values(route),
         )
 
         db.add(model)
         created_routes.append(model)
 
-    db.commit()
+    await db.run_sync(apply_route_stats, created_routes, 1)
+    if created_routes:
+        await bump_data_version(db, user_id, "routes")
+    if job is not None:
+        # rotas e conclusão da tarefa na mesma transação: uma queda entre as duas não duplica rotas
+        await db.flush()
+        if not await _complete_job(db, job, response, [model.id for model in created_routes]):
+            await db.rollback()
+            raise JobSupersededError(f"Tarefa {job.job_id} retomada por outro worker.")
+    await db.commit()
+
+    # o id volta no INSERT e os demais campos da resposta foram definidos aqui, então não há refresh
+    return [schemas.RoutePlanRead.from_orm(model) for model in created_routes]
+
+
+async def _persist_routes_in_new_session(
+    user_id: int,
+    routes_data: list[dict[str, Any]],
+    job: JobCompletion | None = None,
+    response: str | None = None,
+) -> list[schemas.RoutePlanRead]:
+    async with AsyncSessionLocal() as db:
+        return await _persist_routes(db, user_id, routes_data, job, response)
+
+
+async def _load_chat_context_in_new_session(
+    user_id: int,
+) -> tuple[models.City, models.City, list[models.City], list[models.RoutePlan]]:
+    async with AsyncSessionLocal() as db:
+        return await _load_chat_context(db, user_id)
+
+
+async def _load_chat_context_in_read_session(
+    user_id: int,
+) -> tuple[models.City, models.City, list[models.City], list[models.RoutePlan]]:
+    # a sessão é fechada antes da chamada ao Gemini, devolvendo a conexão ao pool
+    # durante os segundos de espera; a gravação usa outra transação curta
+    async with await open_read_session(user_id) as db:
+        return await _load_chat_context(db, user_id)
+
+
+async def _read_cached_response(cache: LLMResponseCache | None, cache_key: str) -> str | None:
+    if cache is None:
+        return None
+    try:
+        return await cache.aget(cache_key)
+    except Exception:
+        # o cache é uma otimização: se falhar, o pedido segue direto para o Gemini
+        logger.warning("Falha ao ler o cache de respostas do LLM.", exc_info=True)
+        return None
+
+
+async def _store_cached_response(
+    cache: LLMResponseCache | None, cache_key: str, raw_text: str, model_name: str
+) -> None:
+    if cache is None:
+        return
+    try:
+        await cache.aset(cache_key, raw_text, model_name)
+    except Exception:
+        # a resposta do Gemini já foi obtida; perder a gravação no cache não pode virar erro para o usuário
+        logger.warning("Falha ao gravar a resposta do LLM no cache.", exc_info=True)
+
+
+def _sse_event(event: str, data: dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+async def _single_chunk(text: str) -> AsyncIterator[str]:
+    yield text
+
+
+async def _chat_event_stream(
+    user_id: int,
+    message: str,
+    context: tuple[models.City, models.City, list[models.City], list[models.RoutePlan]],
+    gemini: GeminiService,
+    cache: LLMResponseCache | None,
+    cache_key: str,
+) -> AsyncIterator[str]:
+    origin, destination, intermediates, existing_routes = context
+    parser = ChatStreamParser()
+    routes_sent = False
+
+    try:
+        cached_text = await _read_cached_response(cache, cache_key)
+        if cached_text is not None:
+            chunks = _single_chunk(cached_text)
+        else:
+            ordered = await run_in_threadpool(order_route, origin, destination, intermediates)
+            prompt = _build_prompt(message, origin, destination, intermediates, existing_routes, ordered)
+            chunks = gemini.stream_text_async(prompt)
+
+        async for chunk in chunks:
+            for kind, value in parser.feed(chunk):
+                if kind == "message":
+                    yield _sse_event("message", {"delta": value})
+                elif kind == "routes":
+                    routes_payload = await _persist_routes_in_new_session(user_id, value or [])
+                    routes_sent = True
+                    yield _sse_event("routes", {"routes": [route.dict() for route in routes_payload]})
+
+        parsed = _clean_json_payload(parser.text)
+        if not routes_sent:
+            routes_payload = await _persist_routes_in_new_session(user_id, parsed.get("routes") or [])
+            yield _sse_event("routes", {"routes": [route.dict() for route in routes_payload]})
+
+        if cached_text is None:
+            await _store_cached_response(cache, cache_key, parser.text, gemini.model_name)
+    except RuntimeError as error:
+        yield _sse_event("error", {"detail": str(error)})
+        return
+
+    response = parsed.get("message") or "Planejamento gerado com sucesso."
+    yield _sse_event("done", {"response": response})
+
+
+async def _generate_chat_response(
+    user_id: int,
+    message: str,
+    context: tuple[models.City, models.City, list[models.City], list[models.RoutePlan]],
+    gemini: GeminiService,
+    cache: LLMResponseCache | None,
+    cache_key: str,
+    job: JobCompletion | None = None,
+) -> ChatResponse:
+    origin, destination, intermediates, existing_routes = context
+
+    try:
+        raw_text = await _read_cached_response(cache, cache_key)
+        from_cache = raw_text is not None
+        if raw_text is None:
+            ordered = await run_in_threadpool(order_route, origin, destination, intermediates)
+            prompt = _build_prompt(message, origin, destination, intermediates, existing_routes, ordered)
+            raw_text = await gemini.generate_text_async(prompt)
+
+        parsed = _clean_json_payload(raw_text)
+        if not from_cache:
+            await _store_cached_response(cache, cache_key, raw_text, gemini.model_name)
+    except GeminiUnavailableError as error:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(error),
+        )
+    except RuntimeError as error:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=str(error),
+        )
+
+    routes_data = parsed.get("routes") or []
+    if not routes_data:
+        response = parsed.get("message", raw_text)
+        if job is not None:
+            await _persist_routes_in_new_session(user_id, [], job, response)
+        return ChatResponse(response=response, routes=[])
+
+    response = parsed.get("message") or "Planejamento gerado com sucesso."
+    routes_payload = await _persist_routes_in_new_session(user_id, routes_data, job, response)
+
+    return ChatResponse(response=response, routes=routes_payload)
+
+
+def _resolve_llm() -> tuple[GeminiService, LLMResponseCache | None]:
+    try:
+        return get_gemini_service(), get_llm_cache()
+    except RuntimeError as error:
+        raise HTTPException(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            detail=str(error),
+        )
+
+
+_chat_flights = SingleFlight()
+_idempotent_responses = IdempotencyStore(settings.idempotency_ttl_seconds, settings.idempotency_max_entries)
+
+
+def _request_hash(payload: BaseModel) -> str:
+    encoded = json.dumps(payload.dict(), ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def _stored_idempotent_response(user_id: int, idempotency_key: str | None, request_hash: str) -> Any | None:
+    if not idempotency_key:
+        return None
+    stored = _idempotent_responses.get((user_id, idempotency_key))
+    if stored is None:
+        return None
+
+    stored_hash, stored_response = stored
+    if stored_hash != request_hash:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key já utilizada com outro conteúdo de requisição.",
+        )
+    return stored_response
+
+
+def _remember_stream_events(user_id: int, idempotency_key: str, request_hash: str, events: list[str]) -> None:
+    # só um stream concluído é repetido; depois de um erro, a mesma chave pode tentar de novo
+    if events and events[-1].startswith("event: done"):
+        _idempotent_responses.set((user_id, idempotency_key), (request_hash, list(events)))
+
+
+async def _replay_events(events: list[str]) -> AsyncIterator[str]:
+    for event in events:
+        yield event
+
+
+@router.post("/chat", response_model=ChatResponse)
+async def chat_with_gemini(
+    payload: ChatRequest,
+    idempotency_key: str | None = Header(default=None, max_length=255),
+    current_user: UserPrincipal = Depends(get_current_principal),
+):
+    user_id = current_user.id
+
+    request_hash = _request_hash(payload)
+    stored_response = _stored_idempotent_response(user_id, idempotency_key, request_hash)
+    if stored_response is not None:
+        return stored_response
 
-    for model in created_routes:
-        db.refresh(model)
-        routes_payload.append(schemas.RoutePlanRead.from_orm(model))
+    context = await _load_chat_context_in_read_session(user_id)
+    origin, destination, intermediates, _ = context
 
-    message = parsed.get("message") or "Planejamento gerado com sucesso."
+    gemini, cache = _resolve_llm()
+    cache_key = build_cache_key(user_id, gemini.model_name, payload.message, origin, destination, intermediates)
+
+    response = await _chat_flights.do(
+        (user_id, cache_key),
+        lambda: _generate_chat_response(user_id, payload.message, context, gemini, cache, cache_key),
+    )
+
+    if idempotency_key:
+        _idempotent_responses.set((user_id, idempotency_key), (request_hash, response))
+
+    return response
+
+
+async def run_generation_job(user_id: int, message: str, job: JobCompletion) -> ChatResponse:
+    context = await _load_chat_context_in_new_session(user_id)
+    origin, destination, intermediates, _ = context
+
+    gemini, cache = _resolve_llm()
+    cache_key = build_cache_key(user_id, gemini.model_name, message, origin, destination, intermediates)
+
+    # sem coalescer com o /chat: a conclusão da tarefa vai na mesma transação das rotas desta execução
+    return await _generate_chat_response(user_id, message, context, gemini, cache, cache_key, job)
+
+
+@router.post("/chat/stream")
+async def stream_chat_with_gemini(
+    payload: ChatRequest,
+    idempotency_key: str | None = Header(default=None, max_length=255),
+    current_user: UserPrincipal = Depends(get_current_principal),
+):
+    user_id = current_user.id
+
+    request_hash = _request_hash(payload)
+    stored_events = _stored_idempotent_response(user_id, idempotency_key, request_hash)
+    if stored_events is not None:
+        return _event_stream_response(_replay_events(stored_events))
+
+    context = await _load_chat_context_in_read_session(user_id)
+    origin, destination, intermediates, _ = context
+
+    gemini, cache = _resolve_llm()
+    cache_key = build_cache_key(user_id, gemini.model_name, payload.message, origin, destination, intermediates)
+
+    # pedidos iguais em andamento acompanham a mesma chamada ao Gemini e a mesma gravação das rotas
+    shared = _chat_flights.stream(
+        ("stream", user_id, cache_key),
+        lambda: _chat_event_stream(user_id, payload.message, context, gemini, cache, cache_key),
+    )
+    if idempotency_key:
+        shared.when_done(partial(_remember_stream_events, user_id, idempotency_key, request_hash))
+
+    return _event_stream_response(shared.subscribe())
+
+
+def _event_stream_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/cache/stats", response_model=CacheStatsResponse)
+async def read_cache_stats(current_user: UserPrincipal = Depends(get_admin_principal)):
+    cache = get_llm_cache()
+    if cache is None:
+        return CacheStatsResponse(enabled=False)
+
+    stats = await run_in_threadpool(cache.stats)
+    return CacheStatsResponse(enabled=True, **stats)
+
+
+@router.post("/jobs", response_model=schemas.GenerationJobRead, status_code=status.HTTP_202_ACCEPTED)
+async def create_generation_job(
+    payload: ChatRequest,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_principal),
+):
+    job = models.GenerationJob(user_id=current_user.id, message=payload.message, status="pending")
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+
+    response.headers["Location"] = f"{router.prefix}/jobs/{job.id}"
+    return job
+
+
+@router.get("/jobs/{job_id}", response_model=schemas.GenerationJobRead)
+async def get_generation_job(
+    job_id: int,
+    response: Response,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_principal),
+):
+    job = await db.scalar(
+        select(models.GenerationJob).where(
+            models.GenerationJob.id == job_id, models.GenerationJob.user_id == current_user.id
+        )
+    )
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tarefa não encontrada.")
 
-    return ChatResponse(response=message, routes=routes_payload)
+    if job.status in ("pending", "running"):
+        response.headers["Retry-After"] = str(max(1, round(settings.generation_worker_poll_seconds)))
 
+    return job
@@ -1,21 +1,51 @@
 from datetime import timedelta
+from typing import Awaitable, TypeVar
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import models, schemas
 from ..database import get_db
-from ..security import create_access_token, get_password_hash, verify_password
-from ..dependencies import get_current_user
+from ..security import (
+    PasswordHashingBusyError,
+    create_access_token,
+    get_password_hash_async,
+    verify_and_update_password_async,
+)
+from ..dependencies import UserPrincipal, get_current_principal, get_current_user
 
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
+T = TypeVar("T")
+
+
+async def _find_user_by_email(db: AsyncSession, email: str) -> models.User | None:
+    return await db.scalar(select(models.User).where(models.User.email == email).limit(1))
+
+
+async def _save_user(db: AsyncSession, user: models.User) -> models.User:
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+
+async def _run_password_check(task: Awaitable[T]) -> T:
+    try:
+        return await task
+    except PasswordHashingBusyError as error:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(error),
+        )
+
 
 @router.post("/register", response_model=schemas.UserRead, status_code=status.HTTP_201_CREATED)
-def register_user(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
-    existing_user = db.query(models.User).filter(models.User.email == user_in.email).first()
+async def register_user(user_in: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
+    existing_user = await _find_user_by_email(db, user_in.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -25,38 +55,45 @@ def register_user(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
     user = models.User(
         email=user_in.email,
         full_name=user_in.full_name,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=await _run_password_check(get_password_hash_async(user_in.password)),
     )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
+    return await _save_user(db, user)
 
 
 @router.post("/login", response_model=schemas.Token)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    user = db.query(models.User).filter(models.User.email == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await _find_user_by_email(db, form_data.username)
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await _run_password_check(
+            verify_and_update_password_async(form_data.password, user.hashed_password)
+        )
+
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Credenciais inválidas.",
         )
 
+    if new_hash:
+        user.hashed_password = new_hash
+        await _save_user(db, user)
+
     access_token = create_access_token(
-        subject=user.email, expires_delta=timedelta(minutes=30)
+        subject=user.email, expires_delta=timedelta(minutes=30), user_id=user.id
     )
     return schemas.Token(access_token=access_token)
 
 
 @router.get("/me", response_model=schemas.UserRead)
-def read_current_user(current_user: models.User = Depends(get_current_user)):
+async def read_current_user(current_user: models.User = Depends(get_current_user)):
     return current_user
 
 
 @router.get("/home", response_model=schemas.HomeResponse)
-def read_home(current_user: models.User = Depends(get_current_user)):
+async def read_home(current_user: UserPrincipal = Depends(get_current_principal)):
     return schemas.HomeResponse(message="Home", email=current_user.email)
 
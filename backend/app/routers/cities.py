@@ -1,5 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import Hashable
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import models, schemas
 ROLE_LABELS = {
@@ -8,63 +14,92 @@ ROLE_LABELS = {
 }
 
 
-def _ensure_role_constraints(db: Session, user_id: int, role: str, *, exclude_id: int | None = None) -> None:
+async def _ensure_role_constraints(db: AsyncSession, user_id: int, role: str, *, exclude_id: int | None = None) -> None:
     if role not in ROLE_LABELS:
         return
 
-    query = (
-        db.query(models.City)
-        .filter(models.City.user_id == user_id, models.City.role == role)
-    )
+    statement = select(models.City.id).where(models.City.user_id == user_id, models.City.role == role)
 
     if exclude_id is not None:
-        query = query.filter(models.City.id != exclude_id)
+        statement = statement.where(models.City.id != exclude_id)
 
-    exists = query.first()
+    exists = (await db.execute(statement.limit(1))).first()
     if exists:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Já existe uma cidade marcada como {ROLE_LABELS[role]}.",
         )
 
-from ..database import get_db
-from ..dependencies import get_current_user
+from ..database import get_db, id_in, mark_user_write
+from ..dependencies import UserPrincipal, get_current_principal, get_read_db
+from ..services.data_versions import (
+    LIST_CACHE_CONTROL,
+    bump_data_version,
+    list_etag,
+    not_modified_response,
+    read_data_version,
+)
+from ..services.gazetteer import canonicalize_city, get_gazetteer
 
 
 router = APIRouter(prefix="/api/cities", tags=["cities"])
 
 
 @router.get("/", response_model=list[schemas.CityRead])
-def list_cities(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+async def list_cities(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_principal),
 ):
+    version = await read_data_version(db, current_user.id, "cities")
+    etag = list_etag(current_user.id, "cities", version, request)
+    not_modified = not_modified_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = LIST_CACHE_CONTROL
     cities = (
-        db.query(models.City)
-        .filter(models.City.user_id == current_user.id)
-        .order_by(models.City.created_at.desc())
-        .all()
-    )
+        await db.scalars(
+            select(models.City)
+            .where(models.City.user_id == current_user.id)
+            .order_by(models.City.created_at.desc())
+        )
+    ).all()
     return cities
 
 
+@router.get("/suggest", response_model=list[schemas.MunicipalitySuggestion])
+async def suggest_cities(
+    q: str = Query(..., min_length=1, max_length=120),
+    state: str | None = Query(default=None, min_length=2, max_length=2),
+    limit: int = Query(default=10, ge=1, le=50),
+    current_user: UserPrincipal = Depends(get_current_principal),
+):
+    gazetteer = get_gazetteer()
+    if gazetteer is None:
+        return []
+    return gazetteer.suggest(q, state.upper() if state else None, limit)
+
+
 @router.post("/", response_model=schemas.CityRead, status_code=status.HTTP_201_CREATED)
-def create_city(
+async def create_city(
     city_in: schemas.CityCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_principal),
 ):
     normalized_name = city_in.name.strip()
     normalized_state = city_in.state.strip().upper()
 
-    existing = (
-        db.query(models.City)
-        .filter(
+    existing = await db.scalar(
+        select(models.City.id)
+        .where(
             models.City.user_id == current_user.id,
             models.City.name == normalized_name,
             models.City.state == normalized_state,
         )
-        .first()
+        .limit(1)
     )
     if existing:
         raise HTTPException(
@@ -72,7 +107,7 @@ def create_city(
             detail="Cidade já cadastrada para este usuário.",
         )
 
-    _ensure_role_constraints(db, current_user.id, city_in.role)
+    await _ensure_role_constraints(db, current_user.id, city_in.role)
 
     city = models.City(
         name=normalized_name,
@@ -81,38 +116,36 @@ def create_city(
         user_id=current_user.id,
     )
     db.add(city)
-    db.commit()
-    db.refresh(city)
+    await bump_data_version(db, current_user.id, "cities")
+    await db.commit()
+    await db.refresh(city)
     return city
 
 
 @router.put("/{city_id}", response_model=schemas.CityRead)
-def update_city(
+async def update_city(
     city_id: int,
     city_in: schemas.CityUpdate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_principal),
 ):
-    city = (
-        db.query(models.City)
-        .filter(models.City.id == city_id, models.City.user_id == current_user.id)
-        .first()
+    city = await db.scalar(
+        select(models.City).where(models.City.id == city_id, models.City.user_id == current_user.id)
     )
     if not city:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cidade não encontrada.")
 
-    new_name = city_in.name.strip() if city_in.name is not None else city.name
-    new_state = city_in.state.strip().upper() if city_in.state is not None else city.state
+    new_name, new_state = _canonicalize_partial(city_in, city.name, city.state)
 
-    duplicate = (
-        db.query(models.City)
-        .filter(
+    duplicate = await db.scalar(
+        select(models.City.id)
+        .where(
             models.City.user_id == current_user.id,
             models.City.id != city.id,
             models.City.name == new_name,
             models.City.state == new_state,
         )
-        .first()
+        .limit(1)
     )
     if duplicate:
         raise HTTPException(
@@ -120,33 +153,165 @@ def update_city(
             detail="Já existe uma cidade cadastrada com este nome e UF.",
         )
 
-    if city_in.name is not None:
-        city.name = new_name
-    if city_in.state is not None:
-        city.state = new_state
+    city.name = new_name
+    city.state = new_state
     if city_in.role is not None:
-        _ensure_role_constraints(db, current_user.id, city_in.role, exclude_id=city.id)
+        await _ensure_role_constraints(db, current_user.id, city_in.role, exclude_id=city.id)
         city.role = city_in.role
 
-    db.commit()
-    db.refresh(city)
+    await bump_data_version(db, current_user.id, "cities")
+    # a sessão não expira os atributos no commit e nada é gerado pelo banco no UPDATE,
+    # então o refresh seria só mais uma ida ao banco
+    await db.commit()
     return city
 
 
 @router.delete("/{city_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_city(
+async def delete_city(
     city_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_principal),
 ):
-    city = (
-        db.query(models.City)
-        .filter(models.City.id == city_id, models.City.user_id == current_user.id)
-        .first()
+    city = await db.scalar(
+        select(models.City).where(models.City.id == city_id, models.City.user_id == current_user.id)
     )
     if not city:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cidade não encontrada.")
 
-    db.delete(city)
-    db.commit()
+    await db.delete(city)
+    await bump_data_version(db, current_user.id, "cities")
+    await db.commit()
+
+
+def _normalize_city(name: str, state: str) -> tuple[str, str]:
+    return name.strip(), state.strip().upper()
+
+
+def _canonicalize_partial(city_in: schemas.CityUpdate, name: str, state: str) -> tuple[str, str]:
+    # nome e UF juntos já chegam canônicos do schema; com só um deles, o outro vem da cidade gravada
+    if city_in.name is not None and city_in.state is not None:
+        return city_in.name, city_in.state
+    if city_in.name is None and city_in.state is None:
+        return name, state
+    try:
+        return canonicalize_city(city_in.name or name, city_in.state or state)
+    except ValueError as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc))
+
+
+def _ensure_batch_role_constraints(roles: dict[Hashable, str]) -> None:
+    for role, label in ROLE_LABELS.items():
+        if sum(1 for value in roles.values() if value == role) > 1:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Apenas uma cidade pode ser marcada como {label}.",
+            )
+
+
+@router.post("/bulk", response_model=schemas.CityBulkResult)
+async def bulk_cities(
+    payload: schemas.CityBulkRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_principal),
+):
+    user_id = current_user.id
+    # nomes repetidos no lote viram uma única linha (o último vence), como no ON CONFLICT
+    creates = {_normalize_city(item.name, item.state): item.role for item in payload.create}
+    updates = {item.id: item for item in payload.update}
+    delete_ids = set(payload.delete)
+
+    if updates.keys() & delete_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Uma cidade não pode ser alterada e removida no mesmo lote.",
+        )
+
+    # uma consulta traz as cidades com papel definido e confirma a posse das que serão alteradas
+    rows = (
+        await db.execute(
+            select(models.City.id, models.City.name, models.City.state, models.City.role).where(
+                models.City.user_id == user_id,
+                or_(models.City.role.in_(list(ROLE_LABELS)), id_in(db, models.City.id, list(updates))),
+            )
+        )
+    ).all()
+
+    if updates.keys() - {row.id for row in rows}:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cidade não encontrada.")
+
+    roles: dict[Hashable, str] = {}
+    ids_by_key: dict[tuple[str, str], int] = {}
+    current = {row.id: (row.name, row.state) for row in rows}
+    for row in rows:
+        if row.id in delete_ids:
+            continue
+        roles[row.id] = row.role
+        ids_by_key[(row.name, row.state)] = row.id
+    for item in updates.values():
+        if item.role is not None:
+            roles[item.id] = item.role
+    for key, role in creates.items():
+        roles[ids_by_key.get(key, key)] = role
+    _ensure_batch_role_constraints(roles)
+
+    changes = []
+    for item in updates.values():
+        values = item.dict(exclude_none=True, exclude={"id"})
+        if "name" in values or "state" in values:
+            values["name"], values["state"] = _canonicalize_partial(item, *current[item.id])
+        if values:
+            changes.append({"id": item.id, **values})
 
+    deleted: list[int] = []
+    updated: list[models.City] = []
+    created: list[models.City] = []
+    try:
+        if delete_ids:
+            deleted = list(
+                await db.scalars(
+                    delete(models.City)
+                    .where(models.City.user_id == user_id, id_in(db, models.City.id, list(delete_ids)))
+                    .returning(models.City.id)
+                )
+            )
+
+        if changes:
+            await db.execute(update(models.City), changes)
+        if updates:
+            updated = list(
+                await db.scalars(
+                    select(models.City)
+                    .where(models.City.user_id == user_id, id_in(db, models.City.id, list(updates)))
+                    .execution_options(populate_existing=True)
+                )
+            )
+
+        if creates:
+            insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+            statement = insert(models.City).values(
+                [
+                    {"user_id": user_id, "name": name, "state": state, "role": role}
+                    for (name, state), role in creates.items()
+                ]
+            )
+            statement = statement.on_conflict_do_update(
+                index_elements=[models.City.user_id, models.City.name, models.City.state],
+                set_={"role": statement.excluded.role},
+            ).returning(models.City)
+            created = list(await db.scalars(statement, execution_options={"populate_existing": True}))
+
+        await bump_data_version(db, user_id, "cities")
+        mark_user_write(db, user_id)
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Já existe uma cidade cadastrada com este nome e UF.",
+        )
+
+    return schemas.CityBulkResult(
+        created=[schemas.CityRead.from_orm(city) for city in created],
+        updated=[schemas.CityRead.from_orm(city) for city in updated],
+        deleted=deleted,
+    )
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from ..dependencies import UserPrincipal, get_admin_principal
+from ..services.sql_profile import profile_store
+
+
+router = APIRouter(prefix="/api/debug", tags=["debug"])
+
+
+@router.get("/sql-profiles/{profile_id}")
+async def read_sql_profile(
+    profile_id: str,
+    current_user: UserPrincipal = Depends(get_admin_principal),
+):
+    profile = profile_store.get(profile_id, current_user.id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Perfil não encontrado.")
+
+    return profile.as_dict()
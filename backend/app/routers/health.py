@@ -0,0 +1,23 @@
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+
+from ..services.health import readiness_probe
+
+
+router = APIRouter(prefix="/api/health", tags=["health"])
+
+
+@router.get("")
+@router.get("/live")
+async def liveness_check():
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def readiness_check():
+    report, cached = await readiness_probe.report()
+    return JSONResponse(
+        report.as_dict(cached),
+        status_code=status.HTTP_200_OK if report.ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        headers={"Cache-Control": "no-store"},
+    )
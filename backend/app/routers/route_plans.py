@@ -1,43 +1,437 @@
-from datetime import date
+from dataclasses import dataclass
+from datetime import date, datetime
 from io import StringIO
+from typing import Any, AsyncIterator, Literal
 
+import base64
 import csv
-from fastapi import APIRouter, Depends, HTTPException, Request, status
+import json
+import zlib
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import Row, Select, delete, func, literal, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import models, schemas
-from ..database import get_db
-from ..dependencies import get_current_user
+from ..database import get_db, id_in, mark_user_write, open_read_session
+from ..dependencies import UserPrincipal, get_current_principal, get_read_db
+from ..services.data_versions import (
+    LIST_CACHE_CONTROL,
+    bump_data_version,
+    list_etag,
+    not_modified_response,
+    read_data_version,
+)
+from ..services.gazetteer import Municipality
+from ..services.route_optimizer import group_cities, locate_cities, order_route
+from ..services.route_stats import ROUTE_STATS_COLUMNS, apply_route_stats
 
 
 router = APIRouter(prefix="/api/routes", tags=["routes"])
 
 
+ROUTE_LIST_COLUMNS = (
+    models.RoutePlan.id,
+    models.RoutePlan.itinerary,
+    models.RoutePlan.travel_date,
+    models.RoutePlan.distance_km,
+    models.RoutePlan.travel_time,
+    models.RoutePlan.cost_brl,
+    models.RoutePlan.trip_type,
+    models.RoutePlan.transport_type,
+    models.RoutePlan.distance_km_value,
+    models.RoutePlan.travel_time_minutes,
+    models.RoutePlan.cost_brl_cents,
+    models.RoutePlan.created_at,
+)
+
+
+EXPORT_COLUMNS = (
+    models.RoutePlan.id,
+    models.RoutePlan.itinerary,
+    models.RoutePlan.travel_date,
+    models.RoutePlan.distance_km,
+    models.RoutePlan.travel_time,
+    models.RoutePlan.cost_brl,
+    models.RoutePlan.trip_type,
+    models.RoutePlan.transport_type,
+    models.RoutePlan.lodging,
+    models.RoutePlan.food,
+    models.RoutePlan.activity,
+    models.RoutePlan.estimated_spend_brl,
+    models.RoutePlan.distance_km_value,
+    models.RoutePlan.travel_time_minutes,
+    models.RoutePlan.cost_brl_cents,
+    models.RoutePlan.estimated_spend_brl_cents,
+    models.RoutePlan.summary,
+    models.RoutePlan.created_at,
+)
+
+EXPORT_CSV_HEADERS = [
+    "ID",
+    "Percurso",
+    "Data da viagem",
+    "Distância",
+    "Tempo de viagem",
+    "Custo da viagem",
+    "Tipo de viagem",
+    "Tipo de transporte",
+    "Tipo de hospedagem",
+    "Tipo de alimentação",
+    "Tipo de atividade",
+    "Gasto estimado",
+    "Distância (km)",
+    "Tempo de viagem (min)",
+    "Custo da viagem (centavos)",
+    "Gasto estimado (centavos)",
+    "Resumo",
+    "Criado em",
+]
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+ROUTE_SORT_COLUMNS = {
+    "recent": models.RoutePlan.created_at,
+    "distance": models.RoutePlan.distance_km_value,
+    "cost": models.RoutePlan.cost_brl_cents,
+    "spend": models.RoutePlan.estimated_spend_brl_cents,
+}
+
+RouteSort = Literal["recent", "distance", "cost", "spend"]
+
+
+@dataclass
+class RouteFilters:
+    travel_date_from: date | None = Query(default=None)
+    travel_date_to: date | None = Query(default=None)
+    transport_type: str | None = Query(default=None, max_length=64)
+    min_distance_km: float | None = Query(default=None, ge=0)
+    max_distance_km: float | None = Query(default=None, ge=0)
+    max_cost_brl: float | None = Query(default=None, ge=0)
+    max_estimated_spend_brl: float | None = Query(default=None, ge=0)
+
+    def apply(self, query: Select) -> Select:
+        if self.travel_date_from is not None:
+            query = query.filter(models.RoutePlan.travel_date >= self.travel_date_from)
+        if self.travel_date_to is not None:
+            query = query.filter(models.RoutePlan.travel_date <= self.travel_date_to)
+        if self.transport_type:
+            query = query.filter(
+                func.lower(models.RoutePlan.transport_type) == self.transport_type.strip().lower()
+            )
+        if self.min_distance_km is not None:
+            query = query.filter(models.RoutePlan.distance_km_value >= self.min_distance_km)
+        if self.max_distance_km is not None:
+            query = query.filter(models.RoutePlan.distance_km_value <= self.max_distance_km)
+        if self.max_cost_brl is not None:
+            query = query.filter(models.RoutePlan.cost_brl_cents <= round(self.max_cost_brl * 100))
+        if self.max_estimated_spend_brl is not None:
+            query = query.filter(
+                models.RoutePlan.estimated_spend_brl_cents <= round(self.max_estimated_spend_brl * 100)
+            )
+        return query
+
+
+def _encode_cursor(sort: str, value: Any, route_id: int) -> str:
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps([sort, value, route_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort: str) -> tuple[Any, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, route_id = json.loads(base64.urlsafe_b64decode(padded))
+        if cursor_sort != sort:
+            raise ValueError("cursor de outra ordenação")
+        if sort == "recent":
+            value = datetime.fromisoformat(value)
+        return value, int(route_id)
+    except (ValueError, TypeError) as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido.") from exc
+
+
 @router.get("/", response_model=list[schemas.RoutePlanRead])
-def list_routes(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+async def list_routes(
+    request: Request,
+    response: Response,
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: str | None = Query(default=None),
+    sort: RouteSort = Query(default="recent"),
+    filters: RouteFilters = Depends(),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_principal),
 ):
-    routes = (
-        db.query(models.RoutePlan)
-        .filter(models.RoutePlan.user_id == current_user.id)
-        .order_by(models.RoutePlan.created_at.desc())
-        .all()
-    )
+    # a versão é lida antes da lista: se houver escrita no meio, o ETag fica antigo e o
+    # cliente apenas busca de novo na próxima vez
+    version = await read_data_version(db, current_user.id, "routes")
+    etag = list_etag(current_user.id, "routes", version, request)
+    not_modified = not_modified_response(request, etag)
+    if not_modified is not None:
+        return not_modified
+
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = LIST_CACHE_CONTROL
+    sort_column = ROUTE_SORT_COLUMNS[sort]
+    sort_key = tuple_(sort_column, models.RoutePlan.id)
+
+    query = select(*ROUTE_LIST_COLUMNS).where(models.RoutePlan.user_id == current_user.id)
+    query = filters.apply(query)
+
+    if sort == "recent":
+        query = query.order_by(sort_column.desc(), models.RoutePlan.id.desc())
+    else:
+        query = query.filter(sort_column.isnot(None)).order_by(sort_column.asc(), models.RoutePlan.id.asc())
+
+    if cursor:
+        cursor_value, cursor_id = _decode_cursor(cursor, sort)
+        # o valor do cursor usa o tipo da própria coluna, para sair no formato em que o banco a grava
+        cursor_key = tuple_(
+            literal(cursor_value, type_=sort_column.type), literal(cursor_id, type_=models.RoutePlan.id.type)
+        )
+        query = query.filter(sort_key < cursor_key if sort == "recent" else sort_key > cursor_key)
+
+    routes = (await db.execute(query.limit(limit + 1))).all()
+
+    if len(routes) > limit:
+        routes = routes[:limit]
+        last = routes[-1]
+        response.headers["X-Next-Cursor"] = _encode_cursor(sort, getattr(last, sort_column.key), last.id)
+
     return routes
 
 
+async def _iter_export_rows(user_id: int, filters: RouteFilters) -> AsyncIterator[Row]:
+    statement = select(*EXPORT_COLUMNS).where(models.RoutePlan.user_id == user_id)
+    statement = filters.apply(statement)
+    statement = statement.order_by(models.RoutePlan.created_at.desc(), models.RoutePlan.id.desc())
+
+    async with await open_read_session(user_id) as db:
+        result = await db.stream(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for row in result:
+            yield row
+
+
+async def _iter_csv_chunks(rows: AsyncIterator[Row]) -> AsyncIterator[str]:
+    buffer = StringIO()
+    writer = csv.writer(buffer, delimiter=';')
+    writer.writerow(EXPORT_CSV_HEADERS)
+
+    async for row in rows:
+        writer.writerow(["" if value is None else value for value in row])
+        if buffer.tell() >= EXPORT_CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+async def _iter_ndjson_chunks(rows: AsyncIterator[Row]) -> AsyncIterator[str]:
+    lines: list[str] = []
+    size = 0
+
+    async for row in rows:
+        line = json.dumps(row._asdict(), ensure_ascii=False, default=str) + "\n"
+        lines.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_SIZE:
+            yield "".join(lines)
+            lines = []
+            size = 0
+
+    yield "".join(lines)
+
+
+async def _gzip_chunks(chunks: AsyncIterator[str]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk.encode("utf-8"))
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    # "gzip;q=0" recusa o gzip e "x-gzip" é o mesmo formato (RFC 9110, 8.4.1.3); sem menção ao gzip, vale o "*"
+    weights: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        if not coding:
+            continue
+        weight = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        coding = coding.lower()
+        weights["gzip" if coding == "x-gzip" else coding] = weight
+
+    return weights.get("gzip", weights.get("*", 0.0)) > 0
+
+
+@router.get("/export")
+async def export_routes(
+    request: Request,
+    export_format: Literal["csv", "ndjson"] = Query(default="csv", alias="format"),
+    filters: RouteFilters = Depends(),
+    current_user: UserPrincipal = Depends(get_current_principal),
+):
+    rows = _iter_export_rows(current_user.id, filters)
+
+    if export_format == "ndjson":
+        chunks = _iter_ndjson_chunks(rows)
+        media_type = "application/x-ndjson; charset=utf-8"
+    else:
+        chunks = _iter_csv_chunks(rows)
+        media_type = "text/csv; charset=utf-8"
+
+    headers = {
+        "Content-Disposition": f"attachment; filename=rotas.{export_format}",
+        "Vary": "Accept-Encoding",
+    }
+    if _accepts_gzip(request.headers.get("accept-encoding", "")):
+        headers["Content-Encoding"] = "gzip"
+        return StreamingResponse(_gzip_chunks(chunks), media_type=media_type, headers=headers)
+
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
+
+def _stats_bucket(stat: models.RoutePlanStat) -> schemas.RouteStatsBucket:
+    return schemas.RouteStatsBucket(
+        key=stat.bucket,
+        count=stat.route_count,
+        distance_km_total=round(stat.distance_km_total, 3),
+        estimated_spend_brl_total=stat.spend_cents_total / 100,
+    )
+
+
+@router.get("/stats", response_model=schemas.RouteStatsRead)
+async def get_route_stats(
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_principal),
+):
+    stats = (
+        await db.scalars(select(models.RoutePlanStat).where(models.RoutePlanStat.user_id == current_user.id))
+    ).all()
+
+    total = next((stat for stat in stats if stat.dimension == "total"), None) or models.RoutePlanStat(
+        route_count=0, distance_count=0, distance_km_total=0, spend_count=0, spend_cents_total=0
+    )
+    buckets: dict[str, list[schemas.RouteStatsBucket]] = {"transport_type": [], "trip_type": [], "month": []}
+    for stat in stats:
+        if stat.dimension in buckets:
+            buckets[stat.dimension].append(_stats_bucket(stat))
+
+    buckets["transport_type"].sort(key=lambda bucket: bucket.count, reverse=True)
+    buckets["trip_type"].sort(key=lambda bucket: bucket.count, reverse=True)
+    buckets["month"].sort(key=lambda bucket: bucket.key)
+
+    return schemas.RouteStatsRead(
+        count=total.route_count,
+        distance_km_total=round(total.distance_km_total, 3),
+        distance_km_average=(
+            round(total.distance_km_total / total.distance_count, 3) if total.distance_count else None
+        ),
+        estimated_spend_brl_total=total.spend_cents_total / 100,
+        estimated_spend_brl_average=(
+            round(total.spend_cents_total / total.spend_count / 100, 2) if total.spend_count else None
+        ),
+        by_transport_type=buckets["transport_type"],
+        by_trip_type=buckets["trip_type"],
+        by_month=buckets["month"],
+    )
+
+
+@router.get("/optimize", response_model=schemas.RouteOptimizationRead)
+async def optimize_route(
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_principal),
+):
+    cities = (
+        await db.scalars(
+            select(models.City).where(models.City.user_id == current_user.id).order_by(models.City.created_at.asc())
+        )
+    ).all()
+
+    origin, destination, intermediates = group_cities(cities)
+    if not origin or not destination:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Defina cidades de origem e destino antes de otimizar a rota.",
+        )
+
+    ordered = await run_in_threadpool(order_route, origin, destination, intermediates)
+    if ordered is None:
+        return _registration_order(origin, destination, intermediates)
+
+    skipped = [_optimization_stop(city) for city in ordered.skipped]
+    return schemas.RouteOptimizationRead(
+        method=ordered.method,
+        total_km=ordered.total_km,
+        baseline_km=ordered.baseline_km,
+        stops=[
+            _optimization_stop(city, location, leg_km)
+            for city, location, leg_km in zip(ordered.stops, ordered.locations, [0.0, *ordered.legs_km])
+        ],
+        skipped=skipped,
+        warning=f"Coordenadas não encontradas para: {_city_labels(ordered.skipped)}." if skipped else None,
+    )
+
+
+def _optimization_stop(
+    city: models.City, location: Municipality | None = None, leg_km: float | None = None
+) -> schemas.RouteOptimizationStop:
+    return schemas.RouteOptimizationStop(
+        city_id=city.id,
+        name=city.name,
+        state=city.state,
+        role=city.role or "intermediate",
+        latitude=location.latitude if location else None,
+        longitude=location.longitude if location else None,
+        leg_km=leg_km,
+    )
+
+
+def _city_labels(cities: list[models.City]) -> str:
+    return ", ".join(f"{city.name}-{city.state}" for city in cities)
+
+
+def _registration_order(
+    origin: models.City, destination: models.City, intermediates: list[models.City]
+) -> schemas.RouteOptimizationRead:
+    # sem coordenadas da origem ou do destino não há o que ordenar: a rota segue a ordem de cadastro
+    cities = [origin, *intermediates, destination]
+    locations, available = locate_cities(cities)
+    if not available:
+        warning = "Base de municípios indisponível; mantida a ordem de cadastro."
+    else:
+        missing = [city for city, location in zip(cities, locations) if location is None]
+        warning = f"Coordenadas não encontradas para: {_city_labels(missing)}; mantida a ordem de cadastro."
+
+    return schemas.RouteOptimizationRead(
+        method="registration",
+        total_km=None,
+        baseline_km=None,
+        stops=[_optimization_stop(city, location) for city, location in zip(cities, locations)],
+        warning=warning,
+    )
+
+
 @router.get("/{route_id}", response_model=schemas.RoutePlanDetail)
-def get_route_detail(
+async def get_route_detail(
     route_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_principal),
 ):
-    route = (
-        db.query(models.RoutePlan)
-        .filter(models.RoutePlan.id == route_id, models.RoutePlan.user_id == current_user.id)
-        .first()
+    route = await db.scalar(
+        select(models.RoutePlan).where(models.RoutePlan.id == route_id, models.RoutePlan.user_id == current_user.id)
     )
     if not route:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Rota não encontrada.")
@@ -46,15 +440,13 @@ def get_route_detail(
 
 
 @router.get("/{route_id}/csv")
-def download_route_csv(
+async def download_route_csv(
     route_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_principal),
 ):
-    route = (
-        db.query(models.RoutePlan)
-        .filter(models.RoutePlan.id == route_id, models.RoutePlan.user_id == current_user.id)
-        .first()
+    route = await db.scalar(
+        select(models.RoutePlan).where(models.RoutePlan.id == route_id, models.RoutePlan.user_id == current_user.id)
     )
     if not route or not route.csv_row:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Arquivo não encontrado.")
@@ -87,23 +479,26 @@ def download_route_csv(
 
 
 @router.delete("/", status_code=status.HTTP_204_NO_CONTENT)
-def delete_routes(
+async def delete_routes(
     payload: schemas.RoutePlanBulkDelete,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_principal),
 ):
-    routes = (
-        db.query(models.RoutePlan)
-        .filter(models.RoutePlan.user_id == current_user.id)
-        .filter(models.RoutePlan.id.in_(payload.route_ids))
-        .all()
-    )
+    # um único DELETE ... RETURNING devolve o que os agregados precisam, sem carregar as rotas
+    deleted = (
+        await db.execute(
+            delete(models.RoutePlan)
+            .where(models.RoutePlan.user_id == current_user.id)
+            .where(id_in(db, models.RoutePlan.id, payload.route_ids))
+            .returning(*ROUTE_STATS_COLUMNS)
+        )
+    ).all()
 
-    if not routes:
+    if not deleted:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Nenhuma rota encontrada para exclusão.")
 
-    for route in routes:
-        db.delete(route)
-
-    db.commit()
+    await db.run_sync(apply_route_stats, deleted, -1)
+    await bump_data_version(db, current_user.id, "routes")
+    mark_user_write(db, current_user.id)
+    await db.commit()
 
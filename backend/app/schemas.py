@@ -1,7 +1,9 @@
 from datetime import date, datetime
 from typing import Optional, Literal
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, root_validator
+
+from .services.gazetteer import canonicalize_city
 
 
 class UserBase(BaseModel):
@@ -29,6 +31,7 @@ class Token(BaseModel):
 class TokenPayload(BaseModel):
     sub: str
     exp: int
+    uid: Optional[int] = None
 
 
 class UserLogin(BaseModel):
@@ -49,6 +52,9 @@ class RoutePlanBase(BaseModel):
     cost_brl: Optional[str]
     trip_type: Optional[str]
     transport_type: Optional[str]
+    distance_km_value: Optional[float]
+    travel_time_minutes: Optional[int]
+    cost_brl_cents: Optional[int]
 
 
 class RoutePlanRead(RoutePlanBase):
@@ -63,6 +69,7 @@ class RoutePlanDetail(RoutePlanBase):
     food: Optional[str]
     activity: Optional[str]
     estimated_spend_brl: Optional[str]
+    estimated_spend_brl_cents: Optional[int]
     summary: Optional[str]
     created_at: datetime
 
@@ -70,6 +77,60 @@ class RoutePlanDetail(RoutePlanBase):
         orm_mode = True
 
 
+class RouteStatsBucket(BaseModel):
+    key: str
+    count: int
+    distance_km_total: float
+    estimated_spend_brl_total: float
+
+
+class RouteStatsRead(BaseModel):
+    count: int
+    distance_km_total: float
+    distance_km_average: Optional[float]
+    estimated_spend_brl_total: float
+    estimated_spend_brl_average: Optional[float]
+    by_transport_type: list[RouteStatsBucket]
+    by_trip_type: list[RouteStatsBucket]
+    by_month: list[RouteStatsBucket]
+
+
+class RouteOptimizationStop(BaseModel):
+    city_id: int
+    name: str
+    state: str
+    role: str
+    latitude: Optional[float]
+    longitude: Optional[float]
+    leg_km: Optional[float]
+
+
+class RouteOptimizationRead(BaseModel):
+    method: str
+    total_km: Optional[float]
+    baseline_km: Optional[float]
+    stops: list[RouteOptimizationStop]
+    skipped: list[RouteOptimizationStop] = Field(default_factory=list)
+    warning: Optional[str] = None
+
+
+GenerationJobStatus = Literal["pending", "running", "succeeded", "failed"]
+
+
+class GenerationJobRead(BaseModel):
+    id: int
+    status: GenerationJobStatus
+    response: Optional[str]
+    route_ids: Optional[list[int]]
+    error: Optional[str]
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+    class Config:
+        orm_mode = True
+
+
 class RoutePlanBulkDelete(BaseModel):
     route_ids: list[int] = Field(..., min_items=1, description="Lista de IDs de rotas a remover")
 
@@ -84,7 +145,10 @@ class CityBase(BaseModel):
 
 
 class CityCreate(CityBase):
-    pass
+    @root_validator(skip_on_failure=True)
+    def canonicalize_name(cls, values):
+        values["name"], values["state"] = canonicalize_city(values["name"], values["state"])
+        return values
 
 
 class CityUpdate(BaseModel):
@@ -92,6 +156,13 @@ class CityUpdate(BaseModel):
     state: Optional[str] = Field(default=None, min_length=2, max_length=2)
     role: Optional[CityRole] = Field(default=None)
 
+    @root_validator(skip_on_failure=True)
+    def canonicalize_name(cls, values):
+        # com só um dos dois campos, o outro vem da cidade gravada e a rota faz a troca
+        if values.get("name") is not None and values.get("state") is not None:
+            values["name"], values["state"] = canonicalize_city(values["name"], values["state"])
+        return values
+
 
 class CityRead(CityBase):
     id: int
@@ -100,3 +171,29 @@ class CityRead(CityBase):
     class Config:
         orm_mode = True
 
+
+class CityBulkUpdate(CityUpdate):
+    id: int
+
+
+class CityBulkRequest(BaseModel):
+    create: list[CityCreate] = Field(default_factory=list, max_items=1000)
+    update: list[CityBulkUpdate] = Field(default_factory=list, max_items=1000)
+    delete: list[int] = Field(default_factory=list, max_items=1000)
+
+
+class CityBulkResult(BaseModel):
+    created: list[CityRead]
+    updated: list[CityRead]
+    deleted: list[int]
+
+
+class MunicipalitySuggestion(BaseModel):
+    ibge_code: int
+    name: str
+    state: str
+    latitude: float
+    longitude: float
+
+    class Config:
+        orm_mode = True
@@ -1,24 +1,103 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from functools import lru_cache
+from typing import Any, Callable, Optional
 
+from fastapi.concurrency import run_in_threadpool
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
 from .config import settings
 
 
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+LEGACY_PASSWORD_SCHEMES = ["pbkdf2_sha256"]
+
+
+class PasswordHashingBusyError(RuntimeError):
+    pass
+
+
+def _build_password_context(scheme: str, rounds: Optional[int]) -> CryptContext:
+    schemes = [scheme] + [legacy for legacy in LEGACY_PASSWORD_SCHEMES if legacy != scheme]
+    options: dict[str, Any] = {}
+    if rounds:
+        # min/max iguais ao padrão forçam rehash quando o custo configurado muda
+        options = {
+            f"{scheme}__default_rounds": rounds,
+            f"{scheme}__min_rounds": rounds,
+            f"{scheme}__max_rounds": rounds,
+        }
+    return CryptContext(schemes=schemes, deprecated="auto", **options)
+
+
+pwd_context = _build_password_context(settings.password_hash_scheme, settings.password_hash_rounds)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
-def create_access_token(subject: str, expires_delta: Optional[timedelta] = None) -> str:
+@lru_cache(maxsize=1)
+def _password_executor() -> Executor | None:
+    if settings.password_hash_workers <= 0:
+        return None
+
+    return ProcessPoolExecutor(
+        max_workers=settings.password_hash_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+@lru_cache(maxsize=1)
+def _password_slots() -> asyncio.Semaphore:
+    return asyncio.Semaphore(max(1, settings.password_hash_workers) + settings.password_hash_queue_limit)
+
+
+async def _run_password_task(func: Callable[..., Any], *args: Any) -> Any:
+    slots = _password_slots()
+    if slots.locked():
+        raise PasswordHashingBusyError("Muitas autenticações em andamento. Tente novamente em instantes.")
+
+    async with slots:
+        executor = _password_executor()
+        if executor is None:
+            return await run_in_threadpool(func, *args)
+        return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, Optional[str]]:
+    return await _run_password_task(verify_and_update_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_password_task(get_password_hash, password)
+
+
+def shutdown_password_executor() -> None:
+    if _password_executor.cache_info().currsize:
+        executor = _password_executor()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        _password_executor.cache_clear()
+
+
+def create_access_token(
+    subject: str,
+    expires_delta: Optional[timedelta] = None,
+    user_id: Optional[int] = None,
+) -> str:
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
     else:
@@ -27,6 +106,9 @@ def create_access_token(subject: str, expires_delta: Optional[timedelta] = None)
         )
 
     to_encode = {"sub": subject, "exp": expire}
+    if user_id is not None:
+        to_encode["uid"] = user_id
+
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm="HS256")
     return encoded_jwt
 
@@ -37,4 +119,3 @@ def decode_access_token(token: str) -> Optional[dict]:
         return payload
     except JWTError:
         return None
-
@@ -0,0 +1,71 @@
+import hashlib
+from typing import Iterable, Literal
+
+from fastapi import Request, Response, status
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from .. import models
+
+
+DataScope = Literal["cities", "routes"]
+
+LIST_CACHE_CONTROL = "private, no-cache"
+
+
+def _version_column(scope: DataScope):
+    return models.UserDataVersion.__table__.c[f"{scope}_version"]
+
+
+def bump_versions(db: Session, user_ids: Iterable[int], *scopes: DataScope) -> None:
+    user_ids = sorted(set(user_ids))
+    if not user_ids or not scopes:
+        return
+
+    insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    table = models.UserDataVersion.__table__
+    statement = insert(table).values(
+        [{"user_id": user_id, **{f"{scope}_version": 1 for scope in scopes}} for user_id in user_ids]
+    )
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[table.c.user_id],
+            set_={f"{scope}_version": _version_column(scope) + 1 for scope in scopes},
+        )
+    )
+
+
+async def bump_data_version(db: AsyncSession, user_id: int, *scopes: DataScope) -> None:
+    await db.run_sync(bump_versions, [user_id], *scopes)
+
+
+async def read_data_version(db: AsyncSession, user_id: int, scope: DataScope) -> int:
+    version = await db.scalar(select(_version_column(scope)).where(models.UserDataVersion.user_id == user_id))
+    return version or 0
+
+
+def list_etag(user_id: int, scope: DataScope, version: int, request: Request) -> str:
+    # a mesma lista com filtros ou cursores diferentes precisa de ETags diferentes
+    query = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+    variant = hashlib.blake2b(query.encode("utf-8"), digest_size=6).hexdigest()
+    return f'W/"{scope}-{user_id}-{version}-{variant}"'
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def not_modified_response(request: Request, etag: str) -> Response | None:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match or not _matches(if_none_match, etag):
+        return None
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": LIST_CACHE_CONTROL},
+    )
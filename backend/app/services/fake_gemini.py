@@ -0,0 +1,102 @@
+import asyncio
+import json
+import random
+import re
+import time
+from datetime import date, timedelta
+from types import SimpleNamespace
+from typing import Any, AsyncIterator
+
+
+_ORIGIN_PATTERN = re.compile(r"Cidade de origem definida pelo usuário: (.+?)\.\n")
+_DESTINATION_PATTERN = re.compile(r"Cidade de destino definida pelo usuário: (.+?)\.\n")
+_STREAM_CHUNK_SIZE = 24
+
+
+class FakeGenerativeModel:
+    def __init__(
+        self,
+        model_name: str,
+        *,
+        latency: float = 0.0,
+        response_text: str | None = None,
+        failure_rate: float = 0.0,
+        errors: list[Exception] | None = None,
+    ) -> None:
+        self.model_name = model_name
+        self.latency = latency
+        self.response_text = response_text
+        self.failure_rate = failure_rate
+        self.errors = errors if errors is not None else []
+        self.calls = 0
+
+    def generate_content(self, prompt: str, **kwargs: Any) -> SimpleNamespace:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        self._maybe_fail()
+        return SimpleNamespace(text=self._render(prompt))
+
+    async def generate_content_async(
+        self, prompt: str, stream: bool = False, **kwargs: Any
+    ) -> SimpleNamespace | AsyncIterator[SimpleNamespace]:
+        self.calls += 1
+        if stream:
+            self._maybe_fail()
+            return self._stream(self._render(prompt))
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self._maybe_fail()
+        return SimpleNamespace(text=self._render(prompt))
+
+    async def _stream(self, text: str) -> AsyncIterator[SimpleNamespace]:
+        chunks = [text[index : index + _STREAM_CHUNK_SIZE] for index in range(0, len(text), _STREAM_CHUNK_SIZE)]
+        for chunk in chunks:
+            if self.latency:
+                await asyncio.sleep(self.latency / len(chunks))
+            yield SimpleNamespace(text=chunk)
+
+    def _maybe_fail(self) -> None:
+        if self.errors:
+            raise self.errors.pop(0)
+        if self.failure_rate and random.random() < self.failure_rate:
+            from google.api_core.exceptions import ServiceUnavailable
+
+            raise ServiceUnavailable("Falha simulada do modelo fake.")
+
+    def _render(self, prompt: str) -> str:
+        if self.response_text is not None:
+            return self.response_text
+
+        origin = _match(_ORIGIN_PATTERN, prompt, "Origem")
+        destination = _match(_DESTINATION_PATTERN, prompt, "Destino")
+        travel_date = date.today() + timedelta(days=7)
+
+        return json.dumps(
+            {
+                "message": f"Rota direta entre {origin} e {destination}.",
+                "routes": [
+                    {
+                        "itinerary": f"{origin} → {destination}",
+                        "travel_date": travel_date.isoformat(),
+                        "distance_km": "430 km",
+                        "travel_time": "5h 30min",
+                        "cost_brl": "R$ 250,00",
+                        "trip_type": "Lazer",
+                        "transport_type": "Carro",
+                        "lodging": "Hotel",
+                        "food": "Regional",
+                        "activity": "Passeio histórico",
+                        "estimated_spend_brl": "R$ 1.200,00",
+                        "summary": "Viagem rodoviária tranquila. Paradas curtas no caminho.",
+                    }
+                ],
+            },
+            ensure_ascii=False,
+        )
+
+
+def _match(pattern: re.Pattern[str], prompt: str, default: str) -> str:
+    found = pattern.search(prompt)
+    return found.group(1) if found else default
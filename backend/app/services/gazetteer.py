@@ -0,0 +1,236 @@
+import argparse
+import csv
+import mmap
+import struct
+import unicodedata
+from bisect import bisect_left
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterator
+
+from ..config import settings
+
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+DEFAULT_SOURCE = DATA_DIR / "municipios.csv"
+
+MAGIC = b"GZT1"
+HEADER = struct.Struct("<4sII")
+# código IBGE, latitude, longitude, deslocamento e tamanho da chave e do nome no bloco de texto, UF
+RECORD = struct.Struct("<IffIIHH2s")
+
+# os dois primeiros dígitos do código IBGE identificam a UF
+UF_BY_CODE = {
+    "11": "RO",
+    "12": "AC",
+    "13": "AM",
+    "14": "RR",
+    "15": "PA",
+    "16": "AP",
+    "17": "TO",
+    "21": "MA",
+    "22": "PI",
+    "23": "CE",
+    "24": "RN",
+    "25": "PB",
+    "26": "PE",
+    "27": "AL",
+    "28": "SE",
+    "29": "BA",
+    "31": "MG",
+    "32": "ES",
+    "33": "RJ",
+    "35": "SP",
+    "41": "PR",
+    "42": "SC",
+    "43": "RS",
+    "50": "MS",
+    "51": "MT",
+    "52": "GO",
+    "53": "DF",
+}
+
+
+def normalize_name(value: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", value.casefold())
+    stripped = "".join(char if char.isalnum() else " " for char in decomposed if not unicodedata.combining(char))
+    return " ".join(stripped.split())
+
+
+@dataclass(frozen=True)
+class Municipality:
+    ibge_code: int
+    name: str
+    state: str
+    latitude: float
+    longitude: float
+
+
+class _KeyView:
+    # expõe as chaves do arquivo como uma sequência para o bisect, sem materializá-las
+    def __init__(self, gazetteer: "Gazetteer") -> None:
+        self._gazetteer = gazetteer
+
+    def __len__(self) -> int:
+        return len(self._gazetteer)
+
+    def __getitem__(self, index: int) -> bytes:
+        return self._gazetteer._key(index)
+
+
+class Gazetteer:
+    def __init__(self, path: Path) -> None:
+        with open(path, "rb") as handle:
+            self._buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self._count, self._blob_offset = HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Arquivo de municípios inválido: {path}")
+        self._keys = _KeyView(self)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _record(self, index: int) -> tuple:
+        return RECORD.unpack_from(self._buffer, HEADER.size + index * RECORD.size)
+
+    def _text(self, offset: int, length: int) -> bytes:
+        start = self._blob_offset + offset
+        return self._buffer[start : start + length]
+
+    def _key(self, index: int) -> bytes:
+        _, _, _, key_offset, _, key_length, _, _ = self._record(index)
+        return self._text(key_offset, key_length)
+
+    def _municipality(self, index: int) -> Municipality:
+        code, latitude, longitude, _, name_offset, _, name_length, state = self._record(index)
+        return Municipality(
+            ibge_code=code,
+            name=self._text(name_offset, name_length).decode("utf-8"),
+            state=state.decode("ascii"),
+            latitude=round(latitude, 5),
+            longitude=round(longitude, 5),
+        )
+
+    def _iter_prefix(self, prefix: bytes) -> Iterator[int]:
+        index = bisect_left(self._keys, prefix)
+        while index < self._count and self._key(index).startswith(prefix):
+            yield index
+            index += 1
+
+    def suggest(self, query: str, state: str | None = None, limit: int = 10) -> list[Municipality]:
+        prefix = normalize_name(query).encode("ascii", "ignore")
+        if not prefix:
+            return []
+
+        results: list[Municipality] = []
+        for index in self._iter_prefix(prefix):
+            municipality = self._municipality(index)
+            if state and municipality.state != state:
+                continue
+            results.append(municipality)
+            if len(results) >= limit:
+                break
+        return results
+
+    def find(self, name: str, state: str) -> Municipality | None:
+        key = normalize_name(name).encode("ascii", "ignore")
+        state = state.strip().upper()
+        for index in self._iter_prefix(key):
+            if self._key(index) != key:
+                break
+            municipality = self._municipality(index)
+            if municipality.state == state:
+                return municipality
+        return None
+
+
+def read_source(path: Path) -> list[Municipality]:
+    municipalities: list[Municipality] = []
+    with open(path, newline="", encoding="utf-8-sig") as handle:
+        for row in csv.DictReader(handle):
+            code = row["codigo_ibge"].strip()
+            municipalities.append(
+                Municipality(
+                    ibge_code=int(code),
+                    name=row["nome"].strip(),
+                    state=(row.get("uf") or UF_BY_CODE[code[:2]]).strip().upper(),
+                    latitude=float(row["latitude"]),
+                    longitude=float(row["longitude"]),
+                )
+            )
+    return municipalities
+
+
+def build(municipalities: list[Municipality], output: Path) -> None:
+    entries = sorted(
+        ((normalize_name(item.name).encode("ascii", "ignore"), item) for item in municipalities),
+        key=lambda entry: (entry[0], entry[1].state),
+    )
+
+    blob = bytearray()
+    records = bytearray()
+    for key, item in entries:
+        name = item.name.encode("utf-8")
+        key_offset = len(blob)
+        blob += key
+        name_offset = len(blob)
+        blob += name
+        records += RECORD.pack(
+            item.ibge_code,
+            item.latitude,
+            item.longitude,
+            key_offset,
+            name_offset,
+            len(key),
+            len(name),
+            item.state.encode("ascii"),
+        )
+
+    blob_offset = HEADER.size + len(records)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_bytes(HEADER.pack(MAGIC, len(entries), blob_offset) + records + blob)
+
+
+@lru_cache(maxsize=1)
+def get_gazetteer() -> Gazetteer | None:
+    path = Path(settings.gazetteer_path)
+    if not path.exists():
+        return None
+    return Gazetteer(path)
+
+
+def canonicalize_city(name: str, state: str) -> tuple[str, str]:
+    name, state = name.strip(), state.strip().upper()
+    mode = settings.gazetteer_validation.lower()
+    gazetteer = get_gazetteer() if mode != "off" else None
+    if gazetteer is None:
+        return name, state
+
+    municipality = gazetteer.find(name, state)
+    if municipality is not None:
+        return municipality.name, municipality.state
+    if mode == "strict":
+        raise ValueError(f"Município não encontrado: {name}-{state}.")
+    return name, state
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Gera o arquivo compacto de municípios a partir de um CSV do IBGE.")
+    parser.add_argument(
+        "--source",
+        type=Path,
+        default=DEFAULT_SOURCE,
+        help="CSV com codigo_ibge, nome, latitude, longitude e, opcionalmente, uf.",
+    )
+    parser.add_argument("--output", type=Path, default=Path(settings.gazetteer_path))
+    args = parser.parse_args()
+
+    municipalities = read_source(args.source)
+    build(municipalities, args.output)
+    print(f"{len(municipalities)} municípios gravados em {args.output} ({args.output.stat().st_size} bytes).")
+
+
+if __name__ == "__main__":
+    main()
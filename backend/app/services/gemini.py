@@ -1,32 +1,221 @@
-from functools import lru_cache
-from typing import Optional
-
-import google.generativeai as genai
-from google.api_core.exceptions import GoogleAPIError
+import asyncio
+import logging
+import sys
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterator, Optional
 
 from ..config import settings
+from .fake_gemini import FakeGenerativeModel
+from .metrics import gemini_errors, observe_llm_call
+from .resilience import CircuitBreaker, RetryPolicy
+
+
+logger = logging.getLogger(__name__)
+
+
+class GeminiUnavailableError(RuntimeError):
+    pass
+
+
+def _is_google_api_error(exc: Exception) -> bool:
+    # se o SDK ainda não foi importado, a exceção não pode ser um erro da API do Google
+    exceptions = sys.modules.get("google.api_core.exceptions")
+    return exceptions is not None and isinstance(exc, exceptions.GoogleAPIError)
 
 
 class GeminiService:
-    def __init__(self, api_key: str, model: str) -> None:
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY não configurado.")
+    def __init__(
+        self,
+        api_key: str,
+        model: str,
+        model_factory: Callable[[str], Any] | None = None,
+        *,
+        max_concurrency: int = 16,
+        queue_timeout: float = 5.0,
+        call_timeout: float = 30.0,
+        stream_timeout: float = 120.0,
+        retry_policy: RetryPolicy | None = None,
+        retry_status_codes: frozenset[int] = frozenset({429, 500, 502, 503, 504}),
+        circuit_breaker: CircuitBreaker | None = None,
+    ) -> None:
+        if model_factory is None:
+            if not api_key:
+                raise ValueError("GEMINI_API_KEY não configurado.")
+
+            import google.generativeai as genai
+
+            genai.configure(api_key=api_key)
+            model_factory = genai.GenerativeModel
 
-        genai.configure(api_key=api_key)
         self._model_name = model
+        self._model_factory = model_factory
+        self._queue_timeout = queue_timeout
+        self._call_timeout = call_timeout
+        self._stream_timeout = stream_timeout
+        self._retry_policy = retry_policy or RetryPolicy()
+        self._retry_status_codes = retry_status_codes
+        self._async_slots = asyncio.Semaphore(max_concurrency)
+        self._sync_slots = threading.BoundedSemaphore(max_concurrency)
+        self.circuit_breaker = circuit_breaker or CircuitBreaker(failure_threshold=5, reset_timeout=30.0)
+
+    @property
+    def model_name(self) -> str:
+        return self._model_name
 
     def generate_text(self, prompt: str) -> str:
-        if not prompt:
-            raise ValueError("O prompt não pode ser vazio.")
+        self._validate_prompt(prompt)
+
+        with observe_llm_call("generate", prompt) as call, self._sync_slot():
+            self._ensure_circuit_closed()
+            for attempt in range(self._retry_policy.attempts):
+                try:
+                    model = self._model_factory(self._model_name)
+                    result = model.generate_content(prompt, request_options={"timeout": self._call_timeout})
+                except Exception as exc:
+                    error, retryable = self._classify_failure(exc)
+                    if not retryable or attempt + 1 >= self._retry_policy.attempts:
+                        self._record_failure(retryable)
+                        raise error from exc
+                    time.sleep(self._retry_policy.delay(attempt))
+                    continue
+                except BaseException:
+                    self.circuit_breaker.release_probe()
+                    raise
+
+                self.circuit_breaker.record_success()
+                text = self._extract_text(result)
+                call.response_chars = len(text)
+                return text
+
+        raise RuntimeError("Falha ao processar a resposta do Gemini.")
+
+    async def generate_text_async(self, prompt: str) -> str:
+        self._validate_prompt(prompt)
+
+        with observe_llm_call("generate_async", prompt) as call:
+            async with self._async_slot():
+                result = await self._call_with_retries(lambda model: model.generate_content_async(prompt))
+
+            text = self._extract_text(result)
+            call.response_chars = len(text)
+            return text
+
+    async def stream_text_async(self, prompt: str) -> AsyncIterator[str]:
+        self._validate_prompt(prompt)
+
+        with observe_llm_call("stream", prompt) as call:
+            async with self._async_slot():
+                response = await self._call_with_retries(
+                    lambda model: model.generate_content_async(prompt, stream=True)
+                )
+
+                # o limite por chamada só cobre a abertura do stream; este cobre a leitura dos pedaços,
+                # para que um stream que para de enviar no meio não prenda a vaga de concorrência
+                deadline = asyncio.get_running_loop().time() + self._stream_timeout
+                chunks = aiter(response)
+                try:
+                    while True:
+                        remaining = deadline - asyncio.get_running_loop().time()
+                        try:
+                            chunk = await asyncio.wait_for(anext(chunks), timeout=max(remaining, 0))
+                        except StopAsyncIteration:
+                            break
+                        text: Optional[str] = getattr(chunk, "text", None)
+                        if text:
+                            call.response_chars += len(text)
+                            yield text
+                except Exception as exc:
+                    error, retryable = self._classify_failure(exc)
+                    self._record_failure(retryable)
+                    raise error from exc
+
+    async def _call_with_retries(self, call: Callable[[Any], Awaitable[Any]]) -> Any:
+        # o circuito conta chamadas lógicas: é consultado uma vez e só registra a falha depois da
+        # última tentativa, para que as retentativas de uma chamada não o abram sozinhas
+        self._ensure_circuit_closed()
+        for attempt in range(self._retry_policy.attempts):
+            try:
+                model = self._model_factory(self._model_name)
+                result = await asyncio.wait_for(call(model), timeout=self._call_timeout)
+            except Exception as exc:
+                error, retryable = self._classify_failure(exc)
+                if not retryable or attempt + 1 >= self._retry_policy.attempts:
+                    self._record_failure(retryable)
+                    raise error from exc
+                await asyncio.sleep(self._retry_policy.delay(attempt))
+                continue
+            except BaseException:
+                # cancelamento (cliente desconectou, prazo de quem chamou): sem isso a sonda do
+                # half-open ficaria presa e o circuito recusaria todas as chamadas até reiniciar
+                self.circuit_breaker.release_probe()
+                raise
+
+            self.circuit_breaker.record_success()
+            return result
+
+        raise RuntimeError("Falha ao processar a resposta do Gemini.")
+
+    def _classify_failure(self, exc: Exception) -> tuple[RuntimeError, bool]:
+        if isinstance(exc, (asyncio.TimeoutError, TimeoutError)):
+            error, retryable = RuntimeError("Tempo limite excedido ao consultar o Gemini."), True
+            gemini_errors.labels("timeout").inc()
+        elif _is_google_api_error(exc):  # erros da API do Google
+            error = RuntimeError(f"Erro ao conectar ao Gemini: {exc}")
+            retryable = getattr(exc, "code", None) in self._retry_status_codes
+            gemini_errors.labels("api").inc()
+        else:  # fallback genérico
+            error, retryable = RuntimeError("Falha ao processar a resposta do Gemini."), False
+            gemini_errors.labels("other").inc()
+
+        return error, retryable
+
+    def _record_failure(self, retryable: bool) -> None:
+        if retryable:
+            self.circuit_breaker.record_failure()
+        else:
+            # erro do próprio pedido (ex.: 4xx): não prova que o serviço voltou, então não fecha o circuito
+            self.circuit_breaker.release_probe()
+
+    def _ensure_circuit_closed(self) -> None:
+        if not self.circuit_breaker.allow_request():
+            gemini_errors.labels("circuit_open").inc()
+            raise GeminiUnavailableError("Gemini temporariamente indisponível. Tente novamente em instantes.")
+
+    @asynccontextmanager
+    async def _async_slot(self) -> AsyncIterator[None]:
+        try:
+            await asyncio.wait_for(self._async_slots.acquire(), timeout=self._queue_timeout)
+        except asyncio.TimeoutError as exc:
+            gemini_errors.labels("queue_full").inc()
+            raise GeminiUnavailableError("Muitas solicitações ao Gemini em andamento. Tente novamente.") from exc
 
         try:
-            model = genai.GenerativeModel(self._model_name)
-            result = model.generate_content(prompt)
-        except GoogleAPIError as exc:  # erros da API do Google
-            raise RuntimeError(f"Erro ao conectar ao Gemini: {exc}") from exc
-        except Exception as exc:  # fallback genérico
-            raise RuntimeError("Falha ao processar a resposta do Gemini.") from exc
+            yield
+        finally:
+            self._async_slots.release()
 
+    @contextmanager
+    def _sync_slot(self) -> Iterator[None]:
+        if not self._sync_slots.acquire(timeout=self._queue_timeout):
+            gemini_errors.labels("queue_full").inc()
+            raise GeminiUnavailableError("Muitas solicitações ao Gemini em andamento. Tente novamente.")
+
+        try:
+            yield
+        finally:
+            self._sync_slots.release()
+
+    @staticmethod
+    def _validate_prompt(prompt: str) -> None:
+        if not prompt:
+            raise ValueError("O prompt não pode ser vazio.")
+
+    @staticmethod
+    def _extract_text(result: Any) -> str:
         text: Optional[str] = getattr(result, "text", None)
         if not text:
             raise RuntimeError("Resposta vazia do Gemini.")
@@ -34,10 +223,59 @@ class GeminiService:
         return text.strip()
 
 
+def _resilience_options() -> dict[str, Any]:
+    return {
+        "max_concurrency": settings.gemini_max_concurrency,
+        "queue_timeout": settings.gemini_queue_timeout_seconds,
+        "call_timeout": settings.gemini_call_timeout_seconds,
+        "stream_timeout": settings.gemini_stream_timeout_seconds,
+        "retry_policy": RetryPolicy(
+            attempts=max(1, settings.gemini_retry_attempts),
+            base_delay=settings.gemini_retry_base_delay_seconds,
+            max_delay=settings.gemini_retry_max_delay_seconds,
+        ),
+        "retry_status_codes": frozenset(settings.gemini_retry_status_codes),
+        "circuit_breaker": CircuitBreaker(
+            failure_threshold=settings.gemini_circuit_failure_threshold,
+            reset_timeout=settings.gemini_circuit_reset_seconds,
+        ),
+    }
+
+
+def _read_fake_response() -> str | None:
+    if not settings.gemini_fake_response_file:
+        return None
+    return Path(settings.gemini_fake_response_file).read_text(encoding="utf-8")
+
+
 @lru_cache(maxsize=1)
 def get_gemini_service() -> GeminiService:
+    if settings.gemini_fake:
+        model_factory = partial(
+            FakeGenerativeModel,
+            latency=settings.gemini_fake_latency_ms / 1000,
+            failure_rate=settings.gemini_fake_failure_rate,
+            response_text=_read_fake_response(),
+        )
+        return GeminiService(
+            api_key="",
+            model=settings.gemini_model,
+            model_factory=model_factory,
+            **_resilience_options(),
+        )
+
     if not settings.gemini_api_key:
         raise RuntimeError("GEMINI_API_KEY não configurado no backend.")
 
-    return GeminiService(api_key=settings.gemini_api_key, model=settings.gemini_model)
+    return GeminiService(
+        api_key=settings.gemini_api_key,
+        model=settings.gemini_model,
+        **_resilience_options(),
+    )
+
 
+def warm_up_gemini() -> None:
+    try:
+        get_gemini_service()
+    except (RuntimeError, ValueError) as exc:
+        logger.warning("Aquecimento do Gemini ignorado: %s", exc)
@@ -0,0 +1,152 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import text
+
+from ..config import settings
+from ..database import async_engine
+from ..migrate import current_version
+from ..migrations import LATEST_VERSION
+from .gemini import get_gemini_service
+from .resilience import CircuitBreaker
+from .singleflight import SingleFlight
+
+
+@dataclass
+class CheckResult:
+    status: str
+    latency_ms: float = 0.0
+    detail: str | None = None
+    critical: bool = True
+
+
+@dataclass
+class ReadinessReport:
+    checks: dict[str, CheckResult] = field(default_factory=dict)
+    checked_at: float = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return all(check.status != "fail" for check in self.checks.values() if check.critical)
+
+    def as_dict(self, cached: bool) -> dict[str, Any]:
+        return {
+            "status": "ok" if self.ready else "fail",
+            "cached": cached,
+            "checks": {
+                name: {
+                    "status": check.status,
+                    "latency_ms": round(check.latency_ms, 2),
+                    "detail": check.detail,
+                    "critical": check.critical,
+                }
+                for name, check in self.checks.items()
+            },
+        }
+
+
+async def check_database() -> dict[str, CheckResult]:
+    # ping e versão do esquema na mesma conexão, para que cada sonda ocupe uma conexão só
+    async with async_engine.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+        try:
+            version = await connection.run_sync(current_version)
+        except Exception as exc:
+            schema = CheckResult(status="fail", detail=str(exc) or exc.__class__.__name__)
+        else:
+            if version < LATEST_VERSION:
+                schema = CheckResult(status="fail", detail=f"versão {version}, esperada {LATEST_VERSION}")
+            else:
+                schema = CheckResult(status="ok", detail=f"versão {version}")
+
+    return {"database": CheckResult(status="ok"), "schema": schema}
+
+
+async def check_pool() -> CheckResult:
+    pool = async_engine.sync_engine.pool
+    if not hasattr(pool, "size"):
+        return CheckResult(status="ok", detail="pool sem limite de conexões")
+
+    capacity = pool.size() + max(0, getattr(pool, "_max_overflow", 0))
+    in_use = pool.checkedout()
+    saturation = in_use / capacity if capacity else 0.0
+    detail = f"{in_use}/{capacity} conexões em uso"
+    if saturation >= settings.health_pool_saturation_threshold:
+        # pool cheio é sinal de carga, não de defeito: tirar o pod de circulação só empurra a carga para os outros
+        return CheckResult(status="degraded", detail=detail)
+    return CheckResult(status="ok", detail=detail)
+
+
+async def check_gemini() -> CheckResult:
+    # não cria o serviço aqui para não importar o SDK só por causa da sonda
+    if not settings.gemini_fake and not settings.gemini_api_key:
+        return CheckResult(status="fail", detail="GEMINI_API_KEY não configurado")
+
+    if get_gemini_service.cache_info().currsize == 0:
+        return CheckResult(status="ok", detail="cliente ainda não inicializado")
+
+    state = get_gemini_service().circuit_breaker.state
+    status = "ok" if state == CircuitBreaker.CLOSED else "degraded"
+    return CheckResult(status=status, detail=f"circuito {state}")
+
+
+def _single(name: str, check: Callable[[], Awaitable[CheckResult]]) -> Callable[[], Awaitable[dict[str, CheckResult]]]:
+    async def run() -> dict[str, CheckResult]:
+        return {name: await check()}
+
+    return run
+
+
+# cada grupo roda sob o mesmo limite de tempo e, se falhar por inteiro, todas as suas verificações falham
+READINESS_CHECKS: list[tuple[tuple[str, ...], Callable[[], Awaitable[dict[str, CheckResult]]]]] = [
+    (("database", "schema"), check_database),
+    (("pool",), _single("pool", check_pool)),
+    (("gemini",), _single("gemini", check_gemini)),
+]
+
+# o Gemini fora do ar ou o pool cheio não devem tirar o pod de circulação: as demais rotas continuam funcionando
+NON_CRITICAL_CHECKS = {"gemini", "pool"}
+
+
+async def _timed(
+    names: tuple[str, ...], check: Callable[[], Awaitable[dict[str, CheckResult]]]
+) -> dict[str, CheckResult]:
+    started = time.perf_counter()
+    try:
+        results = await asyncio.wait_for(check(), timeout=settings.health_check_timeout_seconds)
+    except asyncio.TimeoutError:
+        results = {name: CheckResult(status="fail", detail="tempo limite excedido") for name in names}
+    except Exception as exc:
+        results = {name: CheckResult(status="fail", detail=str(exc) or exc.__class__.__name__) for name in names}
+    latency_ms = (time.perf_counter() - started) * 1000
+    for result in results.values():
+        result.latency_ms = latency_ms
+    return results
+
+
+class ReadinessProbe:
+    def __init__(self, ttl_seconds: float) -> None:
+        self._ttl_seconds = ttl_seconds
+        self._report: ReadinessReport | None = None
+        self._flight = SingleFlight()
+
+    async def report(self) -> tuple[ReadinessReport, bool]:
+        report = self._report
+        if report is not None and time.monotonic() - report.checked_at < self._ttl_seconds:
+            return report, True
+
+        # sondas simultâneas compartilham a mesma rodada de verificações
+        return await self._flight.do("ready", self._refresh), False
+
+    async def _refresh(self) -> ReadinessReport:
+        groups = await asyncio.gather(*(_timed(names, check) for names, check in READINESS_CHECKS))
+        checks = {name: result for results in groups for name, result in results.items()}
+        for name, result in checks.items():
+            result.critical = name not in NON_CRITICAL_CHECKS
+        self._report = ReadinessReport(checks=checks, checked_at=time.monotonic())
+        return self._report
+
+
+readiness_probe = ReadinessProbe(settings.health_cache_seconds)
@@ -0,0 +1,128 @@
+import json
+from typing import Any
+
+
+INVALID_RESPONSE_MESSAGE = "Resposta inválida do Gemini."
+
+
+def _loads(text: str) -> Any:
+    # mesmo tipo de erro do caminho sem streaming, para o endpoint emitir o evento "error"
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError as exc:
+        raise RuntimeError(INVALID_RESPONSE_MESSAGE) from exc
+
+
+class ChatStreamParser:
+    def __init__(self) -> None:
+        self._chunks: list[str] = []
+        self._offset = 0
+        self._depth = 0
+        self._started = False
+        self._in_string = False
+        self._escape: str | None = None
+        self._pending_surrogate: str | None = None
+        self._expecting_key = False
+        self._string_is_key = False
+        self._key_chars: list[str] = []
+        self._last_key: str | None = None
+        self._capturing_message = False
+        self._routes_start: int | None = None
+        self.routes_done = False
+
+    @property
+    def text(self) -> str:
+        return "".join(self._chunks)
+
+    def feed(self, chunk: str) -> list[tuple[str, Any]]:
+        start = self._offset
+        self._chunks.append(chunk)
+        self._offset += len(chunk)
+
+        events: list[tuple[str, Any]] = []
+        message_delta: list[str] = []
+
+        for index, char in enumerate(chunk, start=start):
+            if self._in_string:
+                self._consume_string_char(char, message_delta)
+                continue
+
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                    self._depth = 1
+                    self._expecting_key = True
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_is_key = self._depth == 1 and self._expecting_key
+                self._capturing_message = (
+                    self._depth == 1 and not self._expecting_key and self._last_key == "message"
+                )
+                self._key_chars = []
+            elif char in "{[":
+                if (
+                    char == "["
+                    and self._depth == 1
+                    and self._last_key == "routes"
+                    and self._routes_start is None
+                ):
+                    self._routes_start = index
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if char == "]" and self._depth == 1 and self._routes_start is not None and not self.routes_done:
+                    self.routes_done = True
+                    routes = _loads(self.text[self._routes_start : index + 1])
+                    if message_delta:
+                        events.append(("message", "".join(message_delta)))
+                        message_delta = []
+                    events.append(("routes", routes))
+            elif char == ":" and self._depth == 1:
+                self._expecting_key = False
+            elif char == "," and self._depth == 1:
+                self._expecting_key = True
+
+        if message_delta:
+            events.append(("message", "".join(message_delta)))
+
+        return events
+
+    def _consume_string_char(self, char: str, message_delta: list[str]) -> None:
+        if self._escape is not None:
+            self._escape += char
+            if self._escape[1] == "u" and len(self._escape) < 6:
+                return
+            decoded = self._decode_escape(self._escape)
+            self._escape = None
+            if decoded:
+                self._emit_string_text(decoded, message_delta)
+            return
+
+        if char == "\\":
+            self._escape = char
+        elif char == '"':
+            self._in_string = False
+            if self._string_is_key:
+                self._last_key = "".join(self._key_chars)
+            self._capturing_message = False
+        else:
+            self._emit_string_text(char, message_delta)
+
+    def _decode_escape(self, sequence: str) -> str:
+        decoded = _loads(f'"{sequence}"')
+        if self._pending_surrogate is not None:
+            combined = self._pending_surrogate + sequence
+            self._pending_surrogate = None
+            return _loads(f'"{combined}"')
+        if "\ud800" <= decoded <= "\udbff":
+            self._pending_surrogate = sequence
+            return ""
+        return decoded
+
+    def _emit_string_text(self, text: str, message_delta: list[str]) -> None:
+        if self._string_is_key:
+            self._key_chars.append(text)
+        elif self._capturing_message:
+            message_delta.append(text)
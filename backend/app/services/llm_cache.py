@@ -0,0 +1,281 @@
+import hashlib
+import json
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Iterable, Protocol
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, sessionmaker
+
+from .. import models
+from ..config import settings
+from ..database import SessionLocal
+
+
+class CacheBackend(Protocol):
+    blocking: bool
+
+    def get(self, key: str) -> str | None: ...
+
+    def set(self, key: str, value: str, ttl_seconds: int, model_name: str) -> int: ...
+
+    def usage(self) -> tuple[int, int]: ...
+
+
+class MemoryCacheBackend:
+    blocking = False
+
+    def __init__(self, max_bytes: int) -> None:
+        self._max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[float, str, int]] = OrderedDict()
+        self._size_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value, size = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._size_bytes -= size
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl_seconds: int, model_name: str) -> int:
+        size = len(value.encode("utf-8"))
+        if size > self._max_bytes:
+            return 0
+
+        evicted = 0
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size_bytes -= previous[2]
+
+            self._entries[key] = (time.monotonic() + ttl_seconds, value, size)
+            self._size_bytes += size
+
+            while self._size_bytes > self._max_bytes:
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._size_bytes -= evicted_size
+                evicted += 1
+
+        return evicted
+
+    def usage(self) -> tuple[int, int]:
+        with self._lock:
+            return len(self._entries), self._size_bytes
+
+
+class DatabaseCacheBackend:
+    blocking = True
+
+    def __init__(self, session_factory: sessionmaker, max_bytes: int, evict_interval: float = 30.0) -> None:
+        self._session_factory = session_factory
+        self._max_bytes = max_bytes
+        self._evict_interval = evict_interval
+        self._next_eviction = 0.0
+        self._eviction_lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        now = datetime.now(timezone.utc)
+        with self._session_factory() as db:
+            entry = db.get(models.LLMCacheEntry, key)
+            if entry is None:
+                return None
+
+            if _as_utc(entry.expires_at) <= now:
+                db.delete(entry)
+                db.commit()
+                return None
+
+            entry.last_accessed_at = now
+            value = entry.value
+            db.commit()
+            return value
+
+    def set(self, key: str, value: str, ttl_seconds: int, model_name: str) -> int:
+        size = len(value.encode("utf-8"))
+        if size > self._max_bytes:
+            return 0
+
+        now = datetime.now(timezone.utc)
+        values = {
+            "key": key,
+            "model_name": model_name,
+            "value": value,
+            "size_bytes": size,
+            "expires_at": now + timedelta(seconds=ttl_seconds),
+            "last_accessed_at": now,
+        }
+        with self._session_factory() as db:
+            # dois misses simultâneos do mesmo prompt gravam a mesma chave: o upsert é atômico no banco
+            insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+            statement = insert(models.LLMCacheEntry.__table__).values(**values)
+            db.execute(
+                statement.on_conflict_do_update(
+                    index_elements=[models.LLMCacheEntry.key],
+                    set_={name: statement.excluded[name] for name in values if name != "key"},
+                )
+            )
+            db.commit()
+
+        return self._maybe_evict(now)
+
+    def _maybe_evict(self, now: datetime) -> int:
+        # somar a tabela inteira a cada escrita não escala; a limpeza roda no máximo uma vez por intervalo
+        # e o limite de bytes pode ser excedido por pouco tempo entre duas rodadas
+        with self._eviction_lock:
+            if time.monotonic() < self._next_eviction:
+                return 0
+            self._next_eviction = time.monotonic() + self._evict_interval
+
+        with self._session_factory() as db:
+            evicted = self._evict(db, now)
+            db.commit()
+            return evicted
+
+    def usage(self) -> tuple[int, int]:
+        with self._session_factory() as db:
+            entries, size_bytes = db.query(
+                func.count(models.LLMCacheEntry.key),
+                func.coalesce(func.sum(models.LLMCacheEntry.size_bytes), 0),
+            ).one()
+            return entries, size_bytes
+
+    def _evict(self, db: Session, now: datetime) -> int:
+        evicted = (
+            db.query(models.LLMCacheEntry)
+            .filter(models.LLMCacheEntry.expires_at <= now)
+            .delete(synchronize_session=False)
+        )
+
+        total = db.query(func.coalesce(func.sum(models.LLMCacheEntry.size_bytes), 0)).scalar()
+        if total <= self._max_bytes:
+            return evicted
+
+        excess = total - self._max_bytes
+        victims: list[str] = []
+        oldest = (
+            db.query(models.LLMCacheEntry.key, models.LLMCacheEntry.size_bytes)
+            .order_by(models.LLMCacheEntry.last_accessed_at.asc())
+            .yield_per(100)
+        )
+        for key, size in oldest:
+            victims.append(key)
+            excess -= size
+            if excess <= 0:
+                break
+
+        db.query(models.LLMCacheEntry).filter(models.LLMCacheEntry.key.in_(victims)).delete(
+            synchronize_session=False
+        )
+        return evicted + len(victims)
+
+
+class LLMResponseCache:
+    def __init__(self, backend: CacheBackend, ttl_seconds: int) -> None:
+        self._backend = backend
+        self._ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> str | None:
+        value = self._backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: str, model_name: str) -> None:
+        self.evictions += self._backend.set(key, value, self._ttl_seconds, model_name)
+
+    async def aget(self, key: str) -> str | None:
+        if self._backend.blocking:
+            return await run_in_threadpool(self.get, key)
+        return self.get(key)
+
+    async def aset(self, key: str, value: str, model_name: str) -> None:
+        if self._backend.blocking:
+            await run_in_threadpool(self.set, key, value, model_name)
+        else:
+            self.set(key, value, model_name)
+
+    def stats(self) -> dict[str, int]:
+        entries, size_bytes = self._backend.usage()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": entries,
+            "size_bytes": size_bytes,
+        }
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _normalize_text(value: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", value).casefold().split())
+
+
+def _city_key(city: models.City | None) -> list[str] | None:
+    if city is None:
+        return None
+    return [_normalize_text(city.name), city.state.strip().upper()]
+
+
+def build_cache_key(
+    user_id: int,
+    model_name: str,
+    message: str,
+    origin: models.City | None,
+    destination: models.City | None,
+    intermediates: Iterable[models.City],
+) -> str:
+    # o prompt inclui o histórico de rotas do usuário, então a resposta não é compartilhada entre usuários
+    material = {
+        "user": user_id,
+        "model": model_name,
+        "message": _normalize_text(message),
+        "origin": _city_key(origin),
+        "destination": _city_key(destination),
+        "intermediates": sorted(_city_key(city) for city in intermediates),
+    }
+    encoded = json.dumps(material, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+@lru_cache(maxsize=1)
+def get_llm_cache() -> LLMResponseCache | None:
+    backend_name = settings.llm_cache_backend.lower()
+    if backend_name == "none":
+        return None
+
+    if backend_name == "memory":
+        backend: CacheBackend = MemoryCacheBackend(settings.llm_cache_max_bytes)
+    elif backend_name == "database":
+        backend = DatabaseCacheBackend(
+            SessionLocal, settings.llm_cache_max_bytes, settings.llm_cache_evict_interval_seconds
+        )
+    else:
+        raise RuntimeError(f"LLM_CACHE_BACKEND inválido: {settings.llm_cache_backend}")
+
+    return LLMResponseCache(backend, settings.llm_cache_ttl_seconds)
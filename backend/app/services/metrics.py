@@ -0,0 +1,303 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterable, Iterator
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# As métricas não usam lock: as atualizações são operações simples sobre objetos já
+# existentes e, no pior caso (threads concorrentes), uma amostra pode se perder.
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, description: str, labelnames: Iterable[str] = ()) -> None:
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], Any] = {}
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def labels(self, *values: str) -> Any:
+        child = self._children.get(values)
+        if child is None:
+            child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def _samples(self) -> Iterator[tuple[str, tuple[str, ...], str, float]]:
+        raise NotImplementedError
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, values, extra, value in self._samples():
+            labels = _format_labels(self.labelnames, values, extra)
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def _samples(self) -> Iterator[tuple[str, tuple[str, ...], str, float]]:
+        for values, child in list(self._children.items()):
+            yield "", values, "", child.value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.dec(amount)
+
+    def set(self, value: float) -> None:
+        self._default.set(value)
+
+    def _samples(self) -> Iterator[tuple[str, tuple[str, ...], str, float]]:
+        for values, child in list(self._children.items()):
+            yield "", values, "", child.value
+
+
+class CallbackGauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, labelnames: Iterable[str] = ()) -> None:
+        self._callbacks: dict[tuple[str, ...], Callable[[], float]] = {}
+        super().__init__(name, description, labelnames)
+
+    def _new_child(self) -> None:
+        return None
+
+    def set_function(self, function: Callable[[], float], *values: str) -> None:
+        self._callbacks[values] = function
+
+    def _samples(self) -> Iterator[tuple[str, tuple[str, ...], str, float]]:
+        for values, function in list(self._callbacks.items()):
+            yield "", values, "", function()
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self._bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self._bounds, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = LATENCY_BUCKETS,
+    ) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._bucket_labels = [f'le="{_format_value(bound)}"' for bound in (*self.buckets, float("inf"))]
+        super().__init__(name, description, labelnames)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def _samples(self) -> Iterator[tuple[str, tuple[str, ...], str, float]]:
+        for values, child in list(self._children.items()):
+            cumulative = 0
+            for bucket_label, count in zip(self._bucket_labels, list(child.counts)):
+                cumulative += count
+                yield "_bucket", values, bucket_label, cumulative
+            yield "_sum", values, "", child.sum
+            yield "_count", values, "", cumulative
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric: _Metric) -> Any:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_requests_in_flight = registry.register(
+    Gauge("http_requests_in_flight", "Requisições HTTP em andamento.", ["method"])
+)
+http_request_duration_seconds = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Latência das requisições HTTP por rota e status.",
+        ["method", "route", "status"],
+    )
+)
+http_request_db_queries = registry.register(
+    Histogram(
+        "http_request_db_queries",
+        "Consultas ao banco executadas por requisição.",
+        ["route"],
+        buckets=QUERY_COUNT_BUCKETS,
+    )
+)
+http_request_db_seconds = registry.register(
+    Histogram("http_request_db_seconds", "Tempo gasto no banco por requisição.", ["route"])
+)
+db_query_duration_seconds = registry.register(
+    Histogram("db_query_duration_seconds", "Duração das consultas ao banco.", ["engine"])
+)
+db_pool_checked_out = registry.register(
+    CallbackGauge("db_pool_checked_out", "Conexões do pool em uso.", ["engine"])
+)
+db_pool_overflow = registry.register(
+    CallbackGauge("db_pool_overflow", "Conexões abertas além do tamanho do pool.", ["engine"])
+)
+gemini_request_duration_seconds = registry.register(
+    Histogram(
+        "gemini_request_duration_seconds",
+        "Latência das chamadas ao Gemini, incluindo novas tentativas.",
+        ["operation", "outcome"],
+    )
+)
+gemini_errors = registry.register(
+    Counter("gemini_errors_total", "Falhas nas tentativas de chamada ao Gemini.", ["kind"])
+)
+gemini_prompt_chars = registry.register(
+    Histogram("gemini_prompt_chars", "Tamanho dos prompts enviados ao Gemini.", ["operation"], buckets=SIZE_BUCKETS)
+)
+gemini_response_chars = registry.register(
+    Histogram(
+        "gemini_response_chars", "Tamanho das respostas recebidas do Gemini.", ["operation"], buckets=SIZE_BUCKETS
+    )
+)
+
+
+class RequestDBStats:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.seconds = 0.0
+
+
+request_db_stats: ContextVar[RequestDBStats | None] = ContextVar("request_db_stats", default=None)
+
+
+def instrument_engine(engine: Any, label: str) -> None:
+    from sqlalchemy import event
+
+    query_seconds = db_query_duration_seconds.labels(label)
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info["metrics_query_started"] = time.perf_counter()
+
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        started = conn.info.pop("metrics_query_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        query_seconds.observe(elapsed)
+        stats = request_db_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.seconds += elapsed
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    pool = engine.pool
+    if hasattr(pool, "checkedout"):
+        db_pool_checked_out.set_function(pool.checkedout, label)
+    if hasattr(pool, "overflow"):
+        db_pool_overflow.set_function(lambda: max(0, pool.overflow()), label)
+
+
+class LLMCallObservation:
+    __slots__ = ("response_chars",)
+
+    def __init__(self) -> None:
+        self.response_chars = 0
+
+
+@contextmanager
+def observe_llm_call(operation: str, prompt: str) -> Iterator[LLMCallObservation]:
+    gemini_prompt_chars.labels(operation).observe(len(prompt))
+    observation = LLMCallObservation()
+    started = time.perf_counter()
+    outcome = "cancelled"
+    try:
+        yield observation
+        outcome = "ok"
+    except Exception:
+        outcome = "error"
+        raise
+    finally:
+        gemini_request_duration_seconds.labels(operation, outcome).observe(time.perf_counter() - started)
+        if outcome == "ok":
+            gemini_response_chars.labels(operation).observe(observation.response_chars)
@@ -0,0 +1,94 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import event, inspect
+
+from .. import models
+from ..config import settings
+
+
+@dataclass(frozen=True)
+class UserPrincipal:
+    # só identidade: permissões (ex.: administrador) são conferidas a cada requisição, nunca ficam em cache
+    id: int
+    email: str
+
+
+class PrincipalCache:
+    def __init__(self, max_entries: int, ttl_seconds: int) -> None:
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, UserPrincipal]] = OrderedDict()
+        self._keys_by_user: dict[int, set[str]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> UserPrincipal | None:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, principal = entry
+            if expires_at <= time.time():
+                self._remove(key)
+                return None
+
+            self._entries.move_to_end(key)
+            return principal
+
+    def set(self, token: str, principal: UserPrincipal, token_expires_at: float) -> None:
+        if self._max_entries <= 0:
+            return
+
+        key = self._key(token)
+        expires_at = min(time.time() + self._ttl_seconds, token_expires_at)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (expires_at, principal)
+            self._keys_by_user.setdefault(principal.id, set()).add(key)
+            while len(self._entries) > self._max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int) -> None:
+        with self._lock:
+            for key in list(self._keys_by_user.get(user_id, ())):
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        user_keys = self._keys_by_user.get(entry[1].id)
+        if user_keys is not None:
+            user_keys.discard(key)
+            if not user_keys:
+                del self._keys_by_user[entry[1].id]
+
+
+principal_cache = PrincipalCache(settings.auth_cache_max_entries, settings.auth_cache_ttl_seconds)
+
+
+@event.listens_for(models.User, "after_delete")
+def _invalidate_deleted_user(mapper, connection, target: models.User) -> None:
+    principal_cache.invalidate_user(target.id)
+
+
+@event.listens_for(models.User, "after_update")
+def _invalidate_updated_user(mapper, connection, target: models.User) -> None:
+    state = inspect(target)
+    if state.attrs.hashed_password.history.has_changes() or state.attrs.email.history.has_changes():
+        principal_cache.invalidate_user(target.id)
@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Generic, Iterable, Sequence, TypeVar
+
+from .gazetteer import Municipality, get_gazetteer
+
+# o NumPy custa dezenas de milissegundos para importar e só é usado ao ordenar rotas,
+# então cada função o importa no primeiro uso em vez de pesar na subida da API
+if TYPE_CHECKING:
+    import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+# até aqui a programação dinâmica exata (Held-Karp) resolve em poucos milissegundos;
+# acima disso a memória cresce com 2^n e entram as heurísticas
+EXACT_MAX_INTERMEDIATES = 12
+OR_OPT_SEGMENT_LENGTHS = (1, 2, 3)
+IMPROVEMENT_EPSILON = 1e-9
+
+CityT = TypeVar("CityT")
+
+
+@dataclass
+class OrderedRoute(Generic[CityT]):
+    stops: list[CityT]
+    locations: list[Municipality]
+    legs_km: list[float]
+    total_km: float
+    baseline_km: float
+    method: str
+    # paradas intermediárias sem coordenadas no índice, deixadas fora da ordenação
+    skipped: list[CityT] = field(default_factory=list)
+
+
+def haversine_matrix(latitudes: Sequence[float], longitudes: Sequence[float]) -> np.ndarray:
+    import numpy as np
+
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    half_dlat = (lat[:, None] - lat[None, :]) / 2
+    half_dlon = (lon[:, None] - lon[None, :]) / 2
+    a = np.sin(half_dlat) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(half_dlon) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def path_length(distances: np.ndarray, path: Sequence[int]) -> float:
+    import numpy as np
+
+    path = np.asarray(path)
+    return float(distances[path[:-1], path[1:]].sum())
+
+
+def _held_karp(distances: np.ndarray) -> list[int]:
+    import numpy as np
+
+    # índice 0 é a origem, o último é o destino e os demais são as paradas intermediárias
+    count = len(distances) - 2
+    inner = distances[1:-1, 1:-1]
+    bits = 1 << np.arange(count)
+    masks = np.arange(1 << count)
+    sizes = ((masks[:, None] & bits) > 0).sum(axis=1)
+
+    # cost[mask, j]: menor caminho saindo da origem, visitando o conjunto mask e terminando em j
+    cost = np.full((1 << count, count), np.inf)
+    parent = np.full((1 << count, count), -1, dtype=np.int16)
+    cost[bits, np.arange(count)] = distances[0, 1:-1]
+
+    # camadas pelo tamanho do conjunto: cada uma depende apenas da anterior e é vetorizada inteira
+    for size in range(2, count + 1):
+        layer = masks[sizes == size]
+        members = (layer[:, None] & bits) > 0
+        previous = layer[:, None] ^ bits
+        candidates = cost[previous] + inner.T[None, :, :]
+        best = candidates.argmin(axis=2)
+        layer_cost = np.take_along_axis(candidates, best[..., None], axis=2)[..., 0]
+        layer_cost[~members] = np.inf
+        cost[layer] = layer_cost
+        parent[layer] = best
+
+    full = (1 << count) - 1
+    last = int(np.argmin(cost[full] + distances[1:-1, -1]))
+    order: list[int] = []
+    mask = full
+    while last >= 0:
+        order.append(last + 1)
+        last, mask = int(parent[mask, last]), mask ^ (1 << last)
+    return [0, *reversed(order), len(distances) - 1]
+
+
+def _nearest_neighbour(distances: np.ndarray) -> list[int]:
+    import numpy as np
+
+    destination = len(distances) - 1
+    remaining = np.ones(len(distances), dtype=bool)
+    remaining[[0, destination]] = False
+    path = [0]
+    while remaining.any():
+        candidates = np.where(remaining, distances[path[-1]], np.inf)
+        nearest = int(candidates.argmin())
+        path.append(nearest)
+        remaining[nearest] = False
+    path.append(destination)
+    return path
+
+
+def _two_opt_step(distances: np.ndarray, path: np.ndarray) -> np.ndarray | None:
+    import numpy as np
+
+    # inverter o trecho entre as arestas x e y troca (a_x, b_x) e (a_y, b_y) por (a_x, a_y) e (b_x, b_y)
+    starts, ends = path[:-1], path[1:]
+    edges = distances[starts, ends]
+    delta = distances[np.ix_(starts, starts)] + distances[np.ix_(ends, ends)] - edges[:, None] - edges[None, :]
+    delta[np.tril_indices(len(edges), 1)] = 0.0
+    x, y = np.unravel_index(int(delta.argmin()), delta.shape)
+    if delta[x, y] >= -IMPROVEMENT_EPSILON:
+        return None
+
+    improved = path.copy()
+    improved[x + 1 : y + 1] = path[x + 1 : y + 1][::-1]
+    return improved
+
+
+def _or_opt_step(distances: np.ndarray, path: np.ndarray) -> np.ndarray | None:
+    import numpy as np
+
+    # move um trecho de 1 a 3 paradas para entre outras duas, na ordem original ou invertido
+    starts, ends = path[:-1], path[1:]
+    edges = distances[starts, ends]
+    last_intermediate = len(path) - 2
+    best: tuple[float, int, int, int, bool] | None = None
+
+    for length in OR_OPT_SEGMENT_LENGTHS:
+        first_positions = np.arange(1, last_intermediate - length + 2)
+        if len(first_positions) == 0:
+            break
+        last_positions = first_positions + length - 1
+        heads, tails = path[first_positions], path[last_positions]
+        before, after = path[first_positions - 1], path[last_positions + 1]
+        removal_gain = distances[before, heads] + distances[tails, after] - distances[before, after]
+
+        forward = distances[np.ix_(starts, heads)].T + distances[np.ix_(tails, ends)]
+        backward = distances[np.ix_(starts, tails)].T + distances[np.ix_(heads, ends)]
+        delta = np.minimum(forward, backward) - edges[None, :] - removal_gain[:, None]
+
+        # as arestas que tocam o próprio trecho não são destinos válidos
+        edge_index = np.arange(len(edges))
+        touching = (edge_index[None, :] >= first_positions[:, None] - 1) & (
+            edge_index[None, :] <= last_positions[:, None]
+        )
+        delta[touching] = np.inf
+
+        segment, edge = np.unravel_index(int(delta.argmin()), delta.shape)
+        value = float(delta[segment, edge])
+        if value < -IMPROVEMENT_EPSILON and (best is None or value < best[0]):
+            reverse = bool(backward[segment, edge] < forward[segment, edge])
+            best = (value, int(first_positions[segment]), length, int(edge), reverse)
+
+    if best is None:
+        return None
+
+    _, first, length, edge, reverse = best
+    segment_nodes = path[first : first + length]
+    if reverse:
+        segment_nodes = segment_nodes[::-1]
+    rest = np.concatenate([path[:first], path[first + length :]])
+    insert_at = edge + 1 if edge < first else edge - length + 1
+    return np.concatenate([rest[:insert_at], segment_nodes, rest[insert_at:]])
+
+
+def _local_search(distances: np.ndarray, path: list[int], max_rounds: int) -> list[int]:
+    import numpy as np
+
+    current = np.asarray(path)
+    for _ in range(max_rounds):
+        improved = _two_opt_step(distances, current)
+        if improved is None:
+            improved = _or_opt_step(distances, current)
+        if improved is None:
+            break
+        current = improved
+    return current.tolist()
+
+
+def solve_open_path(
+    distances: np.ndarray, exact_limit: int = EXACT_MAX_INTERMEDIATES, max_rounds: int | None = None
+) -> tuple[list[int], str]:
+    """Ordena as paradas de um caminho com origem (índice 0) e destino (último índice) fixos."""
+    count = len(distances) - 2
+    if count <= 1:
+        return list(range(len(distances))), "trivial"
+    if count <= exact_limit:
+        return _held_karp(distances), "exact"
+
+    rounds = max_rounds if max_rounds is not None else 20 * count
+    return _local_search(distances, _nearest_neighbour(distances), rounds), "heuristic"
+
+
+def group_cities(cities: Iterable[CityT]) -> tuple[CityT | None, CityT | None, list[CityT]]:
+    origin = None
+    destination = None
+    intermediates: list[CityT] = []
+
+    for city in cities:
+        role = getattr(city, "role", None) or "intermediate"
+        if role == "origin" and origin is None:
+            origin = city
+        elif role == "destination" and destination is None:
+            destination = city
+        else:
+            intermediates.append(city)
+
+    return origin, destination, intermediates
+
+
+def locate_cities(cities: Sequence[CityT]) -> tuple[list[Municipality | None], bool]:
+    gazetteer = get_gazetteer()
+    if gazetteer is None:
+        return [None] * len(cities), False
+    return [gazetteer.find(city.name, city.state) for city in cities], True
+
+
+def order_route(origin: CityT, destination: CityT, intermediates: Sequence[CityT]) -> OrderedRoute[CityT] | None:
+    """Ordena as paradas com coordenadas; sem origem ou destino no índice, devolve None."""
+    located, _ = locate_cities([origin, *intermediates, destination])
+    if located[0] is None or located[-1] is None:
+        return None
+
+    known = [(city, location) for city, location in zip(intermediates, located[1:-1]) if location is not None]
+    skipped = [city for city, location in zip(intermediates, located[1:-1]) if location is None]
+    if skipped:
+        logger.warning("Paradas sem coordenadas ficaram fora da ordenação: %d de %d.", len(skipped), len(intermediates))
+
+    cities = [origin, *(city for city, _ in known), destination]
+    locations = [located[0], *(location for _, location in known), located[-1]]
+    distances = haversine_matrix(
+        [location.latitude for location in locations],
+        [location.longitude for location in locations],
+    )
+    path, method = solve_open_path(distances)
+    legs = distances[path[:-1], path[1:]]
+
+    return OrderedRoute(
+        stops=[cities[index] for index in path],
+        locations=[locations[index] for index in path],
+        legs_km=[round(float(leg), 1) for leg in legs],
+        total_km=round(float(legs.sum()), 1),
+        baseline_km=round(path_length(distances, range(len(cities))), 1),
+        method=method,
+        skipped=skipped,
+    )
@@ -0,0 +1,103 @@
+from collections import defaultdict
+from typing import Any, Iterable
+
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from .. import models
+
+
+STAT_COUNTERS = ("route_count", "distance_count", "distance_km_total", "spend_count", "spend_cents_total")
+UNDEFINED_BUCKET = "indefinido"
+
+ROUTE_STATS_COLUMNS = (
+    models.RoutePlan.user_id,
+    models.RoutePlan.travel_date,
+    models.RoutePlan.transport_type,
+    models.RoutePlan.trip_type,
+    models.RoutePlan.distance_km_value,
+    models.RoutePlan.estimated_spend_brl_cents,
+)
+
+
+def _label(value: str | None) -> str:
+    normalized = " ".join((value or "").split()).lower()
+    return normalized[:64] or UNDEFINED_BUCKET
+
+
+def _route_buckets(route: Any) -> list[tuple[str, str]]:
+    month = route.travel_date.strftime("%Y-%m") if route.travel_date else UNDEFINED_BUCKET
+    return [
+        ("total", ""),
+        ("transport_type", _label(route.transport_type)),
+        ("trip_type", _label(route.trip_type)),
+        ("month", month),
+    ]
+
+
+def _aggregate(routes: Iterable[Any], sign: int) -> dict[tuple[int, str, str], dict[str, float]]:
+    deltas: dict[tuple[int, str, str], dict[str, float]] = defaultdict(lambda: dict.fromkeys(STAT_COUNTERS, 0))
+
+    for route in routes:
+        for dimension, bucket in _route_buckets(route):
+            delta = deltas[(route.user_id, dimension, bucket)]
+            delta["route_count"] += sign
+            if route.distance_km_value is not None:
+                delta["distance_count"] += sign
+                delta["distance_km_total"] += sign * route.distance_km_value
+            if route.estimated_spend_brl_cents is not None:
+                delta["spend_count"] += sign
+                delta["spend_cents_total"] += sign * route.estimated_spend_brl_cents
+
+    return deltas
+
+
+def apply_route_stats(db: Session, routes: Iterable[Any], sign: int) -> None:
+    deltas = _aggregate(routes, sign)
+    if not deltas:
+        return
+
+    insert = postgresql_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+    table = models.RoutePlanStat.__table__
+    rows = [
+        {"user_id": user_id, "dimension": dimension, "bucket": bucket, **counters}
+        for (user_id, dimension, bucket), counters in deltas.items()
+    ]
+
+    statement = insert(table).values(rows)
+    db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.dimension, table.c.bucket],
+            set_={counter: table.c[counter] + statement.excluded[counter] for counter in STAT_COUNTERS},
+        )
+    )
+
+    if sign < 0:
+        user_ids = {user_id for user_id, _, _ in deltas}
+        db.query(models.RoutePlanStat).filter(
+            models.RoutePlanStat.user_id.in_(user_ids),
+            models.RoutePlanStat.route_count <= 0,
+        ).delete(synchronize_session=False)
+
+
+def rebuild_route_stats(db: Session, user_id: int | None = None, batch_size: int = 1000) -> int:
+    stats_query = db.query(models.RoutePlanStat)
+    routes_query = db.query(*ROUTE_STATS_COLUMNS)
+    if user_id is not None:
+        stats_query = stats_query.filter(models.RoutePlanStat.user_id == user_id)
+        routes_query = routes_query.filter(models.RoutePlan.user_id == user_id)
+
+    stats_query.delete(synchronize_session=False)
+
+    deltas = _aggregate(routes_query.yield_per(batch_size), 1)
+    db.bulk_insert_mappings(
+        models.RoutePlanStat,
+        [
+            {"user_id": owner_id, "dimension": dimension, "bucket": bucket, **counters}
+            for (owner_id, dimension, bucket), counters in deltas.items()
+        ],
+    )
+    db.commit()
+
+    return len(deltas)
@@ -0,0 +1,184 @@
+import re
+from typing import Any, Callable
+
+
+_NUMBER = r"\d+(?:[.,]\d+)*"
+_DISTANCE_PATTERN = re.compile(rf"({_NUMBER})\s*(km|quil[oô]metros?|m|metros?)?\b", re.IGNORECASE)
+_DURATION_PATTERN = re.compile(
+    rf"({_NUMBER})\s*(d|dias?|h|hrs?|horas?|min|mins|minutos?|m)?(?![a-z])",
+    re.IGNORECASE,
+)
+_CLOCK_PATTERN = re.compile(r"\b(\d{1,2}):(\d{2})\b")
+_MONEY_PATTERN = re.compile(rf"({_NUMBER})\s*(mil\b)?", re.IGNORECASE)
+
+_MINUTES_PER_UNIT = {"d": 1440, "h": 60, "m": 1}
+
+# "3h a 4h", "3-4 horas", "R$ 1.200 até R$ 1.500" e "entre 3 e 4 horas" são faixas; o "e" sozinho
+# não separa faixa porque também junta partes de uma mesma duração ("2 horas e 30 minutos")
+_RANGE_BETWEEN = re.compile(r"\bentre\s+(.+?)\s+e\s+(.+)", re.IGNORECASE)
+_RANGE_SEPARATOR = re.compile(r"\s+(?:a|até)\s+|\s*[-–]\s*", re.IGNORECASE)
+
+
+def _parse_number(raw: str) -> float | None:
+    if "," in raw and "." in raw:
+        decimal_separator = "," if raw.rfind(",") > raw.rfind(".") else "."
+    elif "," in raw:
+        # "1,234" e "1,234,567" seguem o formato com vírgula de milhar; "12,5" e "1,2345" são decimais
+        decimal_separator = None if re.fullmatch(r"\d{1,3}(?:,\d{3})+", raw) else ","
+    elif "." in raw:
+        decimal_separator = None if re.fullmatch(r"\d{1,3}(?:\.\d{3})+", raw) else "."
+    else:
+        decimal_separator = None
+
+    thousands_separator = {",": ".", ".": ",", None: ".,"}[decimal_separator]
+    normalized = raw
+    for separator in thousands_separator:
+        normalized = normalized.replace(separator, "")
+    if decimal_separator:
+        normalized = normalized.replace(decimal_separator, ".")
+
+    try:
+        return float(normalized)
+    except ValueError:
+        return None
+
+
+def _range_sides(text: str) -> tuple[str, str] | None:
+    match = _RANGE_BETWEEN.search(text)
+    if match:
+        return match.group(1), match.group(2)
+
+    sides = _RANGE_SEPARATOR.split(text, maxsplit=1)
+    if len(sides) == 2 and all(re.search(r"\d", side) for side in sides):
+        return sides[0], sides[1]
+    return None
+
+
+def _parse_quantity(
+    value: Any, parse_single: Callable[[str], float | None], unit_of: Callable[[str], str | None]
+) -> float | None:
+    text = str(value)
+    sides = _range_sides(text)
+    if sides is None:
+        return parse_single(text)
+
+    # uma faixa vale o ponto médio; o lado sem unidade usa a do outro ("3 a 4 horas")
+    low, high = sides
+    unit = unit_of(high)
+    if unit and unit_of(low) is None:
+        low = f"{low} {unit}"
+    values = [number for number in (parse_single(low), parse_single(high)) if number is not None]
+    if not values:
+        return None
+    return sum(values) / len(values)
+
+
+def _distance_unit(text: str) -> str | None:
+    match = _DISTANCE_PATTERN.search(text)
+    return match.group(2) if match else None
+
+
+def _parse_distance(text: str) -> float | None:
+    match = _DISTANCE_PATTERN.search(text)
+    if not match:
+        return None
+
+    number = _parse_number(match.group(1))
+    if number is None:
+        return None
+
+    unit = (match.group(2) or "km").lower()
+    if unit.startswith("m"):
+        number /= 1000
+    return number
+
+
+def parse_distance_km(value: Any) -> float | None:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    number = _parse_quantity(value, _parse_distance, _distance_unit)
+    return round(number, 3) if number is not None else None
+
+
+def _duration_unit(text: str) -> str | None:
+    units = [raw_unit for _, raw_unit in _DURATION_PATTERN.findall(text) if raw_unit]
+    return units[-1] if units else None
+
+
+def _parse_duration(text: str) -> float | None:
+    clock = _CLOCK_PATTERN.search(text)
+    if clock:
+        return int(clock.group(1)) * 60 + int(clock.group(2))
+
+    # partes de uma mesma duração se somam: "5h 30min", "5h30", "1 dia e 2 horas"
+    total = 0.0
+    previous_unit: str | None = None
+    for raw_number, raw_unit in _DURATION_PATTERN.findall(text):
+        number = _parse_number(raw_number)
+        if number is None:
+            continue
+
+        unit = raw_unit[:1].lower() if raw_unit else None
+        if unit is None:
+            # "5h30": número sem unidade logo após horas representa minutos
+            if previous_unit != "h":
+                continue
+            unit = "m"
+
+        total += number * _MINUTES_PER_UNIT[unit]
+        previous_unit = unit
+
+    if previous_unit is None:
+        return None
+    return total
+
+
+def parse_duration_minutes(value: Any) -> int | None:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return round(value)
+
+    minutes = _parse_quantity(value, _parse_duration, _duration_unit)
+    return round(minutes) if minutes is not None else None
+
+
+def _money_unit(text: str) -> str | None:
+    match = _MONEY_PATTERN.search(text)
+    return match.group(2) if match else None
+
+
+def _parse_money(text: str) -> float | None:
+    match = _MONEY_PATTERN.search(text)
+    if not match:
+        return None
+
+    number = _parse_number(match.group(1))
+    if number is None:
+        return None
+
+    if match.group(2):
+        number *= 1000
+    return number
+
+
+def parse_brl_cents(value: Any) -> int | None:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return round(value * 100)
+
+    number = _parse_quantity(value, _parse_money, _money_unit)
+    return round(number * 100) if number is not None else None
+
+
+def parse_route_values(route: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "distance_km_value": parse_distance_km(route.get("distance_km")),
+        "travel_time_minutes": parse_duration_minutes(route.get("travel_time")),
+        "cost_brl_cents": parse_brl_cents(route.get("cost_brl")),
+        "estimated_spend_brl_cents": parse_brl_cents(route.get("estimated_spend_brl")),
+    }
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Generic, Hashable, TypeVar
+
+
+T = TypeVar("T")
+
+
+class SharedStream(Generic[T]):
+    """Uma única execução de um gerador assíncrono, repetida desde o início para cada assinante."""
+
+    def __init__(self, source: AsyncIterator[T]) -> None:
+        self.items: list[T] = []
+        self.finished = False
+        self._error: BaseException | None = None
+        self._changed = asyncio.Condition()
+        self._callbacks: list[Callable[[list[T]], None]] = []
+        # a execução não pertence a nenhum cliente: se quem a iniciou desconectar, os demais continuam recebendo
+        self.task = asyncio.ensure_future(self._run(source))
+
+    async def _run(self, source: AsyncIterator[T]) -> None:
+        try:
+            async for item in source:
+                async with self._changed:
+                    self.items.append(item)
+                    self._changed.notify_all()
+        except BaseException as exc:
+            self._error = exc
+        finally:
+            async with self._changed:
+                self.finished = True
+                self._changed.notify_all()
+
+        if self._error is None:
+            for callback in self._callbacks:
+                callback(self.items)
+
+    def when_done(self, callback: Callable[[list[T]], None]) -> None:
+        if self.finished:
+            if self._error is None:
+                callback(self.items)
+            return
+        self._callbacks.append(callback)
+
+    async def subscribe(self) -> AsyncIterator[T]:
+        position = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: position < len(self.items) or self.finished)
+                pending = self.items[position:]
+                finished = self.finished
+            for item in pending:
+                yield item
+            position += len(pending)
+            if finished and position == len(self.items):
+                break
+
+        if self._error is not None:
+            raise self._error
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self._inflight: dict[Hashable, asyncio.Future[Any]] = {}
+        self._streams: dict[Hashable, SharedStream[Any]] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+
+        return await asyncio.shield(future)
+
+    def stream(self, key: Hashable, fn: Callable[[], AsyncIterator[T]]) -> SharedStream[T]:
+        shared = self._streams.get(key)
+        if shared is None:
+            shared = SharedStream(fn())
+            self._streams[key] = shared
+            shared.task.add_done_callback(lambda _: self._forget_stream(key, shared))
+        return shared
+
+    def _forget(self, key: Hashable, future: asyncio.Future[Any]) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    def _forget_stream(self, key: Hashable, shared: SharedStream[Any]) -> None:
+        if self._streams.get(key) is shared:
+            del self._streams[key]
+
+
+class IdempotencyStore:
+    def __init__(self, ttl_seconds: int, max_entries: int) -> None:
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + self._ttl_seconds, value)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
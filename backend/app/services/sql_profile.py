@@ -0,0 +1,123 @@
+import logging
+import re
+import threading
+import uuid
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from typing import Any
+
+from ..config import settings
+
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-sql-profile"
+MAX_TRACED_QUERIES = 500
+
+_IN_LIST_PATTERN = re.compile(r"\(\s*(?:%\(\w+\)s|\?|\$\d+|:\w+)(?:\s*,\s*(?:%\(\w+\)s|\?|\$\d+|:\w+))*\s*\)")
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    # listas de IN expandidas viram "(...)" para agrupar a mesma consulta com tamanhos diferentes
+    normalized = _WHITESPACE_PATTERN.sub(" ", statement).strip()
+    return _IN_LIST_PATTERN.sub("(...)", normalized)
+
+
+class SQLProfile:
+    def __init__(self, method: str, path: str, trace: bool) -> None:
+        self.method = method
+        self.path = path
+        self.trace = trace
+        self.admin = False
+        self.user_id: int | None = None
+        self.status_code = 0
+        self.total_seconds = 0.0
+        self.queries = 0
+        self.seconds = 0.0
+        self.fingerprints: Counter[str] = Counter()
+        self.statements: list[tuple[str, float]] = []
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.queries += 1
+        self.seconds += elapsed
+        key = fingerprint(statement)
+        self.fingerprints[key] += 1
+        if self.trace and len(self.statements) < MAX_TRACED_QUERIES:
+            self.statements.append((key, elapsed))
+
+    def repeated(self) -> list[tuple[str, int]]:
+        threshold = settings.sql_profiling_repeat_threshold
+        return [(key, count) for key, count in self.fingerprints.most_common() if count >= threshold]
+
+    def server_timing(self, elapsed_seconds: float) -> str:
+        repeated = sum(count for _, count in self.repeated())
+        return (
+            f'db;dur={self.seconds * 1000:.2f};desc="{self.queries} consultas, {repeated} repetidas", '
+            f"app;dur={elapsed_seconds * 1000:.2f}"
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "method": self.method,
+            "path": self.path,
+            "status": self.status_code,
+            "total_ms": round(self.total_seconds * 1000, 2),
+            "db_ms": round(self.seconds * 1000, 2),
+            "queries": self.queries,
+            "repeated": [{"statement": key, "count": count} for key, count in self.repeated()],
+            "statements": [
+                {"statement": key, "duration_ms": round(elapsed * 1000, 3)} for key, elapsed in self.statements
+            ],
+        }
+
+
+current_sql_profile: ContextVar[SQLProfile | None] = ContextVar("current_sql_profile", default=None)
+
+
+def is_profiling_admin(email: str) -> bool:
+    return email.lower() in settings.sql_profiling_admin_emails
+
+
+def mark_profile_principal(user_id: int, email: str) -> None:
+    profile = current_sql_profile.get()
+    if profile is None:
+        return
+
+    profile.user_id = user_id
+    profile.admin = is_profiling_admin(email)
+    if not profile.admin:
+        # o rastro traz o SQL das consultas: só administradores podem pedi-lo, mesmo com o modo global ligado
+        profile.trace = False
+        profile.statements.clear()
+
+
+class ProfileStore:
+    def __init__(self, max_entries: int) -> None:
+        self._max_entries = max_entries
+        self._entries: OrderedDict[str, SQLProfile] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile: SQLProfile) -> str:
+        profile_id = uuid.uuid4().hex
+        with self._lock:
+            self._entries[profile_id] = profile
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return profile_id
+
+    def get(self, profile_id: str, user_id: int) -> SQLProfile | None:
+        # cada rastro só é visível para quem fez a requisição rastreada
+        with self._lock:
+            profile = self._entries.get(profile_id)
+        if profile is None or profile.user_id != user_id:
+            return None
+        return profile
+
+
+profile_store = ProfileStore(settings.sql_profiling_max_traces)
+
+
+def log_repeated_queries(profile: SQLProfile) -> None:
+    for key, count in profile.repeated():
+        logger.warning("Possível N+1 em %s %s: %sx %s", profile.method, profile.path, count, key[:200])
@@ -0,0 +1,144 @@
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, or_, update
+
+from . import models
+from .config import settings
+from .database import SessionLocal
+from .routers.ai import JobCompletion, JobSupersededError, run_generation_job
+
+
+logger = logging.getLogger(__name__)
+
+
+def claim_next_job() -> tuple[int, int, str, int] | None:
+    now = datetime.now(timezone.utc)
+    stale_before = now - timedelta(seconds=settings.generation_job_timeout_seconds)
+    max_attempts = max(1, settings.generation_job_max_attempts)
+
+    with SessionLocal() as db:
+        # uma tarefa que derruba o worker volta como "running" travada; sem um teto, seria retomada para sempre
+        db.execute(
+            update(models.GenerationJob)
+            .where(
+                models.GenerationJob.status == "running",
+                models.GenerationJob.started_at < stale_before,
+                models.GenerationJob.attempts >= max_attempts,
+            )
+            .values(
+                status="failed",
+                error=f"Tarefa interrompida após {max_attempts} tentativas.",
+                finished_at=now,
+            )
+        )
+
+        job = (
+            db.query(models.GenerationJob)
+            .filter(
+                or_(
+                    models.GenerationJob.status == "pending",
+                    and_(
+                        models.GenerationJob.status == "running",
+                        models.GenerationJob.started_at < stale_before,
+                        models.GenerationJob.attempts < max_attempts,
+                    ),
+                )
+            )
+            .order_by(models.GenerationJob.id.asc())
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if job is None:
+            db.commit()
+            return None
+
+        job.status = "running"
+        job.started_at = now
+        job.attempts += 1
+        db.commit()
+
+        return job.id, job.user_id, job.message, job.attempts
+
+
+def fail_job(job: JobCompletion, error: str) -> None:
+    with SessionLocal() as db:
+        db.execute(
+            update(models.GenerationJob)
+            .where(
+                models.GenerationJob.id == job.job_id,
+                models.GenerationJob.status == "running",
+                models.GenerationJob.attempts == job.attempt,
+            )
+            .values(status="failed", error=error[:1024], finished_at=datetime.now(timezone.utc))
+        )
+        db.commit()
+
+
+async def process_next_job() -> bool:
+    claimed = await run_in_threadpool(claim_next_job)
+    if claimed is None:
+        return False
+
+    job_id, user_id, message, attempt = claimed
+    job = JobCompletion(job_id=job_id, attempt=attempt)
+    try:
+        # em caso de sucesso, a tarefa é concluída na mesma transação que grava as rotas
+        await run_generation_job(user_id, message, job)
+    except JobSupersededError:
+        logger.warning("Tarefa %s retomada por outro worker; resultado descartado.", job_id)
+    except HTTPException as exc:
+        await run_in_threadpool(fail_job, job, str(exc.detail))
+    except Exception as exc:
+        logger.exception("Falha inesperada ao processar a tarefa %s", job_id)
+        await run_in_threadpool(fail_job, job, str(exc) or exc.__class__.__name__)
+
+    return True
+
+
+async def run_worker(stop_event: asyncio.Event | None = None) -> None:
+    stop_event = stop_event or asyncio.Event()
+
+    while not stop_event.is_set():
+        try:
+            processed = await process_next_job()
+        except Exception:
+            logger.exception("Erro ao buscar tarefas de geração")
+            processed = False
+
+        if not processed:
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=settings.generation_worker_poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+
+def start_workers(count: int, stop_event: asyncio.Event) -> list[asyncio.Task]:
+    return [asyncio.create_task(run_worker(stop_event)) for _ in range(count)]
+
+
+async def _run(concurrency: int) -> None:
+    stop_event = asyncio.Event()
+    await asyncio.gather(*start_workers(concurrency, stop_event))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Processa tarefas de geração de rotas em segundo plano.")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=max(1, settings.generation_workers),
+        help="Quantidade de tarefas processadas em paralelo.",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_run(args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
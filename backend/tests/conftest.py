@@ -0,0 +1,74 @@
+import os
+import tempfile
+from pathlib import Path
+
+# as configurações são lidas na importação do app, então o ambiente vem antes de qualquer import de app.*
+_DATABASE_DIR = Path(tempfile.mkdtemp(prefix="tests-"))
+os.environ["DATABASE_URL"] = f"sqlite:///{_DATABASE_DIR / 'tests.db'}"
+os.environ["GEMINI_FAKE"] = "true"
+os.environ["GEMINI_FAKE_LATENCY_MS"] = "0"
+os.environ["GEMINI_RETRY_BASE_DELAY_SECONDS"] = "0"
+os.environ["GENERATION_WORKERS"] = "0"
+os.environ["PASSWORD_HASH_WORKERS"] = "0"
+os.environ["PASSWORD_HASH_ROUNDS"] = "1000"
+os.environ["LLM_CACHE_BACKEND"] = "memory"
+
+import httpx
+import pytest
+from sqlalchemy import delete
+
+from app import models
+from app.database import SessionLocal, engine
+from app.main import create_app
+from app.migrate import upgrade
+from app.routers import ai
+from app.services.gemini import get_gemini_service
+from app.services.llm_cache import get_llm_cache
+from app.services.singleflight import IdempotencyStore, SingleFlight
+
+
+TEST_PASSWORD = "senha-de-teste"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def migrated_database():
+    upgrade()
+    yield
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def clean_state(monkeypatch):
+    with SessionLocal() as db:
+        for table in reversed(models.Base.metadata.sorted_tables):
+            db.execute(delete(table))
+        db.commit()
+
+    get_gemini_service.cache_clear()
+    get_llm_cache.cache_clear()
+    monkeypatch.setattr(ai, "_chat_flights", SingleFlight())
+    monkeypatch.setattr(ai, "_idempotent_responses", IdempotencyStore(600, 1000))
+    yield
+
+
+@pytest.fixture
+async def client():
+    app = create_app()
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as http_client:
+            yield http_client
+
+
+async def register_and_login(client: httpx.AsyncClient, email: str = "viajante@example.com") -> dict[str, str]:
+    response = await client.post("/api/auth/register", json={"email": email, "password": TEST_PASSWORD})
+    assert response.status_code == 201, response.text
+
+    response = await client.post("/api/auth/login", data={"username": email, "password": TEST_PASSWORD})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+async def auth_headers(client):
+    return await register_and_login(client)
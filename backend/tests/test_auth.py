@@ -0,0 +1,45 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from app.database import async_engine
+from app.security import create_access_token
+from app.services.principal_cache import principal_cache
+
+
+@contextmanager
+def count_queries():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+
+async def test_tokens_with_user_id_are_resolved_without_a_query(client, auth_headers):
+    principal_cache.clear()
+
+    with count_queries() as statements:
+        response = await client.get("/api/auth/home", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.json()["email"] == "viajante@example.com"
+    assert statements == []
+
+
+async def test_tokens_without_user_id_are_looked_up_once_and_cached(client, auth_headers):
+    principal_cache.clear()
+    headers = {"Authorization": f"Bearer {create_access_token('viajante@example.com')}"}
+
+    with count_queries() as statements:
+        assert (await client.get("/api/auth/home", headers=headers)).status_code == 200
+        assert (await client.get("/api/auth/home", headers=headers)).status_code == 200
+    assert len(statements) == 1
+
+    unknown = {"Authorization": f"Bearer {create_access_token('ninguem@example.com')}"}
+    assert (await client.get("/api/auth/home", headers=unknown)).status_code == 401
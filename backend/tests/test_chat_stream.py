@@ -0,0 +1,82 @@
+import asyncio
+import json
+from functools import partial
+
+import pytest
+
+from app.routers import ai
+from app.services.fake_gemini import FakeGenerativeModel
+from app.services.gemini import GeminiService
+
+
+def _events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.fixture
+async def trip(client, auth_headers):
+    for name, role in (("Campinas", "origin"), ("Santos", "destination")):
+        await client.post("/api/cities/", json={"name": name, "state": "SP", "role": role}, headers=auth_headers)
+    return auth_headers
+
+
+def _use_model_response(monkeypatch, response_text: str) -> None:
+    service = GeminiService(
+        api_key="", model="fake", model_factory=partial(FakeGenerativeModel, response_text=response_text)
+    )
+    monkeypatch.setattr(ai, "get_gemini_service", lambda: service)
+
+
+async def test_stream_emits_message_routes_and_done(client, trip):
+    response = await client.post("/api/ai/chat/stream", json={"message": "Viagem"}, headers=trip)
+    assert response.status_code == 200
+
+    kinds = [kind for kind, _ in _events(response.text)]
+    assert "message" in kinds
+    assert kinds[-2:] == ["routes", "done"]
+
+
+async def test_stream_reports_malformed_routes_as_error_event(client, trip, monkeypatch):
+    _use_model_response(monkeypatch, '{"message": "Rota", "routes": [{"itinerary": }]}')
+
+    response = await client.post("/api/ai/chat/stream", json={"message": "Viagem"}, headers=trip)
+    assert response.status_code == 200
+
+    kind, data = _events(response.text)[-1]
+    assert kind == "error"
+    assert data["detail"] == "Resposta inválida do Gemini."
+
+
+async def test_chat_answers_502_for_the_same_malformed_payload(client, trip, monkeypatch):
+    _use_model_response(monkeypatch, '{"message": "Rota", "routes": [{"itinerary": }]}')
+
+    response = await client.post("/api/ai/chat", json={"message": "Viagem"}, headers=trip)
+    assert response.status_code == 502
+
+
+async def test_concurrent_streams_share_one_gemini_call_and_one_plan(client, trip, monkeypatch):
+    model = FakeGenerativeModel("fake", latency=0.2)
+    service = GeminiService(api_key="", model="fake", model_factory=lambda name: model)
+    monkeypatch.setattr(ai, "get_gemini_service", lambda: service)
+
+    headers = {**trip, "Idempotency-Key": "clique-duplo"}
+    first, second = await asyncio.gather(
+        client.post("/api/ai/chat/stream", json={"message": "Viagem"}, headers=headers),
+        client.post("/api/ai/chat/stream", json={"message": "Viagem"}, headers=headers),
+    )
+    assert first.text == second.text
+    assert _events(first.text)[-1][0] == "done"
+
+    # depois de concluído, a mesma chave repete o stream gravado sem chamar o Gemini de novo
+    replay = await client.post("/api/ai/chat/stream", json={"message": "Viagem"}, headers=headers)
+    assert replay.text == first.text
+    response = await client.post("/api/ai/chat/stream", json={"message": "Outra"}, headers=headers)
+    assert response.status_code == 422
+
+    assert model.calls == 1
+    routes = (await client.get("/api/routes/", headers=trip)).json()
+    assert len(routes) == 1
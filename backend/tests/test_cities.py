@@ -0,0 +1,159 @@
+from app.config import settings
+
+from .conftest import register_and_login
+
+
+async def test_create_list_update_and_delete_city(client, auth_headers):
+    response = await client.post(
+        "/api/cities/", json={"name": "Campinas", "state": "sp", "role": "origin"}, headers=auth_headers
+    )
+    assert response.status_code == 201
+    city = response.json()
+    assert (city["name"], city["state"], city["role"]) == ("Campinas", "SP", "origin")
+
+    response = await client.put(f"/api/cities/{city['id']}", json={"role": "destination"}, headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["role"] == "destination"
+
+    response = await client.get("/api/cities/", headers=auth_headers)
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == [city["id"]]
+
+    response = await client.delete(f"/api/cities/{city['id']}", headers=auth_headers)
+    assert response.status_code == 204
+
+    response = await client.get("/api/cities/", headers=auth_headers)
+    assert response.json() == []
+
+
+async def test_duplicate_city_and_second_origin_are_rejected(client, auth_headers):
+    payload = {"name": "Campinas", "state": "SP", "role": "origin"}
+    assert (await client.post("/api/cities/", json=payload, headers=auth_headers)).status_code == 201
+
+    response = await client.post("/api/cities/", json=payload, headers=auth_headers)
+    assert response.status_code == 400
+
+    response = await client.post(
+        "/api/cities/", json={"name": "Santos", "state": "SP", "role": "origin"}, headers=auth_headers
+    )
+    assert response.status_code == 400
+
+
+async def test_cities_are_isolated_per_user(client, auth_headers):
+    await client.post("/api/cities/", json={"name": "Campinas", "state": "SP"}, headers=auth_headers)
+    other_headers = await register_and_login(client, "outra@example.com")
+
+    response = await client.get("/api/cities/", headers=other_headers)
+    assert response.json() == []
+
+
+async def test_list_cities_answers_304_until_a_write(client, auth_headers):
+    await client.post("/api/cities/", json={"name": "Campinas", "state": "SP"}, headers=auth_headers)
+    response = await client.get("/api/cities/", headers=auth_headers)
+    etag = response.headers["ETag"]
+
+    response = await client.get("/api/cities/", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+    await client.post("/api/cities/", json={"name": "Santos", "state": "SP"}, headers=auth_headers)
+    response = await client.get("/api/cities/", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+
+
+async def test_bulk_creates_updates_and_deletes_in_one_call(client, auth_headers):
+    first = (
+        await client.post("/api/cities/", json={"name": "Campinas", "state": "SP"}, headers=auth_headers)
+    ).json()
+    second = (await client.post("/api/cities/", json={"name": "Santos", "state": "SP"}, headers=auth_headers)).json()
+
+    response = await client.post(
+        "/api/cities/bulk",
+        json={
+            "create": [{"name": "Sorocaba", "state": "SP", "role": "destination"}],
+            "update": [{"id": first["id"], "role": "origin"}],
+            "delete": [second["id"]],
+        },
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert [city["name"] for city in result["created"]] == ["Sorocaba"]
+    assert result["updated"][0]["role"] == "origin"
+    assert result["deleted"] == [second["id"]]
+
+    names = {city["name"] for city in (await client.get("/api/cities/", headers=auth_headers)).json()}
+    assert names == {"Campinas", "Sorocaba"}
+
+
+async def test_names_are_kept_as_typed_by_default(client, auth_headers):
+    response = await client.post("/api/cities/", json={"name": "sao paulo", "state": "sp"}, headers=auth_headers)
+    assert (response.json()["name"], response.json()["state"]) == ("sao paulo", "SP")
+
+
+async def test_canonicalize_mode_fixes_accents_and_case(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "gazetteer_validation", "canonicalize")
+
+    response = await client.post("/api/cities/", json={"name": "FLORIANOPOLIS", "state": "sc"}, headers=auth_headers)
+    city = response.json()
+    assert (city["name"], city["state"]) == ("Florianópolis", "SC")
+
+    response = await client.put(f"/api/cities/{city['id']}", json={"name": "sao paulo", "state": "SP"}, headers=auth_headers)
+    assert (response.json()["name"], response.json()["state"]) == ("São Paulo", "SP")
+
+    # só o nome: a UF vem da cidade gravada
+    response = await client.put(f"/api/cities/{city['id']}", json={"name": "SÃO PAULO"}, headers=auth_headers)
+    assert response.json()["name"] == "São Paulo"
+
+    response = await client.post(
+        "/api/cities/bulk",
+        json={"update": [{"id": city["id"], "name": "belem", "state": "pa"}]},
+        headers=auth_headers,
+    )
+    assert [(item["name"], item["state"]) for item in response.json()["updated"]] == [("Belém", "PA")]
+
+    # fora do índice, o nome é aceito como veio
+    response = await client.post("/api/cities/", json={"name": "Campinas", "state": "SP"}, headers=auth_headers)
+    assert response.json()["name"] == "Campinas"
+
+
+async def test_strict_mode_rejects_unknown_cities_on_create_and_updates(client, auth_headers, monkeypatch):
+    response = await client.post("/api/cities/", json={"name": "Recife", "state": "PE"}, headers=auth_headers)
+    city_id = response.json()["id"]
+    monkeypatch.setattr(settings, "gazetteer_validation", "strict")
+
+    response = await client.post("/api/cities/", json={"name": "Campinas", "state": "SP"}, headers=auth_headers)
+    assert response.status_code == 422
+    response = await client.put(
+        f"/api/cities/{city_id}", json={"name": "Campinas", "state": "SP"}, headers=auth_headers
+    )
+    assert response.status_code == 422
+    # só a UF: "Recife-SP" não existe
+    response = await client.put(f"/api/cities/{city_id}", json={"state": "SP"}, headers=auth_headers)
+    assert response.status_code == 422
+
+    response = await client.post(
+        "/api/cities/bulk", json={"update": [{"id": city_id, "name": "Campinas", "state": "SP"}]}, headers=auth_headers
+    )
+    assert response.status_code == 422
+    response = await client.post(
+        "/api/cities/bulk", json={"update": [{"id": city_id, "state": "SP"}]}, headers=auth_headers
+    )
+    assert response.status_code == 422
+
+    cities = (await client.get("/api/cities/", headers=auth_headers)).json()
+    assert [(city["name"], city["state"]) for city in cities] == [("Recife", "PE")]
+
+
+async def test_suggest_matches_prefixes_without_accents_or_case(client, auth_headers):
+    response = await client.get("/api/cities/suggest", params={"q": "SAO"}, headers=auth_headers)
+    assert {(item["name"], item["state"]) for item in response.json()} == {("São Luís", "MA"), ("São Paulo", "SP")}
+
+    response = await client.get("/api/cities/suggest", params={"q": "sao", "state": "sp"}, headers=auth_headers)
+    assert [item["name"] for item in response.json()] == ["São Paulo"]
+
+    response = await client.get("/api/cities/suggest", params={"q": "goi"}, headers=auth_headers)
+    assert [item["name"] for item in response.json()] == ["Goiânia"]
+
+    response = await client.get("/api/cities/suggest", params={"q": "xyz"}, headers=auth_headers)
+    assert response.json() == []
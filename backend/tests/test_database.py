@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import database, models
+from app.config import settings
+from app.database import (
+    READ_YOUR_WRITES_COOKIE,
+    ReadReplicaRouter,
+    _async_database_url,
+    _engine_options,
+    get_db,
+)
+
+
+def test_urls_are_mapped_to_async_drivers():
+    assert _async_database_url("postgresql://app@db/rotas").drivername == "postgresql+psycopg"
+    assert _async_database_url("sqlite:///./rotas.db").drivername == "sqlite+aiosqlite"
+    assert _async_database_url("mysql+aiomysql://app@db/rotas").drivername == "mysql+aiomysql"
+
+
+def test_pool_settings_apply_only_outside_sqlite(monkeypatch):
+    assert _engine_options("sqlite:///./rotas.db") == {"pool_pre_ping": True}
+
+    monkeypatch.setattr(settings, "database_pool_size", 7)
+    monkeypatch.setattr(settings, "database_max_overflow", 3)
+    monkeypatch.setattr(settings, "database_statement_timeout_ms", 5000)
+    options = _engine_options("postgresql://app@db/rotas")
+    assert options["pool_size"] == 7
+    assert options["max_overflow"] == 3
+    assert options["connect_args"] == {"options": "-c statement_timeout=5000"}
+
+
+async def test_get_db_yields_an_async_session_that_keeps_loaded_attributes(client, auth_headers):
+    sessions = get_db()
+    db = await anext(sessions)
+    assert isinstance(db, AsyncSession)
+
+    user = (await db.execute(select(models.User))).scalar_one()
+    await db.commit()
+    # expire_on_commit desligado: ler atributos depois do commit não dispara IO implícito
+    assert user.email == "viajante@example.com"
+    await sessions.aclose()
+
+
+class RecordingReplicas:
+    def __init__(self) -> None:
+        self.reads = 0
+
+    def __bool__(self) -> bool:
+        return True
+
+    async def open_session(self):
+        # None faz a leitura cair no primário, então o teste só conta quem tentou a réplica
+        self.reads += 1
+        return None
+
+    async def dispose(self) -> None:
+        pass
+
+
+@pytest.fixture
+def replicas(monkeypatch):
+    replicas = RecordingReplicas()
+    monkeypatch.setattr(database, "read_replicas", replicas)
+    monkeypatch.setattr(database, "_last_writes", {})
+    database.track_user_writes()
+    yield replicas
+    for name, listener in database.WRITE_TRACKING_EVENTS:
+        event.remove(Session, name, listener)
+
+
+async def test_writes_set_a_cookie_that_keeps_reads_on_the_primary(client, auth_headers, replicas):
+    response = await client.post(
+        "/api/cities/", json={"name": "Campinas", "state": "SP", "role": "origin"}, headers=auth_headers
+    )
+    assert response.status_code == 201
+    assert f"{READ_YOUR_WRITES_COOKIE}=1" in response.headers["set-cookie"]
+    assert "Max-Age=" in response.headers["set-cookie"]
+
+    # outro processo não tem a janela local: só o cookie mantém a leitura no primário
+    database._last_writes.clear()
+    response = await client.get("/api/cities/", headers=auth_headers)
+    assert response.status_code == 200 and len(response.json()) == 1
+    assert replicas.reads == 0
+
+    client.cookies.clear()
+    response = await client.get("/api/cities/", headers=auth_headers)
+    assert response.status_code == 200
+    assert "set-cookie" not in response.headers
+    assert replicas.reads == 1
+
+
+class HangingSession:
+    closed = False
+
+    async def connection(self):
+        await asyncio.sleep(30)
+
+    async def close(self):
+        self.closed = True
+
+
+async def test_unresponsive_replica_is_skipped_after_the_connect_timeout(monkeypatch):
+    monkeypatch.setattr(settings, "database_replica_connect_timeout_seconds", 0.05)
+    router = ReadReplicaRouter([], retry_seconds=30)
+    session = HangingSession()
+    router._factories = [lambda: session]
+    router._down_until = [0.0]
+
+    assert await asyncio.wait_for(router.open_session(), timeout=1) is None
+    assert session.closed
+    assert router._candidates() == []
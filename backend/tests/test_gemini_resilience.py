@@ -0,0 +1,151 @@
+import asyncio
+
+import pytest
+from google.api_core.exceptions import InvalidArgument, ServiceUnavailable
+
+from app.services.fake_gemini import FakeGenerativeModel
+from app.services.gemini import GeminiService, GeminiUnavailableError
+from app.services.resilience import CircuitBreaker, RetryPolicy
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _service(model: FakeGenerativeModel, breaker: CircuitBreaker, **options) -> GeminiService:
+    return GeminiService(
+        api_key="",
+        model="fake",
+        model_factory=lambda name: model,
+        retry_policy=RetryPolicy(attempts=options.pop("attempts", 3), base_delay=0, max_delay=0),
+        circuit_breaker=breaker,
+        **options,
+    )
+
+
+def _half_open_breaker(clock: FakeClock) -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 10
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    return breaker
+
+
+def test_breaker_opens_after_threshold_and_allows_a_single_probe():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+    clock.now = 10
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+async def test_retryable_errors_are_retried_until_success():
+    model = FakeGenerativeModel("fake", errors=[ServiceUnavailable("fora"), ServiceUnavailable("fora")])
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=10)
+    service = _service(model, breaker)
+
+    text = await service.generate_text_async("prompt")
+    assert text
+    assert model.calls == 3
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+async def test_repeated_failures_open_the_circuit():
+    model = FakeGenerativeModel("fake", failure_rate=1.0)
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    service = _service(model, breaker)
+
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            await service.generate_text_async("prompt")
+    assert breaker.state == CircuitBreaker.OPEN
+
+    with pytest.raises(GeminiUnavailableError):
+        await service.generate_text_async("prompt")
+    assert model.calls == 9
+
+
+async def test_retries_of_one_call_count_as_a_single_failure():
+    model = FakeGenerativeModel("fake", failure_rate=1.0)
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    service = _service(model, breaker, attempts=5)
+
+    with pytest.raises(RuntimeError):
+        await service.generate_text_async("prompt")
+    assert model.calls == 5
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    with pytest.raises(RuntimeError):
+        service.generate_text("prompt")
+    assert model.calls == 10
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+async def test_stalled_stream_hits_the_total_stream_timeout():
+    model = FakeGenerativeModel("fake", latency=30.0)
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    service = _service(model, breaker, stream_timeout=0.05)
+
+    chunks = []
+    with pytest.raises(RuntimeError, match="Tempo limite"):
+        async for chunk in service.stream_text_async("prompt"):
+            chunks.append(chunk)
+    assert chunks == []
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+async def test_call_timeout_counts_as_a_retryable_failure():
+    model = FakeGenerativeModel("fake", latency=1.0)
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=10)
+    service = _service(model, breaker, attempts=2, call_timeout=0.01)
+
+    with pytest.raises(RuntimeError, match="Tempo limite"):
+        await service.generate_text_async("prompt")
+    assert model.calls == 2
+
+
+async def test_non_retryable_error_does_not_close_a_half_open_circuit():
+    clock = FakeClock()
+    breaker = _half_open_breaker(clock)
+    model = FakeGenerativeModel("fake", errors=[InvalidArgument("pedido inválido")])
+    service = _service(model, breaker)
+
+    with pytest.raises(RuntimeError):
+        await service.generate_text_async("prompt")
+    assert model.calls == 1
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    # a vaga da sonda foi liberada: a próxima chamada sonda de novo e fecha o circuito
+    assert await service.generate_text_async("prompt")
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+async def test_cancelled_probe_releases_the_half_open_slot():
+    clock = FakeClock()
+    breaker = _half_open_breaker(clock)
+    model = FakeGenerativeModel("fake", latency=5.0)
+    service = _service(model, breaker)
+
+    task = asyncio.create_task(service.generate_text_async("prompt"))
+    while model.calls == 0:
+        await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    model.latency = 0
+    assert await service.generate_text_async("prompt")
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+from sqlalchemy import event
+
+from app.database import async_engine
+from app.services import health
+from app.services.health import ReadinessProbe
+
+
+class FullPool:
+    _max_overflow = 0
+
+    def size(self) -> int:
+        return 4
+
+    def checkedout(self) -> int:
+        return 4
+
+
+async def test_database_ping_and_schema_share_one_connection():
+    checkouts = []
+
+    def listener(*args):
+        checkouts.append(args)
+
+    event.listen(async_engine.sync_engine, "checkout", listener)
+    try:
+        report, cached = await ReadinessProbe(ttl_seconds=0).report()
+    finally:
+        event.remove(async_engine.sync_engine, "checkout", listener)
+
+    assert not cached and report.ready
+    assert report.checks["database"].status == "ok"
+    assert report.checks["schema"].status == "ok"
+    assert len(checkouts) == 1
+
+
+async def test_saturated_pool_degrades_without_failing_readiness(monkeypatch):
+    # o SQLite de teste usa NullPool, sem limite de conexões; o pool cheio é simulado
+    engine = SimpleNamespace(sync_engine=SimpleNamespace(pool=FullPool()))
+    monkeypatch.setattr(health, "READINESS_CHECKS", [(("pool",), health._single("pool", health.check_pool))])
+    monkeypatch.setattr(health, "async_engine", engine)
+
+    report, _ = await ReadinessProbe(ttl_seconds=0).report()
+
+    pool = report.checks["pool"]
+    assert (pool.status, pool.detail, pool.critical) == ("degraded", "4/4 conexões em uso", False)
+    assert report.ready
+
+
+async def test_failed_database_group_fails_both_checks(monkeypatch):
+    async def unreachable():
+        raise OSError("conexão recusada")
+
+    monkeypatch.setattr(health, "READINESS_CHECKS", [(("database", "schema"), unreachable)])
+    report, _ = await ReadinessProbe(ttl_seconds=0).report()
+
+    assert not report.ready
+    assert report.checks["database"].detail == "conexão recusada"
+    assert report.checks["schema"].status == "fail"
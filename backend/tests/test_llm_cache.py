@@ -0,0 +1,89 @@
+import threading
+
+from app.config import settings
+from app.database import SessionLocal
+from app.routers import ai
+from app.services.fake_gemini import FakeGenerativeModel
+from app.services.gemini import GeminiService
+from app.services.llm_cache import DatabaseCacheBackend
+
+from .conftest import register_and_login
+
+
+def test_concurrent_writes_of_the_same_key_do_not_conflict():
+    backend = DatabaseCacheBackend(SessionLocal, max_bytes=1024 * 1024)
+    barrier = threading.Barrier(8)
+    errors: list[Exception] = []
+
+    def write(index: int) -> None:
+        barrier.wait()
+        try:
+            backend.set("mesma-chave", f"resposta {index}", ttl_seconds=60, model_name="fake")
+        except Exception as error:
+            errors.append(error)
+
+    threads = [threading.Thread(target=write, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert backend.get("mesma-chave").startswith("resposta ")
+    assert backend.usage()[0] == 1
+
+
+def test_eviction_runs_at_most_once_per_interval():
+    backend = DatabaseCacheBackend(SessionLocal, max_bytes=10, evict_interval=3600)
+    backend.set("a", "12345678", ttl_seconds=60, model_name="fake")
+    backend.set("b", "12345678", ttl_seconds=60, model_name="fake")
+
+    # a primeira escrita consumiu a rodada de limpeza; a segunda ultrapassa o limite até a próxima
+    assert backend.usage() == (2, 16)
+
+
+async def _create_trip(client, headers) -> None:
+    for name, role in (("Campinas", "origin"), ("Santos", "destination")):
+        await client.post("/api/cities/", json={"name": name, "state": "SP", "role": role}, headers=headers)
+
+
+async def test_cache_write_failure_does_not_fail_the_chat(client, auth_headers, monkeypatch):
+    await _create_trip(client, auth_headers)
+
+    cache = ai.get_llm_cache()
+
+    async def failing_set(*args, **kwargs):
+        raise RuntimeError("cache fora do ar")
+
+    monkeypatch.setattr(cache, "aset", failing_set)
+
+    response = await client.post("/api/ai/chat", json={"message": "Viagem"}, headers=auth_headers)
+    assert response.status_code == 200
+    assert len(response.json()["routes"]) == 1
+
+
+async def test_cached_answers_are_not_shared_between_users(client, auth_headers, monkeypatch):
+    model = FakeGenerativeModel("fake")
+    service = GeminiService(api_key="", model="fake", model_factory=lambda name: model)
+    monkeypatch.setattr(ai, "get_gemini_service", lambda: service)
+    other_headers = await register_and_login(client, "outra@example.com")
+
+    await _create_trip(client, auth_headers)
+    await _create_trip(client, other_headers)
+
+    for headers in (auth_headers, auth_headers, other_headers):
+        response = await client.post("/api/ai/chat", json={"message": "Viagem"}, headers=headers)
+        assert response.status_code == 200
+
+    # a segunda chamada do mesmo usuário vem do cache; o outro usuário, com o mesmo pedido, não
+    assert model.calls == 2
+
+
+async def test_cache_stats_are_restricted_to_admins(client, auth_headers, monkeypatch):
+    response = await client.get("/api/ai/cache/stats", headers=auth_headers)
+    assert response.status_code == 403
+
+    monkeypatch.setattr(settings, "sql_profiling_admin_emails", ["viajante@example.com"])
+    response = await client.get("/api/ai/cache/stats", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["enabled"] is True
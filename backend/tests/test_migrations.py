@@ -0,0 +1,42 @@
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.schema import CreateIndex
+
+from app import models
+from app.database import engine
+from app.migrations import m0003_route_plan_values
+from app.migrations.m0003_route_plan_values import ROUTE_PLAN_INDEXES
+
+
+def test_migrations_build_the_schema_the_models_expect():
+    inspector = inspect(engine)
+
+    for table in models.Base.metadata.sorted_tables:
+        columns = {column["name"] for column in inspector.get_columns(table.name)}
+        assert columns == set(table.columns.keys()), table.name
+
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        assert {index.name for index in table.indexes} <= indexes, table.name
+
+
+def test_route_plan_indexes_are_built_concurrently_only_on_postgresql():
+    for index in ROUTE_PLAN_INDEXES:
+        assert "CONCURRENTLY" in str(CreateIndex(index).compile(dialect=postgresql.dialect()))
+        assert "CONCURRENTLY" not in str(CreateIndex(index).compile(dialect=sqlite.dialect()))
+
+
+def test_route_plan_indexes_migration_reruns_on_sqlite(tmp_path):
+    migration_engine = create_engine(f"sqlite:///{tmp_path / 'rerun.db'}")
+    with migration_engine.connect() as connection:
+        connection.execute(
+            text("CREATE TABLE route_plans (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, created_at DATETIME NOT NULL)")
+        )
+        m0003_route_plan_values.upgrade(connection)
+        connection.commit()
+        # a segunda execução encontra colunas e índices prontos e não falha
+        m0003_route_plan_values.upgrade(connection)
+        connection.commit()
+
+        indexes = {index["name"] for index in inspect(connection).get_indexes("route_plans")}
+    migration_engine.dispose()
+    assert {index.name for index in ROUTE_PLAN_INDEXES} <= indexes
@@ -0,0 +1,108 @@
+import csv
+import gzip
+import json
+from datetime import date
+from io import StringIO
+
+import pytest
+from sqlalchemy import insert, select
+
+from app import models
+from app.database import SessionLocal
+from app.routers import route_plans
+
+
+@pytest.fixture
+async def exported_routes(client, auth_headers, monkeypatch):
+    # blocos pequenos para que a resposta saia em vários pedaços
+    monkeypatch.setattr(route_plans, "EXPORT_CHUNK_SIZE", 256)
+    with SessionLocal() as db:
+        user_id = db.scalar(select(models.User.id))
+        db.execute(
+            insert(models.RoutePlan).values(
+                [
+                    {
+                        "user_id": user_id,
+                        "itinerary": f"Rota {index}; ida e volta",
+                        "travel_date": date(2026, 1, 1 + index),
+                        "transport_type": "Carro" if index % 2 else "Ônibus",
+                        "distance_km_value": float(100 * index),
+                        "summary": "Linha 1\nLinha 2",
+                    }
+                    for index in range(20)
+                ]
+            )
+        )
+        db.commit()
+    return auth_headers
+
+
+async def test_csv_export_streams_every_row_with_filters(client, exported_routes):
+    response = await client.get(
+        "/api/routes/export",
+        params={"transport_type": "carro"},
+        headers={**exported_routes, "Accept-Encoding": "identity"},
+    )
+    assert response.status_code == 200
+    assert "content-encoding" not in response.headers
+    assert response.headers["content-disposition"] == "attachment; filename=rotas.csv"
+
+    rows = list(csv.reader(StringIO(response.text), delimiter=";"))
+    assert rows[0] == route_plans.EXPORT_CSV_HEADERS
+    assert len(rows) == 11
+    assert {row[1] for row in rows[1:]} == {f"Rota {index}; ida e volta" for index in range(1, 20, 2)}
+    assert all(row[-2] == "Linha 1\nLinha 2" for row in rows[1:])
+
+
+async def test_ndjson_export_is_selected_by_the_format_parameter(client, exported_routes):
+    response = await client.get(
+        "/api/routes/export", params={"format": "ndjson"}, headers={**exported_routes, "Accept-Encoding": "identity"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert len(records) == 20
+    assert records[0]["travel_date"] == "2026-01-20"
+    assert records[-1]["itinerary"] == "Rota 0; ida e volta"
+
+
+async def test_export_is_gzipped_only_when_the_client_accepts_it(client, exported_routes):
+    response = await client.get(
+        "/api/routes/export", params={"format": "ndjson"}, headers={**exported_routes, "Accept-Encoding": "gzip"}
+    )
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    # o httpx já descomprime o corpo; conferir o gzip em si exige ler o stream cru
+    async with client.stream(
+        "GET", "/api/routes/export", headers={**exported_routes, "Accept-Encoding": "gzip"}
+    ) as raw:
+        body = b"".join([chunk async for chunk in raw.aiter_raw()])
+    assert gzip.decompress(body).decode("utf-8").startswith("ID;Percurso")
+    assert len(response.text.splitlines()) == 20
+
+    refused = await client.get(
+        "/api/routes/export", headers={**exported_routes, "Accept-Encoding": "gzip;q=0, identity"}
+    )
+    assert "content-encoding" not in refused.headers
+
+
+@pytest.mark.parametrize(
+    ("header", "accepted"),
+    [
+        ("gzip", True),
+        ("deflate, gzip;q=0.5", True),
+        ("GZIP ; Q=1.0", True),
+        ("x-gzip", True),
+        ("*", True),
+        ("gzip;q=0", False),
+        ("gzip;q=0.0, *", False),
+        ("*;q=0", False),
+        ("br, deflate", False),
+        ("identity", False),
+        ("gzip;q=abc", False),
+        ("", False),
+    ],
+)
+def test_accept_encoding_is_parsed_with_quality_values(header, accepted):
+    assert route_plans._accepts_gzip(header) is accepted
@@ -0,0 +1,96 @@
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from app.services.route_optimizer import haversine_matrix, path_length, solve_open_path
+
+
+def _random_distances(count: int, seed: int) -> np.ndarray:
+    rng = random.Random(seed)
+    return haversine_matrix(
+        [rng.uniform(-33.0, 5.0) for _ in range(count)],
+        [rng.uniform(-73.0, -35.0) for _ in range(count)],
+    )
+
+
+def _brute_force(distances: np.ndarray) -> float:
+    inner = range(1, len(distances) - 1)
+    return min(
+        path_length(distances, [0, *order, len(distances) - 1]) for order in itertools.permutations(inner)
+    )
+
+
+@pytest.mark.parametrize("count", range(3, 11))
+def test_held_karp_matches_brute_force(count):
+    for seed in range(5):
+        distances = _random_distances(count, seed)
+        path, method = solve_open_path(distances)
+
+        assert method == ("trivial" if count <= 3 else "exact")
+        assert path_length(distances, path) == pytest.approx(_brute_force(distances))
+
+
+@pytest.mark.parametrize("count", [6, 40, 120])
+def test_heuristic_returns_a_permutation_with_fixed_endpoints(count):
+    distances = _random_distances(count, seed=count)
+    path, method = solve_open_path(distances, exact_limit=0)
+
+    assert method == "heuristic"
+    assert path[0] == 0 and path[-1] == count - 1
+    assert sorted(path) == list(range(count))
+    assert path_length(distances, path) <= path_length(distances, range(count))
+
+
+def test_heuristic_stays_close_to_the_exact_order():
+    for seed in range(5):
+        distances = _random_distances(10, seed)
+        heuristic, _ = solve_open_path(distances, exact_limit=0)
+        assert path_length(distances, heuristic) <= 1.1 * _brute_force(distances)
+
+
+async def _register_cities(client, headers, cities):
+    for name, state, role in cities:
+        response = await client.post(
+            "/api/cities/", json={"name": name, "state": state, "role": role}, headers=headers
+        )
+        assert response.status_code == 201
+
+
+async def test_optimize_skips_intermediate_stops_missing_from_the_index(client, auth_headers):
+    await _register_cities(
+        client,
+        auth_headers,
+        [
+            ("Porto Alegre", "RS", "origin"),
+            ("Campinas", "SP", "intermediate"),
+            ("Curitiba", "PR", "intermediate"),
+            ("São Paulo", "SP", "intermediate"),
+            ("Rio de Janeiro", "RJ", "destination"),
+        ],
+    )
+
+    response = await client.get("/api/routes/optimize", headers=auth_headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert [stop["name"] for stop in body["stops"]] == ["Porto Alegre", "Curitiba", "São Paulo", "Rio de Janeiro"]
+    assert [stop["name"] for stop in body["skipped"]] == ["Campinas"]
+    assert "Campinas-SP" in body["warning"]
+    assert body["total_km"] > 0
+
+
+async def test_optimize_keeps_the_registration_order_without_origin_coordinates(client, auth_headers):
+    await _register_cities(
+        client,
+        auth_headers,
+        [("Campinas", "SP", "origin"), ("Curitiba", "PR", "intermediate"), ("Santos", "SP", "destination")],
+    )
+
+    response = await client.get("/api/routes/optimize", headers=auth_headers)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["method"] == "registration"
+    assert [stop["name"] for stop in body["stops"]] == ["Campinas", "Curitiba", "Santos"]
+    assert body["total_km"] is None
+    assert "Campinas-SP" in body["warning"] and "Santos-SP" in body["warning"]
@@ -0,0 +1,56 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import insert, select
+
+from app import models
+from app.database import SessionLocal
+
+
+@pytest.fixture
+async def same_second_routes(client, auth_headers):
+    with SessionLocal() as db:
+        user_id = db.scalar(select(models.User.id))
+        # um único INSERT: no SQLite, CURRENT_TIMESTAMP é o mesmo para todas as linhas e não tem microssegundos
+        db.execute(
+            insert(models.RoutePlan).values(
+                [
+                    {
+                        "user_id": user_id,
+                        "itinerary": f"Rota {index}",
+                        "travel_date": date.today(),
+                        "distance_km_value": float(100 + index % 2),
+                    }
+                    for index in range(5)
+                ]
+            )
+        )
+        db.commit()
+        return [route_id for (route_id,) in db.execute(select(models.RoutePlan.id).order_by(models.RoutePlan.id))]
+
+
+async def _collect_pages(client, headers, **params) -> list[list[int]]:
+    pages: list[list[int]] = []
+    cursor = None
+    while True:
+        query = {"limit": 2, **params, **({"cursor": cursor} if cursor else {})}
+        response = await client.get("/api/routes/", params=query, headers=headers)
+        assert response.status_code == 200
+        pages.append([route["id"] for route in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None or len(pages) > 10:
+            return pages
+
+
+async def test_recent_pages_do_not_repeat_rows_created_in_the_same_second(client, auth_headers, same_second_routes):
+    pages = await _collect_pages(client, auth_headers)
+
+    assert [route_id for page in pages for route_id in page] == sorted(same_second_routes, reverse=True)
+
+
+async def test_sorted_pages_break_ties_by_id(client, auth_headers, same_second_routes):
+    pages = await _collect_pages(client, auth_headers, sort="distance")
+
+    ids = [route_id for page in pages for route_id in page]
+    assert sorted(ids) == same_second_routes
+    assert len(ids) == len(set(ids))
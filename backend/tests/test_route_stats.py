@@ -0,0 +1,71 @@
+from datetime import date
+
+from sqlalchemy import create_engine, insert, select, text
+
+from app import models
+from app.database import SessionLocal
+from app.manage import backfill_route_values
+from app.migrations import MIGRATIONS, m0004_background_tables
+from app.services.route_stats import ROUTE_STATS_COLUMNS, STAT_COUNTERS, _aggregate, rebuild_route_stats
+
+
+ROUTE_KEYS = ("travel_date", "transport_type", "trip_type", "distance_km_value", "estimated_spend_brl_cents")
+ROUTES = [
+    dict(zip(ROUTE_KEYS, values))
+    for values in (
+        (date(2024, 1, 10), "Ônibus", "Lazer", 95.5, None),
+        (date(2024, 1, 20), " ônibus ", None, None, 12000),
+        (None, "Carro  próprio", "", 10.0, None),
+    )
+]
+
+
+def _stats_rows(connection) -> dict[tuple[int, str, str], dict[str, float]]:
+    rows = connection.execute(select(models.RoutePlanStat.__table__)).mappings()
+    return {
+        (row["user_id"], row["dimension"], row["bucket"]): {counter: row[counter] for counter in STAT_COUNTERS}
+        for row in rows
+    }
+
+
+def test_migration_populates_stats_from_existing_routes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.connect() as connection:
+        for migration in MIGRATIONS[: MIGRATIONS.index(m0004_background_tables)]:
+            migration.upgrade(connection)
+        connection.execute(text("INSERT INTO users (id, email, hashed_password) VALUES (1, 'a@b.com', 'x')"))
+        connection.execute(
+            insert(models.RoutePlan.__table__),
+            [{"user_id": 1, "itinerary": f"Rota {index}", **route} for index, route in enumerate(ROUTES)],
+        )
+
+        m0004_background_tables.upgrade(connection)
+
+        expected = _aggregate(connection.execute(select(*ROUTE_STATS_COLUMNS)), 1)
+        assert _stats_rows(connection) == expected
+        assert expected[(1, "transport_type", "ônibus")]["route_count"] == 2
+        assert expected[(1, "trip_type", "indefinido")]["route_count"] == 2
+    engine.dispose()
+
+
+def test_backfill_rebuilds_stats_with_parsed_values(client, auth_headers):
+    with SessionLocal() as db:
+        user_id = db.scalar(select(models.User.id))
+        db.execute(
+            insert(models.RoutePlan),
+            [
+                {"user_id": user_id, "itinerary": "Rota 1", "distance_km": "120 km", "estimated_spend_brl": "R$ 350,00"},
+                {"user_id": user_id, "itinerary": "Rota 2", "distance_km": "80,5 km"},
+            ],
+        )
+        db.commit()
+        rebuild_route_stats(db)
+
+    assert backfill_route_values(batch_size=1) == 2
+
+    with SessionLocal() as db:
+        total = db.get(models.RoutePlanStat, (user_id, "total", ""))
+        assert total.route_count == 2
+        assert total.distance_count == 2
+        assert total.distance_km_total == 200.5
+        assert total.spend_cents_total == 35000
@@ -0,0 +1,62 @@
+import pytest
+
+from app.services.route_values import parse_brl_cents, parse_distance_km, parse_duration_minutes, parse_route_values
+
+
+@pytest.mark.parametrize(
+    ("text", "minutes"),
+    [
+        ("45 min", 45),
+        ("02:30", 150),
+        ("5h 30min", 330),
+        ("5h30", 330),
+        ("2 horas e 30 minutos", 150),
+        ("1 dia e 2 horas", 1560),
+        ("3h a 4h", 210),
+        ("3-4 horas", 210),
+        ("3 a 4 h", 210),
+        ("Entre 3 e 4 horas", 210),
+        ("1h30 até 2h", 105),
+        ("até 4h", 240),
+        ("sem estimativa", None),
+    ],
+)
+def test_duration_sums_compound_parts_and_takes_the_midpoint_of_ranges(text, minutes):
+    assert parse_duration_minutes(text) == minutes
+
+
+@pytest.mark.parametrize(
+    ("text", "cents"),
+    [
+        ("R$ 1.234,50", 123450),
+        ("R$ 1,234.50", 123450),
+        ("1,234", 123400),
+        ("1,234,567", 123456700),
+        ("12,5", 1250),
+        ("R$ 2 mil", 200000),
+        ("R$ 1,5 mil", 150000),
+        ("R$ 1 a 2 mil", 150000),
+        ("R$ 1.200 a R$ 1.500", 135000),
+        ("R$ 80-120", 10000),
+        ("a combinar", None),
+    ],
+)
+def test_money_handles_thousands_separators_mil_and_ranges(text, cents):
+    assert parse_brl_cents(text) == cents
+
+
+@pytest.mark.parametrize(
+    ("text", "km"),
+    [("1.234 km", 1234.0), ("12,5 km", 12.5), ("450 m", 0.45), ("100 a 120 km", 110.0), ("300 a 450 m", 0.375)],
+)
+def test_distance_units_and_ranges(text, km):
+    assert parse_distance_km(text) == km
+
+
+def test_route_values_accept_numbers_and_missing_fields():
+    assert parse_route_values({"distance_km": 12, "travel_time": 90, "cost_brl": 10.5}) == {
+        "distance_km_value": 12.0,
+        "travel_time_minutes": 90,
+        "cost_brl_cents": 1050,
+        "estimated_spend_brl_cents": None,
+    }
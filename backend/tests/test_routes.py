@@ -0,0 +1,97 @@
+import asyncio
+import time
+
+from app.routers import ai
+from app.services.fake_gemini import FakeGenerativeModel
+from app.services.gemini import GeminiService
+
+
+class AsyncOnlyModel(FakeGenerativeModel):
+    def generate_content(self, prompt, **kwargs):
+        raise AssertionError("o chat não deve usar a chamada síncrona do SDK")
+
+
+async def _create_trip(client, headers) -> None:
+    for name, role in (("Campinas", "origin"), ("Santos", "destination")):
+        response = await client.post("/api/cities/", json={"name": name, "state": "SP", "role": role}, headers=headers)
+        assert response.status_code == 201
+
+
+async def test_chat_persists_routes_from_the_fake_model(client, auth_headers):
+    await _create_trip(client, auth_headers)
+
+    response = await client.post("/api/ai/chat", json={"message": "Quero uma viagem curta"}, headers=auth_headers)
+    assert response.status_code == 200, response.text
+    routes = response.json()["routes"]
+    assert len(routes) == 1
+    assert routes[0]["itinerary"] == "Campinas-SP → Santos-SP"
+    assert routes[0]["distance_km_value"] == 430.0
+
+    response = await client.get(f"/api/routes/{routes[0]['id']}", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["summary"]
+
+    response = await client.get("/api/routes/stats", headers=auth_headers)
+    assert response.json()["count"] == 1
+
+
+async def test_concurrent_chats_wait_for_the_model_on_the_event_loop(client, auth_headers, monkeypatch):
+    await _create_trip(client, auth_headers)
+    model = AsyncOnlyModel("fake", latency=0.3)
+    service = GeminiService(api_key="", model="fake", model_factory=lambda name: model, max_concurrency=16)
+    monkeypatch.setattr(ai, "get_gemini_service", lambda: service)
+
+    started = time.perf_counter()
+    responses = await asyncio.gather(
+        *(
+            client.post("/api/ai/chat", json={"message": f"Viagem {index}"}, headers=auth_headers)
+            for index in range(8)
+        )
+    )
+    elapsed = time.perf_counter() - started
+
+    assert [response.status_code for response in responses] == [200] * 8
+    assert model.calls == 8
+    # em série seriam 8 × 0,3 s; as chamadas se sobrepõem porque nenhuma prende uma thread esperando o modelo
+    assert elapsed < 1.5
+
+
+async def test_chat_requires_origin_and_destination(client, auth_headers):
+    response = await client.post("/api/ai/chat", json={"message": "Oi"}, headers=auth_headers)
+    assert response.status_code == 400
+
+
+async def test_delete_routes_removes_only_the_requested_ids(client, auth_headers):
+    await _create_trip(client, auth_headers)
+    ids = []
+    for index in range(3):
+        response = await client.post("/api/ai/chat", json={"message": f"Viagem {index}"}, headers=auth_headers)
+        ids.append(response.json()["routes"][0]["id"])
+
+    response = await client.request("DELETE", "/api/routes/", json={"route_ids": ids[:2]}, headers=auth_headers)
+    assert response.status_code == 204
+
+    response = await client.get("/api/routes/", headers=auth_headers)
+    assert [route["id"] for route in response.json()] == [ids[2]]
+
+
+async def test_idempotency_key_replays_the_stored_response(client, auth_headers):
+    await _create_trip(client, auth_headers)
+    headers = {**auth_headers, "Idempotency-Key": "pedido-1"}
+
+    first = await client.post("/api/ai/chat", json={"message": "Viagem"}, headers=headers)
+    second = await client.post("/api/ai/chat", json={"message": "Viagem"}, headers=headers)
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+
+    response = await client.get("/api/routes/", headers=auth_headers)
+    assert len(response.json()) == 1
+
+
+async def test_idempotency_key_reused_with_another_payload_is_rejected(client, auth_headers):
+    await _create_trip(client, auth_headers)
+    headers = {**auth_headers, "Idempotency-Key": "pedido-1"}
+
+    await client.post("/api/ai/chat", json={"message": "Viagem"}, headers=headers)
+    response = await client.post("/api/ai/chat", json={"message": "Outra viagem"}, headers=headers)
+    assert response.status_code == 422
@@ -0,0 +1,34 @@
+from app.config import settings
+
+from .conftest import register_and_login
+
+
+async def test_traces_are_only_readable_by_the_admin_who_requested_them(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "sql_profiling_admin_emails", ["viajante@example.com", "outra@example.com"])
+
+    response = await client.get("/api/cities/", headers={**auth_headers, "X-SQL-Profile": "trace"})
+    assert response.status_code == 200
+    assert "Server-Timing" in response.headers
+    profile_id = response.headers["X-SQL-Profile-Id"]
+
+    response = await client.get(f"/api/debug/sql-profiles/{profile_id}", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["path"] == "/api/cities/"
+    assert response.json()["statements"]
+
+    other_admin = await register_and_login(client, "outra@example.com")
+    response = await client.get(f"/api/debug/sql-profiles/{profile_id}", headers=other_admin)
+    assert response.status_code == 404
+
+
+async def test_non_admins_cannot_trace_even_with_global_profiling(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(settings, "sql_profiling", True)
+    monkeypatch.setattr(settings, "sql_profiling_admin_emails", [])
+
+    response = await client.get("/api/cities/", headers={**auth_headers, "X-SQL-Profile": "trace"})
+    assert response.status_code == 200
+    assert "Server-Timing" in response.headers
+    assert "X-SQL-Profile-Id" not in response.headers
+
+    response = await client.get("/api/debug/sql-profiles/qualquer", headers=auth_headers)
+    assert response.status_code == 403
@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+
+def test_importing_the_app_does_not_load_numpy():
+    # processo novo: nesta sessão de testes outro módulo pode já ter carregado o NumPy
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys, app.main; print('numpy' in sys.modules)"],
+        cwd=Path(__file__).resolve().parents[1],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "False"
+
+
+def test_app_startup_and_health_checks_do_not_load_the_gemini_sdk(tmp_path):
+    # modo real (sem fake) com chave configurada: é o caminho em que o SDK poderia ser importado cedo
+    script = """
+import sys
+from fastapi.testclient import TestClient
+from app.bench.startup import DEFAULT_FORBIDDEN_MODULES
+from app.main import create_app
+from app.migrate import upgrade
+
+upgrade()
+with TestClient(create_app()) as client:
+    assert client.get("/api/health").status_code == 200
+    assert client.get("/api/health/ready").status_code == 200
+print(",".join(name for name in DEFAULT_FORBIDDEN_MODULES if name in sys.modules))
+"""
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'startup.db'}",
+        "GEMINI_FAKE": "false",
+        "GEMINI_API_KEY": "chave-de-teste",
+        "GEMINI_WARMUP": "false",
+        "GENERATION_WORKERS": "0",
+    }
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=Path(__file__).resolve().parents[1],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, select
+
+from app import models
+from app.config import settings
+from app.database import SessionLocal
+from app.routers.ai import JobCompletion, JobSupersededError, run_generation_job
+from app.worker import claim_next_job, process_next_job
+
+
+@pytest.fixture
+async def user_id(client, auth_headers):
+    for name, role in (("Campinas", "origin"), ("Santos", "destination")):
+        await client.post("/api/cities/", json={"name": name, "state": "SP", "role": role}, headers=auth_headers)
+    with SessionLocal() as db:
+        return db.scalar(select(models.User.id))
+
+
+def _add_job(user_id: int, **values) -> int:
+    with SessionLocal() as db:
+        job = models.GenerationJob(user_id=user_id, message="Viagem", **values)
+        db.add(job)
+        db.commit()
+        return job.id
+
+
+def _route_count() -> int:
+    with SessionLocal() as db:
+        return db.scalar(select(func.count(models.RoutePlan.id)))
+
+
+async def test_job_is_processed_and_finished_with_its_routes(client, auth_headers, user_id):
+    response = await client.post("/api/ai/jobs", json={"message": "Viagem"}, headers=auth_headers)
+    assert response.status_code == 202
+
+    assert await process_next_job()
+
+    job = (await client.get(response.headers["Location"], headers=auth_headers)).json()
+    assert job["status"] == "succeeded"
+    routes = (await client.get("/api/routes/", headers=auth_headers)).json()
+    assert job["route_ids"] == [route["id"] for route in routes]
+
+
+async def test_stale_job_is_retried_until_the_attempt_cap(user_id):
+    stale = datetime.now(timezone.utc) - timedelta(seconds=settings.generation_job_timeout_seconds + 60)
+    retried = _add_job(user_id, status="running", started_at=stale, attempts=1)
+    exhausted = _add_job(user_id, status="running", started_at=stale, attempts=settings.generation_job_max_attempts)
+
+    claimed = claim_next_job()
+    assert claimed is not None
+    assert (claimed[0], claimed[3]) == (retried, 2)
+
+    with SessionLocal() as db:
+        job = db.get(models.GenerationJob, exhausted)
+        assert job.status == "failed"
+        assert job.finished_at is not None
+
+
+async def test_superseded_attempt_does_not_persist_routes(user_id):
+    job_id = _add_job(user_id)
+    _, _, message, attempt = claim_next_job()
+
+    # outro worker retomou a tarefa depois que ela foi considerada travada
+    with SessionLocal() as db:
+        db.get(models.GenerationJob, job_id).attempts = attempt + 1
+        db.commit()
+
+    with pytest.raises(JobSupersededError):
+        await run_generation_job(user_id, message, JobCompletion(job_id=job_id, attempt=attempt))
+
+    assert _route_count() == 0
+    with SessionLocal() as db:
+        assert db.get(models.GenerationJob, job_id).status == "running"
@@ -34,6 +34,7 @@ export async function sendGeminiMessage(message) {
   }
 
   const response = await fetch(`${API_BASE_URL}/api/ai/chat`, {
+    credentials: 'include',
     method: 'POST',
     headers: buildAuthHeaders(),
     body: JSON.stringify({ message }),
@@ -47,3 +48,91 @@ export async function sendGeminiMessage(message) {
   return response.json()
 }
 
+
+const parseSseEvent = (rawEvent) => {
+  let event = 'message'
+  const dataLines = []
+
+  for (const line of rawEvent.split('\n')) {
+    if (line.startsWith('event:')) {
+      event = line.slice(6).trim()
+    } else if (line.startsWith('data:')) {
+      dataLines.push(line.slice(5).trimStart())
+    }
+  }
+
+  if (!dataLines.length) {
+    return null
+  }
+
+  return { event, data: JSON.parse(dataLines.join('\n')) }
+}
+
+// a mesma chave em uma nova tentativa faz o backend repetir o resultado em vez de gerar outra rota
+export const createIdempotencyKey = () => crypto.randomUUID()
+
+export async function streamGeminiMessage(
+  message,
+  { onMessage, onRoutes, idempotencyKey = createIdempotencyKey() } = {},
+) {
+  if (!message?.trim()) {
+    throw new Error('Mensagem vazia.')
+  }
+
+  const response = await fetch(`${API_BASE_URL}/api/ai/chat/stream`, {
+    credentials: 'include',
+    method: 'POST',
+    headers: {
+      ...buildAuthHeaders(),
+      Accept: 'text/event-stream',
+      'Idempotency-Key': idempotencyKey,
+    },
+    body: JSON.stringify({ message }),
+  })
+
+  if (!response.ok) {
+    const detail = await parseError(response)
+    const error = new Error(detail)
+    error.status = response.status
+    throw error
+  }
+
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  const result = { response: '', routes: [] }
+  let buffer = ''
+
+  while (true) {
+    const { value, done } = await reader.read()
+    if (done) {
+      break
+    }
+
+    buffer += decoder.decode(value, { stream: true })
+
+    let separatorIndex = buffer.indexOf('\n\n')
+    while (separatorIndex !== -1) {
+      const parsed = parseSseEvent(buffer.slice(0, separatorIndex))
+      buffer = buffer.slice(separatorIndex + 2)
+      separatorIndex = buffer.indexOf('\n\n')
+
+      if (!parsed) {
+        continue
+      }
+
+      if (parsed.event === 'message') {
+        result.response += parsed.data.delta
+        onMessage?.(parsed.data.delta)
+      } else if (parsed.event === 'routes') {
+        result.routes = parsed.data.routes
+        onRoutes?.(parsed.data.routes)
+      } else if (parsed.event === 'done') {
+        result.response = parsed.data.response
+      } else if (parsed.event === 'error') {
+        throw new Error(parsed.data.detail || 'Falha ao se comunicar com a IA.')
+      }
+    }
+  }
+
+  return result
+}
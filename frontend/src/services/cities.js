@@ -28,6 +28,7 @@ const parseError = async (response) => {
 
 export async function listCities() {
   const response = await fetch(`${API_BASE_URL}/api/cities/`, {
+    credentials: 'include',
     headers: buildAuthHeaders(),
   })
 
@@ -43,6 +44,7 @@ export async function listCities() {
 
 export async function createCity(payload) {
   const response = await fetch(`${API_BASE_URL}/api/cities/`, {
+    credentials: 'include',
     method: 'POST',
     headers: buildAuthHeaders(),
     body: JSON.stringify(payload),
@@ -58,6 +60,7 @@ export async function createCity(payload) {
 
 export async function updateCity(cityId, payload) {
   const response = await fetch(`${API_BASE_URL}/api/cities/${cityId}`, {
+    credentials: 'include',
     method: 'PUT',
     headers: buildAuthHeaders(),
     body: JSON.stringify(payload),
@@ -73,6 +76,7 @@ export async function updateCity(cityId, payload) {
 
 export async function deleteCity(cityId) {
   const response = await fetch(`${API_BASE_URL}/api/cities/${cityId}`, {
+    credentials: 'include',
     method: 'DELETE',
     headers: buildAuthHeaders(),
   })
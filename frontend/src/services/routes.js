@@ -28,8 +28,18 @@ const parseError = async (response) => {
   }
 }
 
-export async function listRoutes() {
-  const response = await fetch(`${API_BASE_URL}/api/routes/`, {
+export async function listRoutes({ limit, cursor, sort, travelDateFrom, travelDateTo, transportType } = {}) {
+  const params = new URLSearchParams()
+  if (limit) params.set('limit', limit)
+  if (cursor) params.set('cursor', cursor)
+  if (sort) params.set('sort', sort)
+  if (travelDateFrom) params.set('travel_date_from', travelDateFrom)
+  if (travelDateTo) params.set('travel_date_to', travelDateTo)
+  if (transportType) params.set('transport_type', transportType)
+
+  const query = params.toString()
+  const response = await fetch(`${API_BASE_URL}/api/routes/${query ? `?${query}` : ''}`, {
+    credentials: 'include',
     headers: authHeaders(),
   })
 
@@ -40,11 +50,15 @@ export async function listRoutes() {
     throw error
   }
 
-  return response.json()
+  return {
+    items: await response.json(),
+    nextCursor: response.headers.get('X-Next-Cursor'),
+  }
 }
 
 export async function getRouteById(routeId) {
   const response = await fetch(`${API_BASE_URL}/api/routes/${routeId}`, {
+    credentials: 'include',
     headers: authHeaders(),
   })
 
@@ -60,6 +74,7 @@ export async function getRouteById(routeId) {
 
 export async function downloadRouteCsv(routeId) {
   const response = await fetch(`${API_BASE_URL}/api/routes/${routeId}/csv`, {
+    credentials: 'include',
     headers: authHeaders(),
   })
 
@@ -75,6 +90,7 @@ export async function downloadRouteCsv(routeId) {
 
 export async function deleteRoutes(routeIds) {
   const response = await fetch(`${API_BASE_URL}/api/routes/`, {
+    credentials: 'include',
     method: 'DELETE',
     headers: authHeaders(),
     body: JSON.stringify({ route_ids: routeIds }),
@@ -24,6 +24,7 @@ export async function getCurrentUser() {
   }
 
   const response = await fetch(`${API_BASE_URL}/api/auth/me`, {
+    credentials: 'include',
     headers: {
       Authorization: `Bearer ${token}`,
     },